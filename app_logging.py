@@ -0,0 +1,143 @@
+"""
+Journalisation structurée (une ligne JSON par événement).
+
+Chaque ligne porte le contexte courant (job_id, bank_id, stage...), lié par
+log_context() dans des contextvars: il suit la requête dans les threads de
+run_in_threadpool sans être passé de fonction en fonction.
+
+Les messages utilisent le formatage paresseux de logging et les contenus
+volumineux (réponses brutes de Claude, JSON extraits) passent par
+debug_dump(), qui ne construit rien si le niveau DEBUG est désactivé et
+n'en garde qu'une fraction (LOG_DEBUG_SAMPLE_RATE) sinon.
+
+Variables d'environnement:
+- LOG_LEVEL: DEBUG, INFO (défaut), WARNING...
+- LOG_FORMAT: json (défaut) ou text (lisible en développement)
+- LOG_DEBUG_SAMPLE_RATE: fraction des dumps DEBUG conservés (défaut 1)
+"""
+import json
+import logging
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1"))
+# Taille maximale d'un dump DEBUG (caractères)
+LOG_DUMP_MAX_CHARS = int(os.getenv("LOG_DUMP_MAX_CHARS", "2000"))
+
+ROOT_LOGGER = "camels"
+
+_context: ContextVar[dict] = ContextVar("log_context", default={})
+
+# Attributs standard d'un LogRecord (tout le reste vient de extra=)
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON: horodatage, niveau, logger, message, contexte et champs extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_context.get(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Format lisible: message suivi du contexte et des champs en clé=valeur"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {**_context.get(), **{k: v for k, v in vars(record).items() if k not in _RECORD_ATTRIBUTES}}
+        line = f"{record.levelname:<7} {record.name}: {record.getMessage()}"
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging(level: str = None, fmt: str = None):
+    """Installe le handler (stderr) du logger racine de l'application (idempotent)"""
+    root = logging.getLogger(ROOT_LOGGER)
+    handler = next((h for h in root.handlers if getattr(h, "_camels", False)), None)
+    if handler is None:
+        handler = logging.StreamHandler(sys.stderr)
+        handler._camels = True
+        root.addHandler(handler)
+    handler.setFormatter(TextFormatter() if (fmt or LOG_FORMAT) == "text" else JsonFormatter())
+    root.setLevel(level or LOG_LEVEL)
+    root.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger de module ("camels.<module>")"""
+    if not logging.getLogger(ROOT_LOGGER).handlers:
+        configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+@contextmanager
+def log_context(**fields):
+    """Ajoute des champs (job_id, bank_id, stage...) à toutes les lignes du bloc"""
+    token = _context.set({**_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def bind_context(**fields):
+    """
+    Ajoute des champs au contexte courant, jusqu'à la fin de la tâche ou du
+    thread (requête HTTP, job en arrière-plan).
+    """
+    _context.set({**_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+
+
+@contextmanager
+def timed(logger: logging.Logger, stage: str, level: int = logging.INFO, **fields):
+    """
+    Chronomètre une étape: stage est ajouté au contexte du bloc, puis une
+    ligne "<stage> terminé" avec duration_ms est émise (ou "échec" + exception).
+    """
+    started = time.perf_counter()
+    with log_context(stage=stage):
+        try:
+            yield
+        except Exception:
+            logger.warning("%s échec", stage, exc_info=True,
+                           extra={"duration_ms": _elapsed_ms(started), **fields})
+            raise
+        if logger.isEnabledFor(level):
+            logger.log(level, "%s terminé", stage, extra={"duration_ms": _elapsed_ms(started), **fields})
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def debug_dump(logger: logging.Logger, label: str, payload, max_chars: int = None):
+    """
+    Dump DEBUG échantillonné d'un contenu volumineux (texte ou objet JSON).
+    Rien n'est sérialisé si DEBUG est désactivé ou si l'échantillon l'exclut.
+    """
+    if not logger.isEnabledFor(logging.DEBUG) or random.random() >= LOG_DEBUG_SAMPLE_RATE:
+        return
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+    max_chars = LOG_DUMP_MAX_CHARS if max_chars is None else max_chars
+    logger.debug(label, extra={"payload": text[:max_chars], "payload_chars": len(text)})
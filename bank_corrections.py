@@ -0,0 +1,125 @@
+"""
+Correction manuelle de montants extraits (PATCH /banks/{id}).
+
+Seuls les ratios qui dépendent des montants modifiés sont recalculés
+(graphe RATIO_FORMULAS / affected_ratios de camels_calculator). Si un montant
+moyenné change (total_assets, total_equity, gross_loans), les ratios sur
+moyennes de l'exercice suivant sont recalculés aussi.
+"""
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from bank_repository import EXTRACTED_FIELDS, find_bank, find_previous_period, fiscal_year_key
+from camels_calculator import AVERAGES, RATIO_FORMULAS, RATIO_INPUT_FIELDS, affected_ratios, calculate_ratios
+from financial_statement import FinancialStatement
+from models import BankDB
+from rating_methodology import get_methodology
+
+# Montants corrigeables (problem_assets_mn est recalculé, pas saisi)
+CORRECTABLE_FIELDS = [f for f in ["total_assets"] + EXTRACTED_FIELDS if f not in RATIO_FORMULAS]
+REQUIRED_FIELDS = {"total_assets"}
+
+
+def validate_corrections(corrections: Dict[str, Optional[float]]):
+    """
+    Raises:
+        ValueError: champ inconnu ou non corrigeable, ou champ obligatoire vidé
+    """
+    if not corrections:
+        raise ValueError("Aucune correction")
+    unknown = [f for f in corrections if f not in CORRECTABLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Champs non corrigeables: {', '.join(unknown)}")
+    emptied = [f for f in REQUIRED_FIELDS if f in corrections and corrections[f] is None]
+    if emptied:
+        raise ValueError(f"Champs obligatoires: {', '.join(emptied)}")
+
+
+def _ratings(bank, methodology) -> dict:
+    rated = methodology.rate_bank(bank)
+    ratings = {pillar: result["rating"] for pillar, result in rated["pillars"].items()}
+    ratings["composite"] = rated["composite"]["composite_rating"]
+    return ratings
+
+
+def _changes(before: dict, after: dict) -> Dict[str, dict]:
+    return {
+        name: {"before": before[name], "after": after[name]}
+        for name in before if before[name] != after[name]
+    }
+
+
+def _recompute(bank: BankDB, prev_bank, ratios: list, methodology, ratings_before: dict) -> dict:
+    """
+    Recalcule les ratios donnés (recopiés dans bank) et retourne le diff ratios
+    + notations. ratings_before: notations prises avant les corrections (la
+    méthodologie peut noter directement un montant corrigé).
+    """
+    statement = FinancialStatement.from_bank(bank)
+    ratios_before = {name: getattr(statement, name) for name in ratios}
+    calculate_ratios(statement, prev_bank, ratios)
+    statement.apply_to(bank, ratios)
+    return {
+        "recomputed": ratios,
+        "ratios": _changes(ratios_before, {name: getattr(statement, name) for name in ratios}),
+        "ratings": _changes(ratings_before, _ratings(statement, methodology)),
+    }
+
+
+def correct_bank(db: Session, bank_id: int, corrections: Dict[str, Optional[float]],
+                 methodology_id: str = None) -> Optional[dict]:
+    """
+    Applique les corrections, recalcule les ratios dépendants et enregistre.
+
+    Les notations ne sont pas stockées (calculées à la lecture): le diff
+    indique leur évolution selon la méthodologie demandée.
+
+    Returns:
+        dict: diff des montants, ratios et notations (+ exercice suivant),
+        None si la banque est introuvable
+
+    Raises:
+        KeyError: méthodologie inconnue
+        ValueError: corrections invalides (rien n'est modifié)
+    """
+    validate_corrections(corrections)
+    methodology = get_methodology(methodology_id)
+    bank = db.get(BankDB, bank_id)
+    if bank is None:
+        return None
+
+    fields_before = {field: getattr(bank, field) for field in corrections}
+    changed = [field for field in corrections if fields_before[field] != corrections[field]]
+
+    # L'exercice suivant utilise ces montants dans ses moyennes
+    averaged = [field for field in changed if field in AVERAGES.values()]
+    year = fiscal_year_key(bank.fiscal_year)
+    next_bank = find_bank(db, bank.bank_key, year + 1) if averaged and year is not None else None
+
+    # Notations avant toute modification
+    ratings_before = _ratings(FinancialStatement.from_bank(bank), methodology)
+    next_ratings_before = _ratings(FinancialStatement.from_bank(next_bank), methodology) if next_bank else None
+    for field, value in corrections.items():
+        setattr(bank, field, value)
+
+    result = {
+        "bank_id": bank.id,
+        "bank_key": bank.bank_key,
+        "fiscal_year": bank.fiscal_year,
+        "methodology": methodology.id,
+        "fields": _changes(fields_before, corrections),
+        **_recompute(bank, find_previous_period(db, bank),
+                     affected_ratios([f for f in changed if f in RATIO_INPUT_FIELDS]), methodology, ratings_before),
+        "next_period": None,
+    }
+
+    if next_bank is not None:
+        result["next_period"] = {
+            "bank_id": next_bank.id,
+            "fiscal_year": next_bank.fiscal_year,
+            **_recompute(next_bank, bank, affected_ratios([], averaged), methodology, next_ratings_before),
+        }
+
+    db.commit()
+    return result
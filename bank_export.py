@@ -0,0 +1,169 @@
+"""
+Export en masse de BankDB (GET /banks/export) en CSV, Parquet ou Excel.
+
+Les lignes sont lues par lots (yield_per, curseur côté serveur sous
+PostgreSQL) et écrites au fil de l'eau: la mémoire reste constante quel que
+soit le nombre de banques-exercices exportées.
+
+pyarrow (Parquet) et openpyxl (Excel) sont optionnels; le CSV n'a besoin
+d'aucune dépendance.
+"""
+import csv
+import io
+import os
+import tempfile
+from typing import Iterator, List
+
+from sqlalchemy import select
+
+from bank_screen import build_conditions
+from models import BankDB
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+# Toutes les colonnes de la table, dans l'ordre du modèle
+EXPORT_COLUMNS: List[str] = [column.name for column in BankDB.__table__.columns]
+
+
+def check_format(fmt: str):
+    """
+    Vérifie le format et la présence de sa dépendance optionnelle
+    (avant de commencer à streamer la réponse).
+
+    Raises:
+        ValueError: format inconnu
+        ImportError: pyarrow / openpyxl non installé
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format inconnu: {fmt} (attendu: {', '.join(EXPORT_FORMATS)})")
+    if fmt == "parquet":
+        import pyarrow  # noqa: F401
+    elif fmt == "xlsx":
+        import openpyxl  # noqa: F401
+
+
+def iter_batches(session_factory, filters: list) -> Iterator[List[tuple]]:
+    """Lots de lignes (tuples dans l'ordre de EXPORT_COLUMNS), session dédiée"""
+    stmt = (
+        select(*[BankDB.__table__.c[name] for name in EXPORT_COLUMNS])
+        .where(*build_conditions(filters))
+        .order_by(BankDB.bank_key, BankDB.fiscal_year, BankDB.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    db = session_factory()
+    try:
+        for partition in db.execute(stmt).partitions():
+            yield [tuple(row) for row in partition]
+    finally:
+        db.close()
+
+
+def export_rows(session_factory, filters: list, fmt: str) -> Iterator[bytes]:
+    """Flux d'octets du fichier exporté"""
+    batches = iter_batches(session_factory, filters)
+    if fmt == "parquet":
+        return _parquet_stream(batches)
+    if fmt == "xlsx":
+        return _xlsx_stream(batches)
+    return _csv_stream(batches)
+
+
+def _csv_stream(batches) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM: Excel ouvre directement le fichier en UTF-8 (accents des noms)
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Fichier en écriture seule dont le contenu est vidé après chaque lot"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    types = {"Integer": pa.int64(), "Float": pa.float64(), "Boolean": pa.bool_(), "DateTime": pa.timestamp("us")}
+    return pa.schema([
+        (column.name, types.get(type(column.type).__name__, pa.string()))
+        for column in BankDB.__table__.columns
+    ])
+
+
+def _parquet_stream(batches) -> Iterator[bytes]:
+    """Un row group Parquet par lot, envoyé dès qu'il est écrit"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for batch in batches:
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _xlsx_stream(batches) -> Iterator[bytes]:
+    """
+    Classeur openpyxl en mode write_only (lignes écrites sur disque au fur
+    et à mesure), puis fichier final envoyé par blocs depuis un fichier temporaire.
+    Le format xlsx (zip) ne peut être émis qu'une fois le classeur fermé.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("banks")
+    sheet.append(EXPORT_COLUMNS)
+    for batch in batches:
+        for row in batch:
+            sheet.append(row)
+
+    with tempfile.TemporaryFile(suffix=".xlsx") as tmp:
+        workbook.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(1024 * 1024)
+            if not chunk:
+                break
+            yield chunk
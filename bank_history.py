@@ -0,0 +1,121 @@
+"""
+Historique CAMELS d'une banque: tous les exercices, variations annuelles
+et changements de notation par pilier.
+
+Une seule requête quel que soit le nombre d'exercices: auto-jointure par
+exercice de deux index couvrants (bank_key, fiscal_year), ix_banks_history
+(ratios) et ix_banks_history_amounts (identité, montants), chacun lu en
+index-only scan sous PostgreSQL (un seul index ne peut tout couvrir: 32
+colonnes au plus).
+"""
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, aliased
+
+from bank_repository import fiscal_year_key
+from models import BankDB, HISTORY_AMOUNT_FIELDS, RATIO_FIELDS
+from rating_methodology import get_methodology
+
+# Colonnes lues dans chacun des deux index
+RATIO_INDEX_COLUMNS = ["id"] + RATIO_FIELDS
+AMOUNT_INDEX_COLUMNS = ["bank_key", "fiscal_year", "bank_name", "country", "currency"] + HISTORY_AMOUNT_FIELDS
+
+
+def load_history_rows(db: Session, identity: str) -> list:
+    """
+    Lignes (colonnes des deux index couvrants uniquement) de tous les exercices d'une banque.
+
+    Args:
+        identity: bank_key (ex: "societe-ivoirienne-de-banque--cote-d-ivoire")
+            ou id numérique de n'importe lequel de ses exercices
+    """
+    if identity.isdigit():
+        key = select(BankDB.bank_key).where(BankDB.id == int(identity)).scalar_subquery()
+    else:
+        key = identity
+
+    amounts = aliased(BankDB)
+    stmt = (
+        select(
+            *[getattr(amounts, column).label(column) for column in AMOUNT_INDEX_COLUMNS],
+            *[getattr(BankDB, column) for column in RATIO_INDEX_COLUMNS],
+        )
+        .join(amounts, (amounts.bank_key == BankDB.bank_key) & (amounts.fiscal_year == BankDB.fiscal_year))
+        .where(BankDB.bank_key == key, amounts.bank_key == key)
+        .order_by(BankDB.fiscal_year)
+    )
+    return db.execute(stmt).all()
+
+
+def _delta(current: Optional[float], previous: Optional[float]) -> Optional[float]:
+    if current is None or previous is None:
+        return None
+    return current - previous
+
+
+def _ratings(row, methodology) -> dict:
+    rated = methodology.rate_bank(row)
+    ratings = {pillar: rated["pillars"][pillar]["rating"] for pillar in methodology.pillars}
+    ratings["composite"] = rated["composite"]["composite_rating"]
+    return ratings
+
+
+def build_history(rows: list, methodology_id: str = None) -> Optional[dict]:
+    """
+    Construit la série chronologique (du plus ancien au plus récent).
+
+    Les variations sont calculées par rapport à l'exercice stocké précédent
+    (previous_fiscal_year l'indique si une année manque). Pour les notations,
+    un changement positif est une dégradation (1 = Strong, 5 = Unsatisfactory).
+    """
+    if not rows:
+        return None
+
+    methodology = get_methodology(methodology_id)
+    rows = sorted(rows, key=lambda r: fiscal_year_key(r.fiscal_year) or 0)
+    history: List[dict] = []
+    previous = None
+    previous_ratings = None
+
+    for row in rows:
+        ratings = _ratings(row, methodology)
+        entry = {
+            "bank_id": row.id,
+            "fiscal_year": row.fiscal_year,
+            "amounts": {field: getattr(row, field) for field in HISTORY_AMOUNT_FIELDS},
+            "ratios": {field: getattr(row, field) for field in RATIO_FIELDS},
+            "ratings": ratings,
+            "previous_fiscal_year": previous.fiscal_year if previous else None,
+            "deltas": None,
+            "rating_changes": None,
+        }
+        if previous is not None:
+            entry["deltas"] = {
+                field: _delta(getattr(row, field), getattr(previous, field))
+                for field in HISTORY_AMOUNT_FIELDS + RATIO_FIELDS
+            }
+            entry["rating_changes"] = {
+                pillar: _delta(ratings[pillar], previous_ratings[pillar])
+                for pillar in ratings
+            }
+        history.append(entry)
+        previous, previous_ratings = row, ratings
+
+    latest = rows[-1]
+    return {
+        "bank_key": latest.bank_key,
+        "bank_name": latest.bank_name,
+        "country": latest.country,
+        "currency": latest.currency,
+        "methodology": methodology.id,
+        "years": len(history),
+        "first_fiscal_year": rows[0].fiscal_year,
+        "last_fiscal_year": latest.fiscal_year,
+        "history": history,
+    }
+
+
+def get_bank_history(db: Session, identity: str, methodology_id: str = None) -> Optional[dict]:
+    """Historique complet d'une banque (None si inconnue)"""
+    return build_history(load_history_rows(db, identity), methodology_id)
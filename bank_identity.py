@@ -0,0 +1,55 @@
+"""
+Identité normalisée d'une banque: même clé pour "Société Ivoirienne de Banque (SIB)",
+"SOCIETE IVOIRIENNE DE BANQUE SA" ou "Société Ivoirienne de Banque", dans le même pays.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Optional
+
+# Formes juridiques ignorées dans le nom
+LEGAL_FORMS = {"sa", "sarl", "sas", "plc", "ltd", "limited", "spa", "ag", "nv"}
+
+# Variantes courantes des noms de pays UEMOA
+COUNTRY_ALIASES = {
+    "cote-divoire": "cote-d-ivoire",
+    "ivory-coast": "cote-d-ivoire",
+    "ci": "cote-d-ivoire",
+    "guinea-bissau": "guinee-bissau",
+    "sn": "senegal",
+    "bf": "burkina-faso",
+    "burkina": "burkina-faso",
+}
+
+
+def slugify(text: str) -> str:
+    """Minuscules ASCII, mots séparés par des tirets"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def normalize_bank_name(name: Optional[str]) -> str:
+    """Nom sans sigle entre parenthèses, forme juridique ni ponctuation"""
+    name = re.sub(r"\([^)]*\)", " ", name or "")
+    words = [w for w in slugify(name).split("-") if w]
+    # Forme juridique en fin de nom ("... SA", "... S.A.")
+    while words:
+        if words[-1] in LEGAL_FORMS:
+            words.pop()
+        elif words[-2:] == ["s", "a"]:
+            del words[-2:]
+        else:
+            break
+    return "-".join(words) or "inconnu"
+
+
+def normalize_country(country: Optional[str]) -> str:
+    slug = slugify(country) or "inconnu"
+    return COUNTRY_ALIASES.get(slug, slug)
+
+
+@lru_cache(maxsize=4096)
+def make_bank_key(name: Optional[str], country: Optional[str]) -> str:
+    """Clé d'identité utilisée pour l'unicité (banque, exercice) et dans les URL"""
+    return f"{normalize_bank_name(name)}--{normalize_country(country)}"
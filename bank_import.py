@@ -0,0 +1,326 @@
+"""
+Import en masse de données financières structurées (CSV / XLSX), sans OCR ni LLM.
+
+Chaque ligne du fichier est une banque-exercice. Les colonnes sont associées
+aux champs de BankDB par un mapping explicite ({"Colonne du fichier": "champ"})
+ou, à défaut, par leur nom normalisé (voir HEADER_ALIASES).
+
+Étapes:
+1. lecture en flux (csv / openpyxl read_only) et validation de toutes les lignes
+2. ratios et notations calculés en une passe vectorisée (numpy), avec repli
+   ligne par ligne sur calculate_all_ratios si numpy n'est pas installé
+3. écriture par lots: INSERT ... ON CONFLICT (bank_key, fiscal_year) en
+   executemany
+
+Réimport d'un exercice déjà en base: mêmes règles de fusion que
+bank_repository.upsert_bank. Une valeur importée remplace la valeur stockée;
+une colonne absente du fichier ou une cellule vide la conserve (total_assets:
+0 aussi); le libellé déjà en base est conservé. Les montants existants sont
+fusionnés avant le calcul des ratios, qui portent donc sur la ligne finale.
+"""
+import csv
+import io
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from bank_identity import make_bank_key, normalize_country, slugify
+from bank_repository import (
+    EXTRACTED_FIELDS, _insert_for, add_file_url, find_bank, fiscal_year_key, load_previous_amounts, merged_file_urls,
+)
+from camels_calculator import BATCH_PREVIOUS_FIELDS, RATIO_FORMULAS, calculate_all_ratios, calculate_ratios_batch
+from financial_statement import FinancialStatement
+from models import BankDB
+from rating_methodology import get_methodology
+from statement_parser import parse_amount
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+
+IDENTITY_COLUMNS = ["bank_name", "country", "fiscal_year", "currency"]
+AMOUNT_COLUMNS = ["total_assets"] + EXTRACTED_FIELDS
+IMPORT_FIELDS = IDENTITY_COLUMNS + AMOUNT_COLUMNS
+
+# En-têtes usuels (normalisés par slugify, "-" → "_") → champ BankDB
+HEADER_ALIASES = {
+    "name": "bank_name", "banque": "bank_name", "bank": "bank_name", "nom": "bank_name",
+    "pays": "country",
+    "exercice": "fiscal_year", "annee": "fiscal_year", "year": "fiscal_year",
+    "devise": "currency",
+    "total_actif": "total_assets", "total_bilan": "total_assets",
+}
+
+
+# ===== LECTURE =====
+
+def read_rows(fileobj, filename: str, sheet: str = None) -> Tuple[List[str], Iterator[list]]:
+    """
+    En-têtes et itérateur de lignes (valeurs brutes) d'un CSV ou XLSX.
+
+    Le séparateur CSV (, ; ou tabulation) est détecté sur le début du fichier.
+    """
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        rows = worksheet.iter_rows(values_only=True)
+    else:
+        text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+        try:
+            dialect = csv.Sniffer().sniff(text.read(4096), delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        text.seek(0)
+        rows = csv.reader(text, dialect)
+
+    headers = next(rows, None)
+    if not headers:
+        raise ValueError("Fichier vide")
+    return [str(h).strip() if h is not None else "" for h in headers], rows
+
+
+def resolve_mapping(headers: List[str], mapping: Optional[Dict[str, str]] = None) -> Dict[int, str]:
+    """
+    Index de colonne → champ BankDB.
+
+    Raises:
+        ValueError: champ cible inconnu, colonne absente ou colonne obligatoire manquante
+    """
+    resolved = {}
+    if mapping:
+        unknown = [field for field in mapping.values() if field not in IMPORT_FIELDS]
+        if unknown:
+            raise ValueError(f"Champs BankDB inconnus dans le mapping: {', '.join(unknown)}")
+        missing = [column for column in mapping if column not in headers]
+        if missing:
+            raise ValueError(f"Colonnes absentes du fichier: {', '.join(missing)}")
+        resolved = {headers.index(column): field for column, field in mapping.items()}
+    else:
+        for index, header in enumerate(headers):
+            key = slugify(header).replace("-", "_")
+            field = HEADER_ALIASES.get(key, key)
+            if field in IMPORT_FIELDS and field not in resolved.values():
+                resolved[index] = field
+
+    required = [f for f in ("bank_name", "country", "fiscal_year") if f not in resolved.values()]
+    if required:
+        raise ValueError(f"Colonnes obligatoires non associées: {', '.join(required)}")
+    return resolved
+
+
+# ===== VALIDATION =====
+
+def _to_number(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError("booléen")
+    if isinstance(value, (int, float)):
+        return float(value)
+    number = parse_amount(str(value))
+    if number is None:
+        raise ValueError(f"valeur non numérique: {value!r}")
+    return number
+
+
+def validate_rows(rows: Iterator[list], mapping: Dict[int, str], source: str) -> Tuple[List[dict], List[dict]]:
+    """
+    Convertit et valide toutes les lignes.
+
+    Returns:
+        (records, errors): records prêts pour l'insertion (un par (bank_key,
+        fiscal_year), la dernière ligne du fichier l'emporte), errors =
+        [{"row": n° de ligne, "field": ..., "error": ...}] des lignes rejetées
+    """
+    records: Dict[tuple, dict] = {}
+    errors = []
+
+    for line_number, row in enumerate(rows, start=2):  # Ligne 1 = en-têtes
+        if not any(cell not in (None, "") for cell in row):
+            continue
+        record = {field: None for field in IMPORT_FIELDS}
+        row_errors = []
+        for index, field in mapping.items():
+            value = row[index] if index < len(row) else None
+            if field in AMOUNT_COLUMNS:
+                try:
+                    record[field] = _to_number(value)
+                except ValueError as e:
+                    row_errors.append({"row": line_number, "field": field, "error": str(e)})
+            else:
+                record[field] = str(value).strip() if value not in (None, "") else None
+
+        year = fiscal_year_key(record["fiscal_year"])
+        if year is None:
+            row_errors.append({"row": line_number, "field": "fiscal_year", "error": "exercice invalide"})
+        for field in ("bank_name", "country"):
+            if not record[field]:
+                row_errors.append({"row": line_number, "field": field, "error": "valeur manquante"})
+        if row_errors:
+            errors.extend(row_errors)
+            continue
+
+        record["fiscal_year"] = str(year)
+        record["bank_key"] = make_bank_key(record["bank_name"], record["country"])
+        record["country_key"] = normalize_country(record["country"])
+        record["file_urls"] = source
+        records[(record["bank_key"], year)] = record
+
+    return list(records.values()), errors
+
+
+def merge_existing(db: Session, records: List[dict]):
+    """
+    Complète chaque record avec l'exercice déjà en base (règles de
+    upsert_bank), lu par lots de bank_key: valeur importée si non nulle,
+    sinon valeur stockée; total_assets à 0 ne remplace pas l'existant.
+    """
+    existing: Dict[tuple, dict] = {}
+    keys = sorted({r["bank_key"] for r in records})
+    for start in range(0, len(keys), IMPORT_BATCH_SIZE):
+        stmt = select(BankDB.bank_key, *[getattr(BankDB, f) for f in IMPORT_FIELDS]) \
+            .where(BankDB.bank_key.in_(keys[start:start + IMPORT_BATCH_SIZE]))
+        for row in db.execute(stmt).mappings():
+            existing[(row["bank_key"], fiscal_year_key(row["fiscal_year"]))] = row
+
+    for record in records:
+        stored = existing.get((record["bank_key"], fiscal_year_key(record["fiscal_year"])))
+        if stored is not None:
+            record["bank_name"], record["country"] = stored["bank_name"], stored["country"]
+            for field in AMOUNT_COLUMNS + ["currency"]:
+                if record[field] is None or (field == "total_assets" and record[field] == 0):
+                    record[field] = stored[field]
+        record["currency"] = record["currency"] or "XOF"
+        record["total_assets"] = record["total_assets"] or 0
+
+
+# ===== RATIOS ET NOTATIONS =====
+
+def compute_ratios(db: Session, records: List[dict]) -> List[Optional[int]]:
+    """
+    Ajoute les ratios CAMELS à chaque record et retourne le rating composite.
+    Passe vectorisée numpy; repli ligne par ligne si numpy est absent.
+    """
+    if not records:
+        return []
+    prev_list = load_previous_amounts(db, records, BATCH_PREVIOUS_FIELDS)
+
+    try:
+        import numpy as np
+    except ImportError:
+        return _compute_ratios_rowwise(records, prev_list)
+
+    columns = {field: [r.get(field) for r in records] for field in AMOUNT_COLUMNS}
+    prev_columns = {field: [(p or {}).get(field) for p in prev_list] for field in BATCH_PREVIOUS_FIELDS}
+    ratios = calculate_ratios_batch(columns, prev_columns)
+
+    for name, values in ratios.items():
+        converted = [None if np.isnan(v) else float(v) for v in values]
+        for record, value in zip(records, converted):
+            record[name] = value
+
+    methodology = get_methodology()
+    ratings = methodology.rate_columns({field: [r[field] for r in records] for field in methodology.fields})
+    return [None if np.isnan(v) else int(v) for v in ratings["composite"]]
+
+
+def _compute_ratios_rowwise(records: List[dict], prev_list: List[Optional[dict]]) -> List[Optional[int]]:
+    composites = []
+    for record, prev in zip(records, prev_list):
+        bank = FinancialStatement.from_dict(record)
+        calculate_all_ratios(bank, FinancialStatement.from_dict(prev) if prev else None)
+        for name in RATIO_FORMULAS:
+            record[name] = getattr(bank, name)
+        composites.append(get_methodology().rate_bank(bank)["composite"]["composite_rating"])
+    return composites
+
+
+# ===== ÉCRITURE =====
+
+def write_records(db: Session, records: List[dict]) -> List[int]:
+    """
+    Upsert par lots (executemany) des records fusionnés (merge_existing) et
+    de leurs ratios; retourne les ids dans l'ordre des records. Les fusions
+    sont refaites en SQL (coalesce) pour une ligne modifiée entre-temps.
+    """
+    if not records:
+        return []
+    columns = list(records[0].keys())
+    insert = _insert_for(db)
+    if insert is None:
+        return [_write_record(db, record, columns) for record in records]
+
+    table = BankDB.__table__
+    # INSERT Core sur la table (pas le chemin "bulk" de l'ORM, qui recompile par ligne)
+    stmt = insert(table)
+    excluded = stmt.excluded
+    update = {c: excluded[c] for c in columns if c not in ("bank_key", "fiscal_year", "file_urls")}
+    update.update({field: func.coalesce(excluded[field], table.c[field]) for field in AMOUNT_COLUMNS + ["currency"]})
+    update.update({
+        "bank_name": table.c.bank_name,
+        "country": table.c.country,
+        "total_assets": case((excluded.total_assets == 0, table.c.total_assets), else_=excluded.total_assets),
+        "file_urls": merged_file_urls(table, excluded),
+        "updated_date": func.now(),
+    })
+    stmt = stmt.on_conflict_do_update(index_elements=["bank_key", "fiscal_year"], set_=update) \
+        .returning(table.c.id, sort_by_parameter_order=True)
+
+    connection = db.connection()
+    ids = []
+    for start in range(0, len(records), IMPORT_BATCH_SIZE):
+        batch = records[start:start + IMPORT_BATCH_SIZE]
+        ids.extend(connection.execute(stmt, batch).scalars().all())
+    return ids
+
+
+def _write_record(db: Session, record: dict, columns: List[str]) -> int:
+    """Repli sans ON CONFLICT: même ligne finale (record déjà fusionné, ratios compris)"""
+    bank = find_bank(db, record["bank_key"], record["fiscal_year"])
+    if bank is None:
+        bank = BankDB(**{c: record[c] for c in columns})
+        db.add(bank)
+    else:
+        for column in columns:
+            if column not in ("bank_key", "fiscal_year", "file_urls"):
+                setattr(bank, column, record[column])
+        bank.file_urls = add_file_url(bank.file_urls, record["file_urls"])
+    db.flush()
+    return bank.id
+
+
+def import_file(db: Session, fileobj, filename: str, mapping: Optional[Dict[str, str]] = None,
+                sheet: str = None) -> dict:
+    """
+    Importe un CSV/XLSX complet (voir docstring du module).
+
+    Raises:
+        ValueError: fichier vide ou mapping invalide (rien n'est importé)
+    """
+    headers, rows = read_rows(fileobj, filename, sheet)
+    column_mapping = resolve_mapping(headers, mapping)
+    records, errors = validate_rows(rows, column_mapping, f"import:{filename}")
+
+    merge_existing(db, records)
+    composites = compute_ratios(db, records)
+    ids = write_records(db, records)
+    db.commit()
+
+    distribution = {}
+    for composite in composites:
+        distribution[str(composite)] = distribution.get(str(composite), 0) + 1
+
+    return {
+        "imported": len(ids),
+        "rejected_rows": len({e["row"] for e in errors}),
+        "errors": errors[:100],
+        "mapping": {headers[index]: field for index, field in column_mapping.items()},
+        "composite_ratings": distribution,
+        "banks": [
+            {"bank_id": bank_id, "bank_key": r["bank_key"], "fiscal_year": r["fiscal_year"],
+             "composite_rating": composite}
+            for bank_id, r, composite in zip(ids, records, composites)
+        ],
+    }
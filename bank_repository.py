@@ -0,0 +1,261 @@
+"""
+Persistance des données extraites: un enregistrement BankDB par exercice.
+
+Partagé par /upload-and-extract et process_job_async. Les écritures sont des
+upserts sur (bank_key, fiscal_year): un même rapport ré-uploadé met à jour
+la ligne existante au lieu d'en créer une nouvelle.
+"""
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.orm import Session
+
+from bank_identity import make_bank_key, normalize_country
+from camels_calculator import RATIO_FORMULAS, calculate_all_ratios
+from financial_statement import FinancialStatement
+from models import BankDB
+
+# Champs du JSON d'extraction copiés tels quels dans BankDB
+EXTRACTED_FIELDS = [
+    "cash_reserves_requirements", "due_from_banks", "investment_securities", "gross_loans",
+    "loan_loss_provisions", "foreclosed_assets", "investment_in_subs_affiliates", "other_assets",
+    "fixed_assets",
+    "deposits", "interbank_liabilities", "other_liabilities", "total_liabilities",
+    "paid_in_capital", "reserves", "retained_earnings", "net_profit", "total_equity",
+    "interest_income", "interest_expenses", "net_interest_income", "non_interest_income_commissions",
+    "net_income_investment", "other_net_income", "operating_expenses", "operating_profit",
+    "provision_expenses", "non_operating_profit_loss", "income_tax", "net_income",
+    "car_regulatory", "car_bank_reported", "problem_assets_mn", "npls_mn", "llr_mn",
+    "fx_rate_period_end", "fx_rate_period_avg",
+]
+
+# Ratios publiés par la banque (en %), convertis en fraction
+REPORTED_PERCENT_FIELDS = [
+    "npl_ratio_reported", "coverage_ratio_reported", "roe_reported", "roa_reported", "cost_income_reported",
+]
+
+IDENTITY_FIELDS = ["name", "country", "currency"]
+
+
+def fiscal_year_key(fiscal_year) -> Optional[int]:
+    """Année de clôture d'un exercice ("2023", "2022-2023" → 2023)"""
+    if fiscal_year is None:
+        return None
+    years = re.findall(r"(?:19|20)\d{2}", str(fiscal_year))
+    return int(years[-1]) if years else None
+
+
+def split_periods(extracted_data: dict) -> List[dict]:
+    """
+    Sépare le JSON d'extraction en un dict par exercice, du plus ancien au plus
+    récent. Les exercices antérieurs ("prior_periods") héritent du nom, du pays
+    et de la devise du document. L'exercice est normalisé en année de clôture.
+    """
+    current = {k: v for k, v in extracted_data.items() if k != "prior_periods"}
+    periods = [current]
+
+    for prior in extracted_data.get("prior_periods") or []:
+        period = {field: current.get(field) for field in IDENTITY_FIELDS}
+        period.update({k: v for k, v in prior.items() if v is not None})
+        periods.append(period)
+
+    by_year = {}
+    for period in periods:
+        year = fiscal_year_key(period.get("fiscal_year"))
+        if year is not None:
+            period["fiscal_year"] = str(year)
+        by_year.setdefault(year, period)  # L'exercice courant prime sur un doublon
+    return sorted(by_year.values(), key=lambda p: fiscal_year_key(p.get("fiscal_year")) or 0)
+
+
+def apply_extracted_data(bank: BankDB, data: dict):
+    """Copie les champs extraits non nuls sur l'objet BankDB"""
+    for field in EXTRACTED_FIELDS:
+        value = data.get(field)
+        if value is not None:
+            setattr(bank, field, value)
+    if data.get("total_assets"):
+        bank.total_assets = data["total_assets"]
+    for field in REPORTED_PERCENT_FIELDS:
+        if data.get(field):
+            setattr(bank, field, data[field] / 100)
+
+
+def build_bank(data: dict, file_path: str) -> BankDB:
+    """Crée un objet BankDB (non sauvegardé) à partir d'un exercice extrait"""
+    bank = BankDB(
+        bank_name=data.get("name") or "Inconnu",
+        country=data.get("country") or "Inconnu",
+        fiscal_year=data.get("fiscal_year"),
+        currency=data.get("currency") or "XOF",
+        file_urls=file_path,
+        total_assets=data.get("total_assets") or 0,
+    )
+    bank.bank_key = make_bank_key(bank.bank_name, bank.country)
+    bank.country_key = normalize_country(bank.country)
+    apply_extracted_data(bank, data)
+    return bank
+
+
+def find_bank(db: Session, bank_key: str, fiscal_year) -> Optional[BankDB]:
+    """Enregistrement existant pour cette banque et cet exercice"""
+    return db.query(BankDB).filter(
+        BankDB.bank_key == bank_key,
+        BankDB.fiscal_year == str(fiscal_year),
+    ).first()
+
+
+def find_previous_period(db: Session, bank: BankDB) -> Optional[BankDB]:
+    """Exercice N-1 de la même banque (pour les ratios sur moyennes)"""
+    year = fiscal_year_key(bank.fiscal_year)
+    if year is None:
+        return None
+    return find_bank(db, bank.bank_key, year - 1)
+
+
+def load_previous_amounts(db: Session, records: List[dict], fields: List[str],
+                          batch_size: int = 1000) -> List[Optional[dict]]:
+    """
+    Montants de l'exercice N-1 de chaque record (dicts avec bank_key et
+    fiscal_year), pour les ratios sur moyennes. Les records eux-mêmes priment
+    sur la base (import d'un fichier multi-exercices); la base est lue par
+    lots de bank_key, en une requête par lot.
+
+    Returns:
+        list: dict des montants N-1 (ou None), dans l'ordre des records
+    """
+    known: Dict[tuple, dict] = {}
+    keys = sorted({r["bank_key"] for r in records})
+    for start in range(0, len(keys), batch_size):
+        stmt = select(BankDB.bank_key, BankDB.fiscal_year, *[getattr(BankDB, f) for f in fields]) \
+            .where(BankDB.bank_key.in_(keys[start:start + batch_size]))
+        for row in db.execute(stmt):
+            year = fiscal_year_key(row.fiscal_year)
+            if year is not None:
+                known[(row.bank_key, year)] = {f: getattr(row, f) for f in fields}
+    for r in records:
+        known[(r["bank_key"], fiscal_year_key(r["fiscal_year"]))] = {f: r.get(f) for f in fields}
+
+    return [known.get((r["bank_key"], (fiscal_year_key(r["fiscal_year"]) or 0) - 1)) for r in records]
+
+
+# ===== UPSERT =====
+
+def _insert_for(db: Session):
+    """INSERT ... ON CONFLICT du dialecte courant (None si non supporté)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+def add_file_url(file_urls: Optional[str], file_path: str) -> str:
+    """Liste "a,b,c" des fichiers sources, file_path ajouté s'il n'y est pas"""
+    if not file_urls:
+        return file_path
+    return file_urls if file_path in file_urls.split(",") else f"{file_urls},{file_path}"
+
+
+def merged_file_urls(table, excluded):
+    """
+    add_file_url en SQL pour ON CONFLICT DO UPDATE. Comparaison élément par
+    élément (",liste," LIKE "%,fichier,%"), _ et % du nom de fichier échappés:
+    un autre fichier n'est jamais pris pour celui-ci.
+    """
+    escaped = func.replace(func.replace(func.replace(excluded.file_urls, "\\", "\\\\"), "%", "\\%"), "_", "\\_")
+    listed = (literal(",") + table.c.file_urls + ",").like(literal("%,") + escaped + ",%", escape="\\")
+    return case(
+        (table.c.file_urls.is_(None), excluded.file_urls),
+        (listed, table.c.file_urls),
+        else_=table.c.file_urls + "," + excluded.file_urls,
+    )
+
+
+def upsert_bank(db: Session, data: dict, file_path: str) -> int:
+    """
+    INSERT ... ON CONFLICT (bank_key, fiscal_year) DO UPDATE pour un exercice.
+
+    Règles de fusion champ par champ:
+    - montants et ratios publiés: la nouvelle valeur non nulle l'emporte,
+      sinon la valeur existante est conservée
+    - total_assets: une valeur absente (0) n'écrase pas l'existant
+    - bank_name / country: le libellé déjà en base est conservé (même bank_key)
+    - file_urls: le nouveau fichier est ajouté à la liste s'il n'y est pas
+
+    Returns:
+        int: id de la ligne insérée ou mise à jour
+    """
+    bank = build_bank(data, file_path)
+    insert = _insert_for(db)
+
+    if insert is None:
+        # Dialecte sans ON CONFLICT: lecture puis mise à jour
+        existing = find_bank(db, bank.bank_key, bank.fiscal_year)
+        if existing:
+            apply_extracted_data(existing, data)
+            existing.file_urls = add_file_url(existing.file_urls, file_path)
+            bank = existing
+        else:
+            db.add(bank)
+        db.flush()
+        return bank.id
+
+    values = {
+        column: getattr(bank, column)
+        for column in ["bank_key", "country_key", "bank_name", "country", "fiscal_year", "currency", "file_urls",
+                       "total_assets"]
+        + EXTRACTED_FIELDS
+    }
+    stmt = insert(BankDB).values(**values)
+    table = BankDB.__table__
+    excluded = stmt.excluded
+
+    update = {field: func.coalesce(excluded[field], table.c[field]) for field in EXTRACTED_FIELDS}
+    update.update({
+        "currency": func.coalesce(excluded.currency, table.c.currency),
+        "total_assets": case((excluded.total_assets == 0, table.c.total_assets), else_=excluded.total_assets),
+        "file_urls": merged_file_urls(table, excluded),
+        # onupdate n'est pas appliqué par un INSERT ... ON CONFLICT
+        "updated_date": func.now(),
+    })
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["bank_key", "fiscal_year"],
+        set_=update,
+    ).returning(BankDB.id)
+    return db.execute(stmt).scalar_one()
+
+
+def save_extracted_periods(db: Session, extracted_data: dict, file_path: str) -> List[BankDB]:
+    """
+    Upsert d'un BankDB par exercice présent dans le document, puis calcul
+    des ratios (avec l'exercice précédent pour les moyennes).
+
+    Returns:
+        list: Les BankDB sauvegardés, du plus ancien au plus récent
+    """
+    banks = []
+    for period in split_periods(extracted_data):
+        bank_id = upsert_bank(db, period, file_path)
+        bank = db.query(BankDB).populate_existing().filter(BankDB.id == bank_id).one()
+
+        # Ratios publiés (non persistés) repris pour la réponse
+        for field in REPORTED_PERCENT_FIELDS:
+            if period.get(field):
+                setattr(bank, field, period[field] / 100)
+
+        # Exercices traités dans l'ordre chronologique: N-1 est déjà en base
+        statement = calculate_all_ratios(FinancialStatement.from_bank(bank), find_previous_period(db, bank))
+        statement.apply_to(bank, RATIO_FORMULAS)
+        db.flush()
+        banks.append(bank)
+
+    db.commit()
+    for bank in banks:
+        db.refresh(bank)
+    return banks
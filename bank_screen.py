@@ -0,0 +1,250 @@
+"""
+Moteur de filtrage/classement sectoriel pour POST /banks/screen.
+
+Une spécification JSON (filtres + tris sur une liste blanche de colonnes de
+BankDB) est compilée en une seule requête SQL paramétrée, qui s'appuie sur les
+index (fiscal_year, ratio) des ratios les plus filtrés et (country_key,
+fiscal_year) du pays.
+
+Exemple: banques de Côte d'Ivoire avec NPL > 10% et CAR < 12% en 2023, par ROAE:
+    {
+        "filters": [
+            {"field": "country", "op": "=", "value": "Côte d'Ivoire"},
+            {"field": "fiscal_year", "op": "=", "value": "2023"},
+            {"field": "npl_ratio", "op": ">", "value": 0.10},
+            {"field": "car_regulatory", "op": "<", "value": 12}
+        ],
+        "sort": [{"field": "roae", "direction": "desc"}]
+    }
+"""
+import json
+from typing import Iterator
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from bank_identity import normalize_country
+from models import BankDB, HISTORY_AMOUNT_FIELDS, RATIO_FIELDS
+from rating_methodology import get_methodology
+
+# Colonnes autorisées dans les filtres, tris et projections
+NUMERIC_FIELDS = set(RATIO_FIELDS + HISTORY_AMOUNT_FIELDS)
+TEXT_FIELDS = {"bank_key", "bank_name", "country", "currency", "fiscal_year"}
+SCREEN_FIELDS = NUMERIC_FIELDS | TEXT_FIELDS | {"id"}
+
+DEFAULT_FIELDS = ["id", "bank_key", "bank_name", "country", "fiscal_year"] + HISTORY_AMOUNT_FIELDS + RATIO_FIELDS
+
+OPERATORS = {
+    "=": lambda col, v: col == v,
+    "!=": lambda col, v: col != v,
+    ">": lambda col, v: col > v,
+    ">=": lambda col, v: col >= v,
+    "<": lambda col, v: col < v,
+    "<=": lambda col, v: col <= v,
+    "in": lambda col, v: col.in_(v),
+    "between": lambda col, v: col.between(v[0], v[1]),
+    "is_null": lambda col, v: col.is_(None),
+    "not_null": lambda col, v: col.isnot(None),
+}
+
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+
+def _check_value(field: str, op: str, value):
+    """Valide le type de la valeur selon la colonne et l'opérateur"""
+    if op in ("is_null", "not_null"):
+        return None
+    if op in ("in", "between"):
+        if not isinstance(value, list) or not value or (op == "between" and len(value) != 2):
+            raise ValueError(f"'{op}' attend une liste de valeurs ({field})")
+        return [_check_value(field, "=", v) for v in value]
+    if field in NUMERIC_FIELDS:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Valeur numérique attendue pour {field}: {value!r}")
+        return value
+    return str(value)
+
+
+def _condition(flt: dict):
+    field, op = flt.get("field"), flt.get("op", "=")
+    if field not in SCREEN_FIELDS:
+        raise ValueError(f"Champ non filtrable: {field}")
+    if op not in OPERATORS:
+        raise ValueError(f"Opérateur inconnu: {op} (attendu: {', '.join(OPERATORS)})")
+    value = _check_value(field, op, flt.get("value"))
+
+    if field == "country" and op in ("=", "!=", "in"):
+        # Le libellé varie ("Côte d'Ivoire", "Cote d'Ivoire"...): on compare
+        # le pays normalisé (index ix_banks_screen_country)
+        values = value if op == "in" else [value]
+        condition = BankDB.country_key.in_(sorted({normalize_country(v) for v in values}))
+        return ~condition if op == "!=" else condition
+
+    return OPERATORS[op](getattr(BankDB, field), value)
+
+
+def build_conditions(filters: list) -> list:
+    """Conditions SQL d'une liste de filtres (partagé avec GET /banks et l'export)"""
+    return [_condition(flt) for flt in filters or []]
+
+
+def listing_filters(country: str = None, fiscal_year: str = None, bank_key: str = None,
+                    currency: str = None) -> list:
+    """Filtres simples des routes de liste (paramètres de requête) au format screen"""
+    params = {"country": country, "fiscal_year": fiscal_year, "bank_key": bank_key, "currency": currency}
+    return [{"field": field, "op": "=", "value": value} for field, value in params.items() if value]
+
+
+def compile_screen(spec: dict):
+    """
+    Compile la spécification en requête SELECT (sans pagination).
+
+    Raises:
+        ValueError: champ, opérateur ou valeur invalide
+    """
+    fields = spec.get("fields") or DEFAULT_FIELDS
+    unknown = [f for f in fields if f not in SCREEN_FIELDS]
+    if unknown:
+        raise ValueError(f"Champs inconnus: {', '.join(unknown)}")
+
+    stmt = select(*[getattr(BankDB, f).label(f) for f in fields])
+
+    conditions = build_conditions(spec.get("filters"))
+
+    if spec.get("latest_only"):
+        # Dernier exercice de chaque banque uniquement
+        latest = (
+            select(BankDB.bank_key, func.max(BankDB.fiscal_year).label("fiscal_year"))
+            .group_by(BankDB.bank_key)
+            .subquery()
+        )
+        stmt = stmt.join(latest, and_(
+            BankDB.bank_key == latest.c.bank_key,
+            BankDB.fiscal_year == latest.c.fiscal_year,
+        ))
+
+    if conditions:
+        stmt = stmt.where(and_(*conditions))
+
+    order_by = []
+    for sort in spec.get("sort") or []:
+        field = sort.get("field")
+        if field not in SCREEN_FIELDS:
+            raise ValueError(f"Champ non triable: {field}")
+        column = getattr(BankDB, field)
+        direction = (sort.get("direction") or "asc").lower()
+        if direction not in ("asc", "desc"):
+            raise ValueError(f"Direction de tri invalide: {direction}")
+        order_by.append((column.desc() if direction == "desc" else column.asc()).nulls_last())
+    order_by.append(BankDB.id.asc())  # Ordre stable pour la pagination
+
+    return stmt.order_by(*order_by)
+
+
+def screen_banks(db: Session, spec: dict, limit: int = 100, offset: int = 0) -> dict:
+    """Page de résultats + total"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    offset = max(0, offset)
+    stmt = compile_screen(spec)
+
+    total = db.execute(select(func.count()).select_from(stmt.order_by(None).subquery())).scalar_one()
+    rows = db.execute(stmt.limit(limit).offset(offset)).mappings().all()
+
+    next_offset = offset + limit if offset + limit < total else None
+    return {
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": next_offset,
+        "results": [dict(row) for row in rows],
+    }
+
+
+def stream_screen(session_factory, spec: dict) -> Iterator[str]:
+    """
+    Résultats en NDJSON (une banque-exercice par ligne), lus par lots via
+    yield_per dans une session dédiée: la mémoire reste constante quel que
+    soit le nombre de lignes.
+    """
+    stmt = compile_screen(spec)  # Erreurs de spécification levées avant le streaming
+    rows = _iter_rows(session_factory, stmt)
+    return (json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows)
+
+
+def _iter_rows(session_factory, stmt) -> Iterator[dict]:
+    db = session_factory()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=STREAM_BATCH_SIZE)).mappings()
+        for row in result:
+            yield dict(row)
+    finally:
+        db.close()
+
+
+# ===== RE-NOTATION SECTORIELLE =====
+
+def _rating_value(value):
+    return None if value != value else int(value)  # NaN → None
+
+
+def rerate_sector(db: Session, methodology_id: str, filters: list = None, latest_only: bool = False,
+                  compare_to: str = None) -> dict:
+    """
+    Note toutes les banques-exercices filtrées avec une méthodologie, en une
+    requête (seules les colonnes utiles) et une passe vectorisée.
+
+    Avec compare_to, ajoute la matrice de transition des ratings composites
+    (compare_to → methodology_id), par ex. pour mesurer l'impact d'une nouvelle
+    méthodologie sur le secteur.
+
+    Raises:
+        KeyError: méthodologie inconnue
+        ValueError: filtre invalide
+    """
+    methodology = get_methodology(methodology_id)
+    baseline = get_methodology(compare_to) if compare_to else None
+    ratio_fields = sorted(set(methodology.fields) | set(baseline.fields if baseline else []))
+
+    stmt = compile_screen({
+        "fields": ["id", "bank_key", "fiscal_year"] + ratio_fields,
+        "filters": filters,
+        "latest_only": latest_only,
+    })
+    rows = db.execute(stmt).all()
+    columns = {field: [getattr(row, field) for row in rows] for field in ratio_fields}
+
+    ratings = methodology.rate_columns(columns) if rows else {}
+    base_ratings = baseline.rate_columns(columns) if rows and baseline else {}
+
+    distribution = {}
+    transitions = {}
+    banks = []
+    for i, row in enumerate(rows):
+        pillars = {pillar: _rating_value(values[i]) for pillar, values in ratings.items()}
+        composite = pillars.pop("composite")
+        distribution[str(composite)] = distribution.get(str(composite), 0) + 1
+        entry = {"bank_id": row.id, "bank_key": row.bank_key, "fiscal_year": row.fiscal_year,
+                 "pillars": pillars, "composite_rating": composite}
+        if baseline:
+            previous = _rating_value(base_ratings["composite"][i])
+            entry["baseline_composite_rating"] = previous
+            bucket = transitions.setdefault(str(previous), {})
+            bucket[str(composite)] = bucket.get(str(composite), 0) + 1
+        banks.append(entry)
+
+    result = {
+        "methodology": methodology.id,
+        "count": len(banks),
+        "distribution": distribution,
+        "banks": banks,
+    }
+    if baseline:
+        changed = [b for b in banks if b["composite_rating"] != b["baseline_composite_rating"]]
+        result.update({
+            "compare_to": baseline.id,
+            "transitions": transitions,
+            "changed": len(changed),
+            "downgrades": sum(1 for b in changed if (b["composite_rating"] or 0) > (b["baseline_composite_rating"] or 0)),
+        })
+    return result
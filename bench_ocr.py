@@ -0,0 +1,147 @@
+"""
+Benchmark de l'OCR: pages brutes (ancien chemin) vs prétraitement de ocr.py.
+
+Les PDF de uploads/ ont une couche texte: elle sert de référence. Chaque page
+est rendue en image (OCR_DPI), dégradée comme un scan (inclinaison
+aléatoire, bruit, bords noirs; --no-degrade pour la garder propre), puis lue
+par Tesseract avec et sans prétraitement. On mesure:
+- le temps (prétraitement + Tesseract) par page
+- la précision numérique: part des montants de la couche texte retrouvés
+  à l'identique dans le texte OCR
+- l'erreur d'estimation de l'inclinaison
+
+Sans Tesseract installé, seuls le prétraitement et l'inclinaison sont mesurés.
+
+Usage:
+    python bench_ocr.py [--dpi 150] [--seed 0] [--no-degrade] [dossier]
+"""
+import argparse
+import os
+import re
+import shutil
+import time
+from collections import Counter
+
+import numpy as np
+from PIL import Image
+
+import ocr
+import pdf_text
+from bench_pdf_text import unique_pdfs
+
+# Montants: groupes de milliers séparés par espace/point (1 234 567, 1.234.567) ou nombre simple
+AMOUNT = re.compile(r"\d{1,3}(?:[ .\u00a0\u202f]\d{3})+(?:,\d+)?|\d+(?:,\d+)?")
+
+
+def amounts(text: str) -> Counter:
+    """Montants d'au moins 3 chiffres, séparateurs de milliers retirés"""
+    found = (re.sub(r"[ .\u00a0\u202f]", "", match) for match in AMOUNT.findall(text))
+    return Counter(value for value in found if sum(c.isdigit() for c in value) >= 3)
+
+
+def numeric_recall(reference: Counter, text: str) -> tuple:
+    """(montants de référence retrouvés, montants de référence)"""
+    return sum((reference & amounts(text)).values()), sum(reference.values())
+
+
+def render_pages(path: str, dpi: int) -> list:
+    """Pages du PDF en images (pdf2image comme en production, sinon pypdfium2)"""
+    try:
+        from pdf2image import convert_from_path
+        return convert_from_path(path, dpi=dpi)
+    except ImportError:
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(path)
+        try:
+            return [pdf[i].render(scale=dpi / 72).to_pil() for i in range(len(pdf))]
+        finally:
+            pdf.close()
+
+
+def degrade(image: Image.Image, rng: np.random.Generator) -> tuple:
+    """Simule un scan: inclinaison de ±3°, 1% de bruit poivre et sel, bords noirs"""
+    angle = round(float(rng.uniform(-3, 3)), 2)
+    gray = np.asarray(image.convert("L").rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)).copy()
+    noise = rng.random(gray.shape)
+    gray[noise < 0.005] = 0
+    gray[noise > 0.995] = 255
+    gray[:, :20] = 30
+    gray[:25, :] = 30
+    return Image.fromarray(gray), angle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR: brut vs prétraité")
+    parser.add_argument("folder", nargs="?", default="uploads")
+    parser.add_argument("--dpi", type=int, default=ocr.OCR_DPI)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-degrade", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        import pytesseract  # noqa: F401
+        has_tesseract = shutil.which("tesseract") is not None
+    except ImportError:
+        has_tesseract = False
+    if not has_tesseract:
+        print("⚠️  Tesseract non installé: prétraitement et inclinaison seulement\n")
+
+    rng = np.random.default_rng(args.seed)
+    totals = {mode: {"seconds": 0.0, "found": 0, "expected": 0, "pages": 0} for mode in ("brut", "prétraité")}
+    skew_errors = []
+    preprocess_ms = []
+    skipped = 0
+
+    print(f"{'fichier':<40} {'page':>4} {'angle':>6} {'estimé':>7} {'prétr. (ms)':>11} "
+          f"{'brut (s)':>9} {'prétr. (s)':>10} {'montants brut':>14} {'prétr.':>8}")
+    print("=" * 118)
+
+    for path in unique_pdfs(args.folder):
+        name = os.path.basename(path)[:39]
+        references = [amounts(text) for text in pdf_text.extract_pdf_pages(path, workers=1)]
+        for i, image in enumerate(render_pages(path, args.dpi)):
+            angle = 0.0
+            if not args.no_degrade:
+                image, angle = degrade(image, rng)
+
+            started = time.perf_counter()
+            cleaned, stats = ocr.preprocess_page(image)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            preprocess_ms.append(elapsed_ms)
+            if cleaned is None:
+                skipped += 1
+            elif not stats["photo"]:
+                skew_errors.append(abs(stats["skew"] - angle))
+            estimated = "blanc" if cleaned is None else f"{stats['skew']:.2f}"
+
+            row = f"{name:<40} {i + 1:>4} {angle:>6.2f} {estimated:>7} {elapsed_ms:>11.0f}"
+            if has_tesseract:
+                cells = {}
+                for mode, preprocess in (("brut", False), ("prétraité", True)):
+                    started = time.perf_counter()
+                    text, _ = ocr.ocr_image(image, preprocess=preprocess)
+                    seconds = time.perf_counter() - started
+                    found, expected = numeric_recall(references[i], text)
+                    total = totals[mode]
+                    total["seconds"] += seconds
+                    total["found"] += found
+                    total["expected"] += expected
+                    total["pages"] += 1
+                    cells[mode] = (seconds, f"{found}/{expected}")
+                row += (f" {cells['brut'][0]:>9.2f} {cells['prétraité'][0]:>10.2f}"
+                        f" {cells['brut'][1]:>14} {cells['prétraité'][1]:>8}")
+            print(row)
+        print("-" * 118)
+
+    print(f"\nPrétraitement: {np.mean(preprocess_ms):.0f} ms/page en moyenne, {skipped} page(s) blanche(s) ignorée(s)")
+    if skew_errors:
+        print(f"Inclinaison: erreur moyenne {np.mean(skew_errors):.2f}°, max {np.max(skew_errors):.2f}°")
+    if has_tesseract:
+        for mode, total in totals.items():
+            recall = total["found"] / total["expected"] if total["expected"] else 0.0
+            print(f"{mode:<10} {total['seconds']:>8.1f} s ({total['seconds'] / max(total['pages'], 1):.2f} s/page), "
+                  f"montants retrouvés {total['found']}/{total['expected']} ({recall:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark de l'extraction de texte PDF sur les fichiers de uploads/.
+
+Compare l'ancien chemin (PyPDF2 + concaténation +=) aux backends de pdf_text.
+
+Usage:
+    python bench_pdf_text.py [--repeat 3] [--workers 4] [dossier]
+"""
+import argparse
+import glob
+import hashlib
+import os
+import time
+
+import pdf_text
+
+
+def legacy_pypdf2(file_path: str) -> str:
+    """Chemin historique de llm_service (référence)"""
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(file_path)
+    text = ""
+    for page in reader.pages:
+        text += page.extract_text()
+    return text
+
+
+def unique_pdfs(folder: str) -> list:
+    """Un seul fichier par contenu identique (uploads/ contient beaucoup de copies)"""
+    seen = {}
+    for path in sorted(glob.glob(os.path.join(folder, "*.pdf"))):
+        with open(path, "rb") as f:
+            digest = hashlib.md5(f.read()).hexdigest()
+        seen.setdefault(digest, path)
+    return list(seen.values())
+
+
+def timed(fn, repeat: int):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extraction texte PDF")
+    parser.add_argument("folder", nargs="?", default="uploads")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=pdf_text.PDF_TEXT_WORKERS)
+    args = parser.parse_args()
+
+    modules = {"pypdf2": "PyPDF2", "pypdfium2": "pypdfium2", "pdfminer": "pdfminer"}
+    candidates = [("legacy pypdf2 +=", legacy_pypdf2)]
+    for backend in pdf_text.BACKENDS:
+        try:
+            __import__(modules[backend])
+        except ImportError:
+            print(f"⚠️  Backend {backend} non installé, ignoré")
+            continue
+        # PyPDF2 n'a pas de mode layout
+        for layout in ((False,) if backend == "pypdf2" else (False, True)):
+            label = f"{backend}{' layout' if layout else ''}"
+            candidates.append((
+                label,
+                lambda f, b=backend, l=layout: "\n\n".join(
+                    pdf_text.extract_pdf_pages(f, backend=b, layout=l, workers=args.workers)
+                ),
+            ))
+
+    files = unique_pdfs(args.folder)
+    print(f"📄 {len(files)} PDF(s) distinct(s), meilleur temps sur {args.repeat} essai(s)\n")
+    print(f"{'fichier':<45} {'backend':<20} {'pages':>5} {'temps (s)':>10} {'chars':>8}")
+    print("=" * 92)
+
+    for path in files:
+        n_pages = pdf_text.count_pages(path, "pypdf2")
+        name = os.path.basename(path)[:44]
+        for label, fn in candidates:
+            elapsed, text = timed(lambda: fn(path), args.repeat)
+            print(f"{name:<45} {label:<20} {n_pages:>5} {elapsed:>10.3f} {len(text):>8}")
+        print("-" * 92)
+
+
+if __name__ == "__main__":
+    main()
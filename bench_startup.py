@@ -0,0 +1,95 @@
+"""
+Benchmark du démarrage à froid de l'API (import de main).
+
+Chaque essai importe main dans un processus Python neuf avec -X importtime,
+puis vérifie qu'aucune dépendance d'extraction (anthropic, PDF, OCR, numpy...)
+n'a été chargée: elles doivent l'être au premier usage ou par EXTRACTION_WARM_UP.
+
+Code de sortie 1 si la médiane dépasse la cible ou si un module lourd est importé
+(utilisable en CI).
+
+Usage:
+    python bench_startup.py [--repeat 5] [--target-ms 1000] [--top 15]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from statistics import median
+
+STARTUP_TARGET_MS = float(os.getenv("STARTUP_TARGET_MS", "1000"))
+
+# Modules qui ne doivent pas être chargés par l'import de main
+HEAVY_MODULES = [
+    "anthropic", "PyPDF2", "pypdfium2", "pdfminer", "pdf2image", "pytesseract", "PIL",
+    "numpy", "pyarrow", "openpyxl",
+]
+
+PROBE = (
+    "import sys, json; import main; "
+    f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+)
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def run_once() -> dict:
+    """Un import à froid: temps total, modules les plus coûteux, modules lourds chargés"""
+    env = {**os.environ, "ANTHROPIC_API_KEY": os.getenv("ANTHROPIC_API_KEY", "bench")}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    total_us = 0
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), (len(match.group(3)) - 1) // 2, match.group(4)
+        if name == "main":
+            total_us = cumulative
+        elif depth == 1:
+            modules.append((cumulative, name))
+    return {
+        "total_ms": total_us / 1000,
+        "modules": sorted(modules, reverse=True),
+        "heavy": json.loads(completed.stdout.strip().splitlines()[-1]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage à froid de l'API")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=STARTUP_TARGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.repeat)]
+    totals = [run["total_ms"] for run in runs]
+    heavy = sorted({module for run in runs for module in run["heavy"]})
+
+    print(f"🚀 import main: médiane {median(totals):.0f} ms "
+          f"(min {min(totals):.0f}, max {max(totals):.0f}) sur {args.repeat} essai(s), cible {args.target_ms:.0f} ms\n")
+    print(f"{'module (import direct de main)':<40} {'cumulé (ms)':>12}")
+    print("=" * 53)
+    for cumulative, name in runs[-1]["modules"][:args.top]:
+        print(f"{name:<40} {cumulative / 1000:>12.1f}")
+
+    failed = False
+    if heavy:
+        print(f"\n❌ Modules lourds importés au démarrage: {', '.join(heavy)}")
+        failed = True
+    if median(totals) > args.target_ms:
+        print(f"\n❌ Démarrage au-dessus de la cible ({median(totals):.0f} > {args.target_ms:.0f} ms)")
+        failed = True
+    if not failed:
+        print("\n✅ Démarrage dans la cible, aucune dépendance d'extraction chargée")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
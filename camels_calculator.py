@@ -2,6 +2,13 @@
 CAMELS Calculator - Calcule automatiquement tous les ratios bancaires
 Compatible avec les objets SQLAlchemy BankDB
 """
+import logging
+
+from app_logging import get_logger
+from rating_methodology import get_methodology
+
+logger = get_logger("camels_calculator")
+
 
 def calculate_all_ratios(bank, prev_bank=None):
     """
@@ -14,156 +21,249 @@ def calculate_all_ratios(bank, prev_bank=None):
     Returns:
         L'objet bank avec tous les ratios calculés
     """
-    print("=" * 80)
-    print("DÉBUT CALCUL RATIOS")
-    print(f"Banque: {getattr(bank, 'bank_name', 'Unknown')}")
-    print(f"Total Assets: {getattr(bank, 'total_assets', None)}")
-    print(f"Total Equity: {getattr(bank, 'total_equity', None)}")
-    print(f"Gross Loans: {getattr(bank, 'gross_loans', None)}")
-    print(f"NPLs: {getattr(bank, 'npls_mn', None)}")
-    print(f"LLR: {getattr(bank, 'llr_mn', None)}")
-    print(f"Loan Loss Provisions: {getattr(bank, 'loan_loss_provisions', None)}")
-    print("=" * 80)
-    # Fonction helper pour récupérer les valeurs
-    def get_val(obj, attr, default=0):
-        val = getattr(obj, attr, None)
-        return val if val is not None else default
-    
-    # Calcul des moyennes
-    avg_assets = _calculate_average(get_val(bank, 'total_assets'), 
-                                     get_val(prev_bank, 'total_assets') if prev_bank else None)
-    avg_equity = _calculate_average(get_val(bank, 'total_equity'), 
-                                     get_val(prev_bank, 'total_equity') if prev_bank else None)
-    avg_gross_loans = _calculate_average(get_val(bank, 'gross_loans'), 
-                                         get_val(prev_bank, 'gross_loans') if prev_bank else None)
-    
+    calculate_ratios(bank, prev_bank)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("ratios calculés", extra={
+            "bank_name": getattr(bank, 'bank_name', None),
+            "has_previous": prev_bank is not None,
+            **{name: getattr(bank, name) for name in ('equity_assets', 'npl_ratio', 'roaa', 'roae')},
+        })
+    return bank
+
+
+def calculate_ratios(bank, prev_bank=None, ratios=None):
+    """
+    Calcule les ratios demandés (tous par défaut) dans l'ordre du graphe
+    RATIO_FORMULAS; les autres ratios de bank ne sont pas modifiés.
+
+    Args:
+        ratios: noms de ratios à recalculer (voir affected_ratios)
+    """
+    inputs = _Inputs(bank, prev_bank)
+    for name, (_, formula) in RATIO_FORMULAS.items():
+        if ratios is None or name in ratios:
+            setattr(bank, name, formula(inputs))
+    return bank
+
+
+def affected_ratios(changed_fields, previous_changed=()):
+    """
+    Ratios à recalculer après modification de montants.
+
+    Args:
+        changed_fields: montants modifiés de l'exercice
+        previous_changed: montants modifiés de l'exercice N-1 (seules les
+            moyennes en dépendent)
+
+    Returns:
+        list: noms de ratios, dans l'ordre de calcul
+    """
+    dirty = set(changed_fields)
+    dirty.update(name for name, field in AVERAGES.items() if field in previous_changed)
+    # Les deux tables sont déclarées dans l'ordre topologique: une passe suffit
+    for name, (dependencies, _) in list(INTERMEDIATES.items()) + list(RATIO_FORMULAS.items()):
+        if dirty.intersection(dependencies):
+            dirty.add(name)
+    return [name for name in RATIO_FORMULAS if name in dirty]
+
+
+class _Inputs:
+    """Montants (0 si absents), intermédiaires (calculés une fois) et ratios déjà calculés"""
+
+    __slots__ = ("bank", "prev_bank", "cache")
+
+    def __init__(self, bank, prev_bank):
+        self.bank = bank
+        self.prev_bank = prev_bank
+        self.cache = {}
+
+    def __getitem__(self, name):
+        if name in RATIO_FORMULAS:
+            return getattr(self.bank, name, None)
+        if name in INTERMEDIATES:
+            if name not in self.cache:
+                self.cache[name] = INTERMEDIATES[name][1](self)
+            return self.cache[name]
+        return _get_val(self.bank, name)
+
+    def average(self, field):
+        return _calculate_average(self[field], _get_val(self.prev_bank, field) if self.prev_bank else None)
+
+
+def _get_val(obj, attr, default=0):
+    """Valeur d'un montant (default si absent)"""
+    val = getattr(obj, attr, None)
+    return val if val is not None else default
+
+
+def _llr(v):
+    # LLR (Loan Loss Reserves): à défaut, provisions du bilan (négatives)
+    llr = v['llr_mn']
+    if llr == 0 and v['loan_loss_provisions'] != 0:
+        llr = -v['loan_loss_provisions']
+    return llr
+
+
+# ========== GRAPHE DE DÉPENDANCES ==========
+
+# Moyennes N/N-1 -> montant moyenné
+AVERAGES = {
+    'avg_assets': 'total_assets',
+    'avg_equity': 'total_equity',
+    'avg_gross_loans': 'gross_loans',
+}
+
+# Intermédiaires: nom -> (dépendances, calcul)
+INTERMEDIATES = {
+    **{name: ((field,), lambda v, field=field: v.average(field)) for name, field in AVERAGES.items()},
+    'liquid_assets': (
+        ('cash_reserves_requirements', 'due_from_banks', 'investment_securities'),
+        lambda v: v['cash_reserves_requirements'] + v['due_from_banks'] + v['investment_securities'],
+    ),
+    'problem_assets': (('npls_mn', 'foreclosed_assets'), lambda v: v['npls_mn'] + v['foreclosed_assets']),
+    'llr': (('llr_mn', 'loan_loss_provisions'), _llr),
+    'non_interest_income': (
+        ('non_interest_income_commissions', 'net_income_investment', 'other_net_income'),
+        lambda v: v['non_interest_income_commissions'] + v['net_income_investment'] + v['other_net_income'],
+    ),
+}
+
+# Ratios: nom -> (dépendances, calcul), dans l'ordre de calcul
+RATIO_FORMULAS = {
     # ========== SOLVENCY RATIOS ==========
-    bank.equity_assets = _safe_divide(get_val(bank, 'total_equity'), 
-                                      get_val(bank, 'total_assets'))
-    
+    'equity_assets': (
+        ('total_equity', 'total_assets'),
+        lambda v: _safe_divide(v['total_equity'], v['total_assets']),
+    ),
+
     # ========== LIQUIDITY RATIOS ==========
-    bank.cash_reserves_assets = _safe_divide(get_val(bank, 'cash_reserves_requirements'), 
-                                             get_val(bank, 'total_assets'))
-    
-    liquid_assets = sum([
-        get_val(bank, 'cash_reserves_requirements'),
-        get_val(bank, 'due_from_banks'),
-        get_val(bank, 'investment_securities')
-    ])
-    bank.liquid_assets_assets = _safe_divide(liquid_assets, get_val(bank, 'total_assets'))
-    
-    bank.gross_loans_deposits = _safe_divide(get_val(bank, 'gross_loans'), 
-                                             get_val(bank, 'deposits'))
-    
+    'cash_reserves_assets': (
+        ('cash_reserves_requirements', 'total_assets'),
+        lambda v: _safe_divide(v['cash_reserves_requirements'], v['total_assets']),
+    ),
+    'liquid_assets_assets': (
+        ('liquid_assets', 'total_assets'),
+        lambda v: _safe_divide(v['liquid_assets'], v['total_assets']),
+    ),
+    'gross_loans_deposits': (
+        ('gross_loans', 'deposits'),
+        lambda v: _safe_divide(v['gross_loans'], v['deposits']),
+    ),
+
     # ========== ASSET QUALITY ==========
-    npls = get_val(bank, 'npls_mn')
-    foreclosed_assets = get_val(bank, 'foreclosed_assets')
-    problem_assets = npls + foreclosed_assets
-    
-    bank.problem_assets_mn = problem_assets
-    
-    # LLR (Loan Loss Reserves)
-    llr = get_val(bank, 'llr_mn')
-    if llr == 0 and get_val(bank, 'loan_loss_provisions') != 0:
-        llr = -get_val(bank, 'loan_loss_provisions')
-    
+    'problem_assets_mn': (('problem_assets',), lambda v: v['problem_assets']),
     # NPA Ratio = Problem Assets / (Gross Loans + Foreclosed Assets)
-    npa_denominator = get_val(bank, 'gross_loans') + foreclosed_assets
-    bank.npa_ratio = _safe_divide(problem_assets, npa_denominator)
-    
+    'npa_ratio': (
+        ('problem_assets', 'gross_loans', 'foreclosed_assets'),
+        lambda v: _safe_divide(v['problem_assets'], v['gross_loans'] + v['foreclosed_assets']),
+    ),
     # NPL Ratio = NPLs / Gross Loans
-    bank.npl_ratio = _safe_divide(npls, get_val(bank, 'gross_loans'))
-    
+    'npl_ratio': (('npls_mn', 'gross_loans'), lambda v: _safe_divide(v['npls_mn'], v['gross_loans'])),
     # LLR / Average Loan
-    bank.llr_avg_loan = _safe_divide(llr, avg_gross_loans)
-    
+    'llr_avg_loan': (('llr', 'avg_gross_loans'), lambda v: _safe_divide(v['llr'], v['avg_gross_loans'])),
     # Coverage Ratio = LLR / NPLs
-    bank.coverage_ratio = _safe_divide(llr, npls) if npls > 0 else None
-    
+    'coverage_ratio': (
+        ('llr', 'npls_mn'),
+        lambda v: _safe_divide(v['llr'], v['npls_mn']) if v['npls_mn'] > 0 else None,
+    ),
     # OLER = (Problem Assets - LLR) / Equity
-    bank.oler = _safe_divide(problem_assets - llr, get_val(bank, 'total_equity'))
-    
+    'oler': (
+        ('problem_assets', 'llr', 'total_equity'),
+        lambda v: _safe_divide(v['problem_assets'] - v['llr'], v['total_equity']),
+    ),
+
     # ========== PROFITABILITY RATIOS ==========
-    
     # Net Interest Margin = Net Interest Income / Avg Assets
-    bank.net_interest_margin = _safe_divide(get_val(bank, 'net_interest_income'), avg_assets)
-    
+    'net_interest_margin': (
+        ('net_interest_income', 'avg_assets'),
+        lambda v: _safe_divide(v['net_interest_income'], v['avg_assets']),
+    ),
     # Net Interest Spread = Yield on Assets - Cost of Liabilities
-    yield_on_assets = _safe_divide(get_val(bank, 'interest_income'), 
-                                    get_val(bank, 'total_assets'))
-    cost_of_liabilities = _safe_divide(get_val(bank, 'interest_expenses'), 
-                                        get_val(bank, 'total_liabilities'))
-    bank.net_interest_spread = (yield_on_assets or 0) - (cost_of_liabilities or 0)
-    
-    # Non-Interest Income
-    non_interest_income = sum([
-        get_val(bank, 'non_net_interest_income_commissions'),
-        get_val(bank, 'net_income_from_investment'),
-        get_val(bank, 'other_net_income')
-    ])
-    
-    bank.non_interest_income_assets = _safe_divide(non_interest_income, avg_assets)
-    
+    'net_interest_spread': (
+        ('interest_income', 'total_assets', 'interest_expenses', 'total_liabilities'),
+        lambda v: (_safe_divide(v['interest_income'], v['total_assets']) or 0)
+        - (_safe_divide(v['interest_expenses'], v['total_liabilities']) or 0),
+    ),
+    'non_interest_income_assets': (
+        ('non_interest_income', 'avg_assets'),
+        lambda v: _safe_divide(v['non_interest_income'], v['avg_assets']),
+    ),
     # Interest Earning Assets Yield
-    interest_earning_assets = get_val(bank, 'gross_loans') + get_val(bank, 'investment_securities')
-    bank.interest_earning_assets_yield = _safe_divide(get_val(bank, 'interest_income'), 
-                                                       interest_earning_assets)
-    
+    'interest_earning_assets_yield': (
+        ('interest_income', 'gross_loans', 'investment_securities'),
+        lambda v: _safe_divide(v['interest_income'], v['gross_loans'] + v['investment_securities']),
+    ),
     # Cost of Funds
-    bank.cost_of_funds = _safe_divide(get_val(bank, 'interest_expenses'), 
-                                       get_val(bank, 'total_liabilities'))
-    
+    'cost_of_funds': (
+        ('interest_expenses', 'total_liabilities'),
+        lambda v: _safe_divide(v['interest_expenses'], v['total_liabilities']),
+    ),
     # Opex / Avg Assets
-    bank.opex_assets = _safe_divide(get_val(bank, 'operating_expenses'), avg_assets)
-    
+    'opex_assets': (
+        ('operating_expenses', 'avg_assets'),
+        lambda v: _safe_divide(v['operating_expenses'], v['avg_assets']),
+    ),
     # Cost to Income Ratio
-    total_income = get_val(bank, 'net_interest_income') + non_interest_income
-    bank.cost_to_income = _safe_divide(get_val(bank, 'operating_expenses'), total_income)
-    
+    'cost_to_income': (
+        ('operating_expenses', 'net_interest_income', 'non_interest_income'),
+        lambda v: _safe_divide(v['operating_expenses'], v['net_interest_income'] + v['non_interest_income']),
+    ),
+
     # ========== DUPONT ANALYSIS ==========
-    
     # (a) Net Interest Income / Avg Assets
-    bank.net_interest_income_assets = _safe_divide(get_val(bank, 'net_interest_income'), avg_assets)
-    
+    'net_interest_income_assets': (
+        ('net_interest_income', 'avg_assets'),
+        lambda v: _safe_divide(v['net_interest_income'], v['avg_assets']),
+    ),
     # (b) Non Interest Income / Avg Assets
-    bank.non_interest_income_assets_dupont = _safe_divide(non_interest_income, avg_assets)
-    
+    'non_interest_income_assets_dupont': (
+        ('non_interest_income', 'avg_assets'),
+        lambda v: _safe_divide(v['non_interest_income'], v['avg_assets']),
+    ),
     # (c) OPEX / Avg Assets
-    bank.opex_assets_dupont = _safe_divide(get_val(bank, 'operating_expenses'), avg_assets)
-    
+    'opex_assets_dupont': (
+        ('operating_expenses', 'avg_assets'),
+        lambda v: _safe_divide(v['operating_expenses'], v['avg_assets']),
+    ),
     # (d) Provision Expenses / Avg Assets
-    bank.provision_expenses_assets = _safe_divide(get_val(bank, 'provision_expenses'), avg_assets)
-    
+    'provision_expenses_assets': (
+        ('provision_expenses', 'avg_assets'),
+        lambda v: _safe_divide(v['provision_expenses'], v['avg_assets']),
+    ),
     # (e) Non Operating Profit (Loss) / Avg Assets
-    bank.non_op_assets = _safe_divide(get_val(bank, 'non_operating_profit_loss'), avg_assets)
-    
+    'non_op_assets': (
+        ('non_operating_profit_loss', 'avg_assets'),
+        lambda v: _safe_divide(v['non_operating_profit_loss'], v['avg_assets']),
+    ),
     # (f) Tax Expenses / Avg Assets
-    bank.tax_expenses_assets = _safe_divide(get_val(bank, 'income_tax'), avg_assets)
-    
+    'tax_expenses_assets': (
+        ('income_tax', 'avg_assets'),
+        lambda v: _safe_divide(v['income_tax'], v['avg_assets']),
+    ),
     # (g) Avg Assets / Avg Equity
-    bank.assets_equity = _safe_divide(avg_assets, avg_equity)
-    
+    'assets_equity': (('avg_assets', 'avg_equity'), lambda v: _safe_divide(v['avg_assets'], v['avg_equity'])),
     # ROAA = a + b - c - d + e - f
-    roaa = sum([
-        bank.net_interest_income_assets or 0,
-        bank.non_interest_income_assets_dupont or 0,
-        -(bank.opex_assets_dupont or 0),
-        -(bank.provision_expenses_assets or 0),
-        bank.non_op_assets or 0,
-        -(bank.tax_expenses_assets or 0)
-    ])
-    bank.roaa = roaa
-    
+    'roaa': (
+        ('net_interest_income_assets', 'non_interest_income_assets_dupont', 'opex_assets_dupont',
+         'provision_expenses_assets', 'non_op_assets', 'tax_expenses_assets'),
+        lambda v: sum([
+            v['net_interest_income_assets'] or 0,
+            v['non_interest_income_assets_dupont'] or 0,
+            -(v['opex_assets_dupont'] or 0),
+            -(v['provision_expenses_assets'] or 0),
+            v['non_op_assets'] or 0,
+            -(v['tax_expenses_assets'] or 0),
+        ]),
+    ),
     # ROAE = ROAA × (Assets / Equity)
-    bank.roae = roaa * (bank.assets_equity or 0)
-    print("=" * 80)
-    print("FIN CALCUL RATIOS")
-    print(f"equity_assets: {bank.equity_assets}")
-    print(f"npl_ratio: {bank.npl_ratio}")
-    print(f"roaa: {bank.roaa}")
-    print(f"roae: {bank.roae}")
-    print("=" * 80)
-    return bank
+    'roae': (('roaa', 'assets_equity'), lambda v: v['roaa'] * (v['assets_equity'] or 0)),
+}
+
+# Montants saisis dont dépend au moins un ratio
+RATIO_INPUT_FIELDS = sorted(
+    {d for deps, _ in list(INTERMEDIATES.values()) + list(RATIO_FORMULAS.values()) for d in deps}
+    - set(INTERMEDIATES) - set(RATIO_FORMULAS)
+)
 
 
 def _calculate_average(current_value, previous_value=None):
@@ -182,112 +282,149 @@ def _safe_divide(numerator, denominator):
     return numerator / denominator
 
 
+# ========== CALCUL VECTORISÉ (IMPORT EN MASSE) ==========
+
+# Montants lus par calculate_all_ratios (mêmes noms d'attributs)
+BATCH_INPUT_FIELDS = [
+    'total_assets', 'total_equity', 'gross_loans', 'cash_reserves_requirements', 'due_from_banks',
+    'investment_securities', 'deposits', 'npls_mn', 'foreclosed_assets', 'llr_mn', 'loan_loss_provisions',
+    'net_interest_income', 'interest_income', 'interest_expenses', 'total_liabilities',
+    'non_interest_income_commissions', 'net_income_investment', 'other_net_income',
+    'operating_expenses', 'provision_expenses', 'non_operating_profit_loss', 'income_tax',
+]
+
+# Montants de l'exercice précédent utilisés pour les moyennes
+BATCH_PREVIOUS_FIELDS = ['total_assets', 'total_equity', 'gross_loans']
+
+
+def calculate_ratios_batch(columns, prev_columns=None):
+    """
+    Version numpy de calculate_all_ratios pour N banques-exercices à la fois.
+
+    Args:
+        columns: dict champ -> liste/array de N valeurs (None = absent)
+        prev_columns: dict champ -> N valeurs de l'exercice précédent
+            (BATCH_PREVIOUS_FIELDS, None si pas d'exercice précédent)
+
+    Returns:
+        dict ratio -> array float de N valeurs (NaN là où calculate_all_ratios renvoie None)
+    """
+    import numpy as np
+
+    n = len(next(iter(columns.values()))) if columns else 0
+
+    def col(source, name):
+        values = (source or {}).get(name)
+        if values is None:
+            return np.zeros(n)
+        return np.array([0.0 if v is None else float(v) for v in values])
+
+    def average(name):
+        current, previous = col(columns, name), col(prev_columns, name)
+        return np.where(previous != 0, (current + previous) / 2, current)
+
+    def divide(numerator, denominator):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where((denominator != 0) & (numerator != 0), numerator / np.where(denominator != 0, denominator, 1), np.nan)
+
+    v = {name: col(columns, name) for name in BATCH_INPUT_FIELDS}
+    avg_assets = average('total_assets')
+    avg_equity = average('total_equity')
+    avg_gross_loans = average('gross_loans')
+
+    r = {}
+    r['equity_assets'] = divide(v['total_equity'], v['total_assets'])
+    r['cash_reserves_assets'] = divide(v['cash_reserves_requirements'], v['total_assets'])
+    liquid_assets = v['cash_reserves_requirements'] + v['due_from_banks'] + v['investment_securities']
+    r['liquid_assets_assets'] = divide(liquid_assets, v['total_assets'])
+    r['gross_loans_deposits'] = divide(v['gross_loans'], v['deposits'])
+
+    npls = v['npls_mn']
+    problem_assets = npls + v['foreclosed_assets']
+    r['problem_assets_mn'] = problem_assets
+    llr = np.where((v['llr_mn'] == 0) & (v['loan_loss_provisions'] != 0), -v['loan_loss_provisions'], v['llr_mn'])
+    r['npa_ratio'] = divide(problem_assets, v['gross_loans'] + v['foreclosed_assets'])
+    r['npl_ratio'] = divide(npls, v['gross_loans'])
+    r['llr_avg_loan'] = divide(llr, avg_gross_loans)
+    r['coverage_ratio'] = np.where(npls > 0, divide(llr, npls), np.nan)
+    r['oler'] = divide(problem_assets - llr, v['total_equity'])
+
+    r['net_interest_margin'] = divide(v['net_interest_income'], avg_assets)
+    yield_on_assets = divide(v['interest_income'], v['total_assets'])
+    cost_of_liabilities = divide(v['interest_expenses'], v['total_liabilities'])
+    r['net_interest_spread'] = np.nan_to_num(yield_on_assets) - np.nan_to_num(cost_of_liabilities)
+    non_interest_income = (
+        v['non_interest_income_commissions'] + v['net_income_investment'] + v['other_net_income']
+    )
+    r['non_interest_income_assets'] = divide(non_interest_income, avg_assets)
+    r['interest_earning_assets_yield'] = divide(v['interest_income'], v['gross_loans'] + v['investment_securities'])
+    r['cost_of_funds'] = divide(v['interest_expenses'], v['total_liabilities'])
+    r['opex_assets'] = divide(v['operating_expenses'], avg_assets)
+    r['cost_to_income'] = divide(v['operating_expenses'], v['net_interest_income'] + non_interest_income)
+
+    r['net_interest_income_assets'] = divide(v['net_interest_income'], avg_assets)
+    r['non_interest_income_assets_dupont'] = divide(non_interest_income, avg_assets)
+    r['opex_assets_dupont'] = divide(v['operating_expenses'], avg_assets)
+    r['provision_expenses_assets'] = divide(v['provision_expenses'], avg_assets)
+    r['non_op_assets'] = divide(v['non_operating_profit_loss'], avg_assets)
+    r['tax_expenses_assets'] = divide(v['income_tax'], avg_assets)
+    r['assets_equity'] = divide(avg_assets, avg_equity)
+
+    r['roaa'] = (
+        np.nan_to_num(r['net_interest_income_assets'])
+        + np.nan_to_num(r['non_interest_income_assets_dupont'])
+        - np.nan_to_num(r['opex_assets_dupont'])
+        - np.nan_to_num(r['provision_expenses_assets'])
+        + np.nan_to_num(r['non_op_assets'])
+        - np.nan_to_num(r['tax_expenses_assets'])
+    )
+    r['roae'] = r['roaa'] * np.nan_to_num(r['assets_equity'])
+    return r
+
+
 # ========== RATINGS (CAMELS 1-5) ==========
 
+# Les seuils et pondérations sont définis dans methodologies/*.json
+# (rating_methodology); ces fonctions notent avec la méthodologie par défaut.
+
 def rate_capital(bank):
     """Rating Capital Adequacy (C)"""
-    car = getattr(bank, 'car_regulatory', None)
-    
-    if car is None:
-        return {"rating": None, "status": "Insufficient data"}
-    
-    if car >= 15:
-        return {"rating": 1, "status": "Strong", "car": car}
-    elif car >= 12:
-        return {"rating": 2, "status": "Satisfactory", "car": car}
-    elif car >= 10:
-        return {"rating": 3, "status": "Fair", "car": car}
-    elif car >= 8:
-        return {"rating": 4, "status": "Marginal", "car": car}
-    else:
-        return {"rating": 5, "status": "Unsatisfactory", "car": car}
+    return get_methodology().rate_pillar("capital", bank)
 
 
 def rate_asset_quality(bank):
     """Rating Asset Quality (A)"""
-    npl_ratio = getattr(bank, 'npl_ratio', None)
-    
-    if npl_ratio is None:
-        return {"rating": None, "status": "Insufficient data"}
-    
-    if npl_ratio < 0.02:  # < 2%
-        return {"rating": 1, "status": "Strong", "npl_ratio": npl_ratio}
-    elif npl_ratio < 0.05:  # < 5%
-        return {"rating": 2, "status": "Satisfactory", "npl_ratio": npl_ratio}
-    elif npl_ratio < 0.08:  # < 8%
-        return {"rating": 3, "status": "Fair", "npl_ratio": npl_ratio}
-    elif npl_ratio < 0.12:  # < 12%
-        return {"rating": 4, "status": "Marginal", "npl_ratio": npl_ratio}
-    else:
-        return {"rating": 5, "status": "Unsatisfactory", "npl_ratio": npl_ratio}
+    return get_methodology().rate_pillar("asset_quality", bank)
+
+
+def rate_management(bank):
+    """Rating Management (M) - proxy selon la méthodologie"""
+    return get_methodology().rate_pillar("management", bank)
 
 
 def rate_earnings(bank):
     """Rating Earnings (E)"""
-    roae = getattr(bank, 'roae', None)
-    
-    if roae is None:
-        return {"rating": None, "status": "Insufficient data"}
-    
-    if roae >= 0.15:  # >= 15%
-        return {"rating": 1, "status": "Strong", "roae": roae}
-    elif roae >= 0.10:  # >= 10%
-        return {"rating": 2, "status": "Satisfactory", "roae": roae}
-    elif roae >= 0.05:  # >= 5%
-        return {"rating": 3, "status": "Fair", "roae": roae}
-    elif roae >= 0:
-        return {"rating": 4, "status": "Marginal", "roae": roae}
-    else:
-        return {"rating": 5, "status": "Unsatisfactory", "roae": roae}
+    return get_methodology().rate_pillar("earnings", bank)
 
 
 def rate_liquidity(bank):
     """Rating Liquidity (L)"""
-    loans_deposits = getattr(bank, 'gross_loans_deposits', None)
-    
-    if loans_deposits is None:
-        return {"rating": None, "status": "Insufficient data"}
-    
-    if loans_deposits < 0.70:  # < 70%
-        return {"rating": 1, "status": "Strong", "ratio": loans_deposits}
-    elif loans_deposits < 0.85:  # < 85%
-        return {"rating": 2, "status": "Satisfactory", "ratio": loans_deposits}
-    elif loans_deposits < 0.95:  # < 95%
-        return {"rating": 3, "status": "Fair", "ratio": loans_deposits}
-    elif loans_deposits < 1.05:  # < 105%
-        return {"rating": 4, "status": "Marginal", "ratio": loans_deposits}
-    else:
-        return {"rating": 5, "status": "Unsatisfactory", "ratio": loans_deposits}
-
-
-def get_composite_rating(capital_rating, asset_rating, earnings_rating, liquidity_rating):
-    """Calcule le rating CAMELS composite"""
-    valid_ratings = []
-    
-    if capital_rating and capital_rating.get("rating"):
-        valid_ratings.append(capital_rating["rating"])
-    if asset_rating and asset_rating.get("rating"):
-        valid_ratings.append(asset_rating["rating"])
-    if earnings_rating and earnings_rating.get("rating"):
-        valid_ratings.append(earnings_rating["rating"])
-    if liquidity_rating and liquidity_rating.get("rating"):
-        valid_ratings.append(liquidity_rating["rating"])
-    
-    if not valid_ratings:
-        return {"composite_rating": None, "status": "Insufficient data"}
-    
-    avg = sum(valid_ratings) / len(valid_ratings)
-    composite = round(avg)
-    
-    status_map = {
-        1: "Strong",
-        2: "Satisfactory",
-        3: "Fair",
-        4: "Marginal",
-        5: "Unsatisfactory"
-    }
-    
-    return {
-        "composite_rating": composite,
-        "status": status_map.get(composite, "Unknown")
-    }
+    return get_methodology().rate_pillar("liquidity", bank)
+
+
+def rate_sensitivity(bank):
+    """Rating Sensitivity to market risk (S) - proxy selon la méthodologie"""
+    return get_methodology().rate_pillar("sensitivity", bank)
+
+
+def get_composite_rating(capital_rating, asset_rating, earnings_rating, liquidity_rating,
+                         management_rating=None, sensitivity_rating=None):
+    """Calcule le rating CAMELS composite (moyenne pondérée selon la méthodologie)"""
+    return get_methodology().composite({
+        "capital": capital_rating,
+        "asset_quality": asset_rating,
+        "management": management_rating,
+        "earnings": earnings_rating,
+        "liquidity": liquidity_rating,
+        "sensitivity": sensitivity_rating,
+    })
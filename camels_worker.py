@@ -0,0 +1,135 @@
+"""
+Worker d'extraction: traite les jobs d'analyse mis en file par l'API
+(JOB_BACKEND=database) hors du processus uvicorn.
+
+Chaque worker réserve jusqu'à --concurrency jobs à la fois dans la table
+extraction_jobs (FOR UPDATE SKIP LOCKED, voir job_queue), signale sa
+capacité et sa charge dans extraction_workers, et rafraîchit le battement
+de ses jobs toutes les --heartbeat secondes. On en lance autant que
+nécessaire, sur une ou plusieurs machines partageant la base et le dossier
+d'upload. Les jobs d'un worker disparu sont remis en attente par les autres.
+
+SIGTERM / Ctrl-C: le worker ne prend plus de job, termine ceux en cours
+puis s'arrête (un second signal quitte immédiatement).
+
+Usage:
+    JOB_BACKEND=database python -m camels_worker [--concurrency 2] [--poll 1.0] [--heartbeat 15]
+"""
+import argparse
+import os
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("JOB_BACKEND", "database")
+
+import job_queue  # noqa: E402
+from app_logging import get_logger  # noqa: E402
+from job_manager import JOB_BACKEND, process_job_async  # noqa: E402
+
+logger = get_logger("camels_worker")
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1.0"))  # Secondes quand la file est vide
+WORKER_HEARTBEAT_INTERVAL = float(os.getenv("WORKER_HEARTBEAT_INTERVAL", "15"))
+
+
+class Worker:
+    def __init__(self, concurrency: int, poll_interval: float, heartbeat_interval: float):
+        self.id = job_queue.new_worker_id()
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job")
+        self.active = {}  # job_id -> Future
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()  # Plus de nouvelle réservation
+        self.finished = threading.Event()  # Jobs en cours terminés
+
+    def _running(self) -> list:
+        with self.lock:
+            for job_id in [job_id for job_id, future in self.active.items() if future.done()]:
+                del self.active[job_id]
+            return list(self.active)
+
+    def _heartbeat_loop(self):
+        """Battement du worker et de ses jobs; remet en attente les jobs des workers perdus"""
+        while not self.finished.wait(self.heartbeat_interval):
+            status = "draining" if self.stopping.is_set() else "running"
+            try:
+                job_queue.heartbeat(self.id, self._running(), status=status)
+                requeued = job_queue.requeue_stale()
+                if requeued:
+                    logger.warning("jobs orphelins repris", extra={"count": requeued})
+            except Exception:
+                logger.exception("battement en échec")
+
+    def _run_job(self, job: dict):
+        try:
+            process_job_async(job["id"], job["file_path"], worker_id=self.id)
+        finally:
+            with self.lock:
+                self.active.pop(job["id"], None)
+
+    def run(self):
+        job_queue.register_worker(self.id, self.concurrency)
+        logger.info("worker démarré", extra={"worker_id": self.id, "concurrency": self.concurrency})
+        heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True, name="worker-heartbeat")
+        heartbeat.start()
+        try:
+            while not self.stopping.is_set():
+                if len(self._running()) >= self.concurrency:
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                try:
+                    job = job_queue.claim(self.id)
+                except Exception:
+                    logger.exception("réservation de job en échec")
+                    job = None
+                if job is None:
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                logger.info("job réservé", extra={"job_id": job["id"], "attempt": job["attempts"]})
+                with self.lock:
+                    self.active[job["id"]] = self.pool.submit(self._run_job, job)
+        finally:
+            logger.info("arrêt: fin des jobs en cours", extra={"worker_id": self.id, "active": len(self._running())})
+            self.stopping.set()
+            self.pool.shutdown(wait=True)
+            self.finished.set()
+            heartbeat.join(timeout=5)
+            job_queue.unregister_worker(self.id)
+            logger.info("worker arrêté", extra={"worker_id": self.id})
+
+    def stop(self, signum=None, frame=None):
+        if self.stopping.is_set():
+            raise SystemExit(1)
+        logger.info("signal d'arrêt reçu", extra={"signal": signum})
+        self.stopping.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker d'extraction CAMELS (JOB_BACKEND=database)")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="jobs simultanés")
+    parser.add_argument("--poll", type=float, default=WORKER_POLL_INTERVAL, help="attente quand la file est vide (s)")
+    parser.add_argument("--heartbeat", type=float, default=WORKER_HEARTBEAT_INTERVAL, help="intervalle de battement (s)")
+    parser.add_argument("--no-warm-up", action="store_true", help="ne pas précharger les dépendances d'extraction")
+    args = parser.parse_args()
+
+    if JOB_BACKEND != "database":
+        parser.error(f"JOB_BACKEND={JOB_BACKEND}: le worker ne traite que la file en base (JOB_BACKEND=database)")
+    if args.heartbeat * 2 > job_queue.JOB_STALE_AFTER:
+        parser.error(f"--heartbeat doit rester sous JOB_STALE_AFTER / 2 ({job_queue.JOB_STALE_AFTER / 2:.0f} s)")
+
+    if not args.no_warm_up:
+        from llm_service import warm_up
+        warm_up()
+
+    worker = Worker(args.concurrency, args.poll, args.heartbeat)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Découpage des longs documents pour l'extraction LLM (map-reduce).
+
+- map: les pages sont regroupées en extraits consécutifs d'au plus
+  LLM_CHUNK_CHARS caractères (une page n'est jamais coupée, sauf si elle
+  dépasse seule la limite: coupure aux fins de ligne). Chaque extrait est
+  envoyé au LLM avec la consigne de n'extraire que ce qu'il contient.
+- reduce: les extractions partielles sont fusionnées par exercice. Pour un
+  même champ, les valeurs concordantes (à 0,5% près) se cumulent; la valeur
+  retenue est celle du groupe le plus soutenu, pondéré par la pertinence des
+  extraits (lignes d'états financiers reconnues), ce qui fait primer les
+  états financiers sur les chiffres arrondis du rapport de gestion.
+
+Les extraits sans aucune ligne d'état financier reconnue (texte narratif,
+sommaire, annexes non chiffrées) ne sont pas envoyés, sauf si aucun extrait
+n'en contient.
+"""
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from bank_repository import IDENTITY_FIELDS, fiscal_year_key
+from statement_parser import count_statement_rows
+
+LLM_CHUNK_CHARS = int(os.getenv("LLM_CHUNK_CHARS", "40000"))
+
+# Deux montants à moins de 0,5% l'un de l'autre sont la même valeur (arrondis)
+MERGE_TOLERANCE = 0.005
+
+
+# ===== MAP: DÉCOUPAGE =====
+
+def _split_page(text: str, max_chars: int) -> List[str]:
+    """Page trop longue: morceaux d'au plus max_chars, coupés aux fins de ligne"""
+    parts, current, size = [], [], 0
+    for line in text.splitlines(keepends=True):
+        while len(line) > max_chars:
+            if current:
+                parts.append("".join(current))
+                current, size = [], 0
+            parts.append(line[:max_chars])
+            line = line[max_chars:]
+        if size + len(line) > max_chars and current:
+            parts.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def split_into_chunks(pages: List[str], max_chars: int = None) -> List[dict]:
+    """
+    Regroupe les pages en extraits consécutifs.
+
+    Returns:
+        list: {"index", "first_page", "last_page" (numérotées à partir de 1),
+               "text", "score" (lignes d'état financier reconnues)}
+    """
+    max_chars = LLM_CHUNK_CHARS if max_chars is None else max_chars
+    pieces = []  # (numéro de page, texte)
+    for number, text in enumerate(pages, start=1):
+        if len(text) > max_chars:
+            pieces.extend((number, part) for part in _split_page(text, max_chars))
+        else:
+            pieces.append((number, text))
+
+    chunks, current, size = [], [], 0
+    for number, text in pieces:
+        if current and size + len(text) + 2 > max_chars:
+            chunks.append(current)
+            current, size = [], 0
+        current.append((number, text))
+        size += len(text) + 2
+    if current:
+        chunks.append(current)
+
+    result = []
+    for index, chunk in enumerate(chunks):
+        text = "\n\n".join(text for _, text in chunk)
+        result.append({
+            "index": index,
+            "first_page": chunk[0][0],
+            "last_page": chunk[-1][0],
+            "text": text,
+            "score": count_statement_rows(text),
+        })
+    return result
+
+
+def select_chunks(chunks: List[dict]) -> List[dict]:
+    """Extraits à envoyer: ceux qui contiennent des lignes d'état financier (tous sinon)"""
+    relevant = [chunk for chunk in chunks if chunk["score"] > 0]
+    return relevant or chunks
+
+
+# ===== REDUCE: FUSION =====
+
+def _periods(data: dict) -> List[Tuple[Optional[int], dict]]:
+    """(année de clôture, champs) de l'exercice principal puis des exercices antérieurs"""
+    current = {k: v for k, v in data.items() if k != "prior_periods"}
+    periods = [(fiscal_year_key(current.get("fiscal_year")), current)]
+    for prior in data.get("prior_periods") or []:
+        if isinstance(prior, dict):
+            periods.append((fiscal_year_key(prior.get("fiscal_year")), prior))
+    return periods
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return abs(a - b) <= MERGE_TOLERANCE * max(abs(a), abs(b))
+    return a == b
+
+
+def _resolve(candidates: List[tuple]) -> Tuple[object, List[object]]:
+    """
+    candidates: (valeur, poids, index de l'extrait). Retourne la valeur du
+    groupe concordant le plus soutenu (à égalité: le premier extrait) et les
+    valeurs écartées.
+    """
+    groups: List[dict] = []
+    for value, weight, index in candidates:
+        for group in groups:
+            if _same(group["value"], value):
+                group["weight"] += weight
+                group["first"] = min(group["first"], index)
+                break
+        else:
+            groups.append({"value": value, "weight": weight, "first": index})
+    groups.sort(key=lambda group: (-group["weight"], group["first"]))
+    return groups[0]["value"], [group["value"] for group in groups[1:]]
+
+
+def merge_extractions(partials: List[Tuple[dict, dict]]) -> Tuple[dict, List[dict]]:
+    """
+    Fusionne les extractions partielles [(extrait, JSON du LLM)] en un seul
+    JSON au format de EXTRACTION_PROMPT: exercice le plus récent + prior_periods.
+
+    Un extrait sans exercice identifié est rattaché à l'exercice le plus récent.
+
+    Returns:
+        tuple: (JSON fusionné, conflits [{"field", "fiscal_year", "kept", "rejected"}])
+    """
+    identity: Dict[str, List[tuple]] = defaultdict(list)
+    by_year: Dict[Optional[int], Dict[str, List[tuple]]] = defaultdict(lambda: defaultdict(list))
+    labels: Dict[int, List[tuple]] = defaultdict(list)  # année -> libellés d'exercice ("2022-2023")
+
+    for chunk, data in partials:
+        weight = chunk["score"] + 1
+        for year, values in _periods(data):
+            for field, value in values.items():
+                if value is None or field == "prior_periods":
+                    continue
+                if field in IDENTITY_FIELDS:
+                    identity[field].append((value, weight, chunk["index"]))
+                elif field == "fiscal_year":
+                    if year is not None:
+                        labels[year].append((str(value), weight, chunk["index"]))
+                else:
+                    by_year[year][field].append((value, weight, chunk["index"]))
+
+    years = sorted((year for year in by_year if year is not None), reverse=True)
+    latest = years[0] if years else None
+    if None in by_year and latest is not None:
+        for field, candidates in by_year.pop(None).items():
+            by_year[latest][field].extend(candidates)
+
+    conflicts = []
+
+    def resolve_period(year) -> dict:
+        period = {}
+        for field, candidates in by_year[year].items():
+            period[field], rejected = _resolve(candidates)
+            if rejected:
+                conflicts.append({"field": field, "fiscal_year": year, "kept": period[field], "rejected": rejected})
+        if year is not None:
+            period["fiscal_year"] = _resolve(labels[year])[0] if labels[year] else str(year)
+        return period
+
+    merged = {field: _resolve(candidates)[0] for field, candidates in identity.items()}
+    merged.update(resolve_period(latest))
+    if years:
+        merged["prior_periods"] = [resolve_period(year) for year in years[1:]]
+    return merged, conflicts
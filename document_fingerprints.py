@@ -0,0 +1,218 @@
+"""
+Détection des documents quasi identiques déjà analysés (re-scans, autres
+exports du même rapport), pour réutiliser leur extraction au lieu de
+relancer OCR et LLM.
+
+Empreinte d'un document:
+- SHA-256 du fichier (copies exactes)
+- MinHash du texte des FINGERPRINT_PAGES premières pages: texte normalisé
+  (minuscules, sans accents, montants sans séparateurs de milliers), découpé
+  en shingles de FINGERPRINT_SHINGLE mots, FINGERPRINT_PERMUTATIONS valeurs
+  minimales. La part de valeurs égales entre deux signatures estime la
+  similarité de Jaccard des textes.
+
+Les montants font partie des shingles: deux banques présentées sur le même
+modèle, ou deux exercices d'une même banque, restent éloignés.
+
+Recherche (LSH): la signature est coupée en FINGERPRINT_BANDS bandes dont le
+hachage est indexé (document_fingerprint_bands). Seuls les documents qui
+partagent au moins une bande sont comparés; est retenu le plus proche au-dessus
+de FINGERPRINT_THRESHOLD.
+"""
+import hashlib
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import BankDB, DocumentFingerprintBandDB, DocumentFingerprintDB
+
+FINGERPRINT_ENABLED = os.getenv("FINGERPRINT_ENABLED", "1") not in ("0", "false", "no")
+FINGERPRINT_PAGES = int(os.getenv("FINGERPRINT_PAGES", "3"))
+FINGERPRINT_THRESHOLD = float(os.getenv("FINGERPRINT_THRESHOLD", "0.7"))  # Jaccard estimé
+# Mots par shingle. 2: un même rapport lu par deux extracteurs (ordre de lecture
+# des colonnes différent) reste au-dessus de 0,75; des shingles plus longs le
+# cassent. Deux documents différents des échantillons restent sous 0,25.
+FINGERPRINT_SHINGLE = 2
+FINGERPRINT_PERMUTATIONS = 128
+# 4 valeurs par bande: un document à 0,7 est candidat dans >99,9% des cas, à 0,3
+# une fois sur quatre (la signature complète tranche ensuite)
+FINGERPRINT_BANDS = 32
+# En dessous, le texte est trop court pour être discriminant (page de garde seule, OCR vide)
+FINGERPRINT_MIN_SHINGLES = 50
+
+_rng = np.random.default_rng(20240521)  # Graine fixe: les signatures en base restent comparables
+# Hachage multiply-shift: h(x) = (a * x + b) mod 2^64 >> 32, a impair
+_A = _rng.integers(1, 2**63, FINGERPRINT_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, FINGERPRINT_PERMUTATIONS, dtype=np.uint64)
+
+THOUSANDS_SEPARATOR = re.compile(r"(?<=\d)[ .\u00a0\u202f](?=\d{3}(?!\d))")
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class Fingerprint:
+    file_sha256: str
+    signature: Optional[np.ndarray]  # None si le texte est trop court
+    source: str  # text ou ocr
+    ocr_pages: List[Tuple[str, dict]]  # OCR des premières pages, repris par l'extraction (source "ocr")
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Mots en minuscules sans accents; "1 316 459" et "1.316.459" deviennent "1316459" """
+    text = THOUSANDS_SEPARATOR.sub("", text)
+    text = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode()
+    return TOKEN.findall(text)
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """Hachages 32 bits distincts des shingles de FINGERPRINT_SHINGLE mots"""
+    tokens = normalize_tokens(text)
+    shingles = {
+        " ".join(tokens[i:i + FINGERPRINT_SHINGLE])
+        for i in range(max(len(tokens) - FINGERPRINT_SHINGLE + 1, 0))
+    }
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """Signature MinHash (uint32, FINGERPRINT_PERMUTATIONS valeurs), None si texte trop court"""
+    hashes = shingle_hashes(text)
+    if len(hashes) < FINGERPRINT_MIN_SHINGLES:
+        return None
+    # (permutations, shingles): l'arithmétique uint64 boucle modulo 2^64
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) >> np.uint64(32)
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Similarité de Jaccard estimée"""
+    return float(np.mean(a == b))
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """Hachage signé 63 bits de chaque bande (avec son numéro), clé de l'index LSH"""
+    rows = FINGERPRINT_PERMUTATIONS // FINGERPRINT_BANDS
+    buckets = []
+    for band in range(FINGERPRINT_BANDS):
+        chunk = signature[band * rows:(band + 1) * rows].tobytes()
+        digest = hashlib.blake2b(band.to_bytes(2, "little") + chunk, digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True) >> 1)
+    return buckets
+
+
+# ===== EMPREINTE D'UN FICHIER =====
+
+def fingerprint_document(file_path: str) -> Fingerprint:
+    """
+    Empreinte à partir du texte le moins cher à obtenir: couche texte des
+    premières pages du PDF, sinon OCR de ces seules pages (PDF scanné, image).
+    """
+    from ocr import ocr_image_file, ocr_pdf
+    from pdf_text import count_pages, extract_pdf_pages, resolve_backend
+
+    sha = file_sha256(file_path)
+    if file_path.lower().endswith(".pdf"):
+        backend = resolve_backend()
+        pages = extract_pdf_pages(file_path, backend, max_pages=FINGERPRINT_PAGES)
+        if len("".join(pages).strip()) >= 100:
+            return Fingerprint(sha, minhash("\n".join(pages)), "text", [])
+        ocr_pages = ocr_pdf(file_path, min(count_pages(file_path, backend), FINGERPRINT_PAGES))
+    else:
+        ocr_pages = [ocr_image_file(file_path)]
+    return Fingerprint(sha, minhash("\n".join(text for text, _ in ocr_pages)), "ocr", ocr_pages)
+
+
+# ===== INDEX EN BASE =====
+
+def find_duplicate(db: Session, fingerprint: Fingerprint) -> Optional[tuple]:
+    """
+    Document déjà analysé: copie exacte, sinon le plus proche au-dessus de
+    FINGERPRINT_THRESHOLD parmi les candidats LSH.
+
+    Returns:
+        tuple: (DocumentFingerprintDB, similarité) ou None
+    """
+    exact = db.scalars(
+        select(DocumentFingerprintDB).where(DocumentFingerprintDB.file_sha256 == fingerprint.file_sha256)
+        .order_by(DocumentFingerprintDB.id.desc()).limit(1)
+    ).first()
+    if exact is not None:
+        return exact, 1.0
+    if fingerprint.signature is None:
+        return None
+
+    candidate_ids = db.scalars(
+        select(DocumentFingerprintBandDB.fingerprint_id)
+        .where(DocumentFingerprintBandDB.bucket.in_(band_buckets(fingerprint.signature)))
+        .distinct()
+    ).all()
+    if not candidate_ids:
+        return None
+
+    best, best_score = None, 0.0
+    for candidate in db.scalars(select(DocumentFingerprintDB).where(DocumentFingerprintDB.id.in_(candidate_ids))):
+        score = similarity(fingerprint.signature, np.frombuffer(candidate.signature, dtype=np.uint32))
+        if score > best_score:
+            best, best_score = candidate, score
+    if best_score < FINGERPRINT_THRESHOLD:
+        return None
+    return best, best_score
+
+
+def record_fingerprint(db: Session, fingerprint: Fingerprint, filename: str, extracted_data: dict,
+                       bank_ids: List[int]) -> Optional[DocumentFingerprintDB]:
+    """Enregistre l'empreinte d'un document analysé (sans signature: copies exactes seulement)"""
+    signature = fingerprint.signature if fingerprint.signature is not None else np.zeros(0, dtype=np.uint32)
+    row = DocumentFingerprintDB(
+        file_sha256=fingerprint.file_sha256,
+        signature=signature.tobytes(),
+        source=fingerprint.source,
+        filename=filename,
+        extracted_data=extracted_data,
+        bank_ids=bank_ids,
+        reuse_count=0,
+    )
+    db.add(row)
+    db.flush()
+    if fingerprint.signature is not None:
+        db.add_all(
+            DocumentFingerprintBandDB(fingerprint_id=row.id, band=band, bucket=bucket)
+            for band, bucket in enumerate(band_buckets(fingerprint.signature))
+        )
+    db.commit()
+    return row
+
+
+def reusable_banks(db: Session, row: DocumentFingerprintDB) -> Optional[List[BankDB]]:
+    """
+    BankDB de l'analyse d'origine, dans l'ordre, s'ils existent tous encore:
+    ils sont repris tels quels (corrections manuelles comprises). None sinon,
+    l'extraction enregistrée est alors sauvegardée à nouveau.
+    """
+    ids = row.bank_ids or []
+    banks = {bank.id: bank for bank in db.query(BankDB).filter(BankDB.id.in_(ids))} if ids else {}
+    if not ids or len(banks) != len(ids):
+        return None
+    return [banks[bank_id] for bank_id in ids]
+
+
+def mark_reused(db: Session, row: DocumentFingerprintDB):
+    row.reuse_count = (row.reuse_count or 0) + 1
+    db.commit()
@@ -0,0 +1,121 @@
+"""
+Validation d'une extraction (JSON du LLM ou du parseur) par identités comptables.
+
+Contrôles (exercice principal):
+- les contrôles de statement_parser.run_consistency_checks: actif = passif +
+  capitaux propres, PNI = produits - charges d'intérêts, composantes des
+  capitaux propres <= total, crédits <= actif
+- composantes de l'actif (crédits nets de provisions) et du passif <= total
+  à VALIDATION_SUM_TOLERANCE près (borne haute seulement: les bilans publiés
+  regroupent ou omettent des postes; sans provisions extraites, les crédits
+  bruts sont écartés de la somme)
+- résultat net du compte de résultat = résultat de l'exercice au bilan
+
+Chaque contrôle en échec désigne ses champs: ce sont eux (et les champs
+obligatoires manquants) qui sont redemandés au modèle supérieur.
+"""
+import os
+from typing import Dict, List, Optional
+
+from statement_parser import REQUIRED_FIELDS, run_consistency_checks
+
+VALIDATION_TOLERANCE = float(os.getenv("VALIDATION_TOLERANCE", "0.01"))
+VALIDATION_SUM_TOLERANCE = float(os.getenv("VALIDATION_SUM_TOLERANCE", "0.02"))
+
+ASSET_COMPONENTS = [
+    "cash_reserves_requirements", "due_from_banks", "investment_securities", "gross_loans",
+    "loan_loss_provisions", "foreclosed_assets", "fixed_assets", "other_assets",
+]
+LIABILITY_COMPONENTS = ["deposits", "interbank_liabilities", "other_liabilities"]
+
+# Champs en cause quand un contrôle échoue
+CHECK_FIELDS = {
+    "assets_eq_liabilities_plus_equity": ["total_assets", "total_liabilities", "total_equity"],
+    "nii_eq_income_minus_expenses": ["net_interest_income", "interest_income", "interest_expenses"],
+    "equity_components_le_total": ["total_equity", "paid_in_capital", "reserves", "retained_earnings", "net_profit"],
+    "loans_le_assets": ["gross_loans", "total_assets"],
+    "asset_components_sum": ["total_assets"] + ASSET_COMPONENTS,
+    "liability_components_sum": ["total_liabilities"] + LIABILITY_COMPONENTS,
+    "net_income_eq_net_profit": ["net_income", "net_profit"],
+}
+
+# Rappel des identités dans le prompt de vérification
+CHECK_HINTS = {
+    "assets_eq_liabilities_plus_equity": "TOTAL ACTIF = total des dettes (passif hors capitaux propres) + CAPITAUX PROPRES",
+    "nii_eq_income_minus_expenses": "marge nette d'intérêt = produits d'intérêts - charges d'intérêts (pas le PNB)",
+    "equity_components_le_total": "capital + réserves + report à nouveau + résultat <= capitaux propres",
+    "loans_le_assets": "crédits à la clientèle <= total actif",
+    "asset_components_sum": "somme des postes de l'actif (crédits nets de provisions) <= TOTAL ACTIF",
+    "liability_components_sum": "dépôts + dettes interbancaires + autres passifs <= total des dettes",
+    "net_income_eq_net_profit": "résultat net du compte de résultat = résultat de l'exercice au bilan",
+}
+
+
+def _close(a: float, b: float, tolerance: float) -> bool:
+    return abs(a - b) <= tolerance * max(abs(a), abs(b), 1)
+
+
+def _sum_check(total: Optional[float], components: List[Optional[float]]) -> Optional[bool]:
+    """Somme des composantes <= total (à la tolérance près). None si non vérifiable"""
+    present = [c for c in components if c is not None]
+    if not total or len(present) < 2:
+        return None
+    return sum(present) <= total * (1 + VALIDATION_SUM_TOLERANCE)
+
+
+def _numeric(data: dict) -> dict:
+    """Valeurs numériques seulement (un LLM peut renvoyer "n/a" ou un montant en texte)"""
+    return {
+        field: value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+        for field, value in data.items()
+    }
+
+
+def validate_extraction(data: dict) -> dict:
+    """
+    Returns:
+        dict: {
+            "passed": aucun contrôle en échec et aucun champ obligatoire manquant,
+            "checks": {contrôle: True / False / None (non vérifiable)},
+            "failed_checks": contrôles en échec,
+            "missing_fields": champs obligatoires absents,
+            "fields": champs à redemander (contrôles en échec + manquants)
+        }
+    """
+    values = _numeric({k: v for k, v in data.items() if k != "prior_periods"})
+    # BCEAO: "TOTAL PASSIF" est le total du bilan (capitaux propres compris)
+    if values.get("total_liabilities") is not None and values.get("total_equity") \
+            and values.get("total_assets") and _close(values["total_liabilities"], values["total_assets"], VALIDATION_TOLERANCE):
+        values["total_liabilities"] -= values["total_equity"]
+
+    checks = run_consistency_checks(values)
+    asset_fields = ASSET_COMPONENTS
+    if values.get("loan_loss_provisions") is None:
+        asset_fields = [f for f in ASSET_COMPONENTS if f != "gross_loans"]
+    checks["asset_components_sum"] = _sum_check(
+        values.get("total_assets"), [values.get(f) for f in asset_fields]
+    )
+    checks["liability_components_sum"] = _sum_check(
+        values.get("total_liabilities"), [values.get(f) for f in LIABILITY_COMPONENTS]
+    )
+    if values.get("net_income") is not None and values.get("net_profit") is not None:
+        checks["net_income_eq_net_profit"] = _close(values["net_income"], values["net_profit"], VALIDATION_TOLERANCE)
+    else:
+        checks["net_income_eq_net_profit"] = None
+
+    failed = [name for name, passed in checks.items() if passed is False]
+    missing = [field for field in REQUIRED_FIELDS if data.get(field) in (None, "")]
+    fields = list(dict.fromkeys(
+        [field for name in failed for field in CHECK_FIELDS.get(name, [])] + missing
+    ))
+    return {
+        "passed": not failed and not missing,
+        "checks": checks,
+        "failed_checks": failed,
+        "missing_fields": missing,
+        "fields": fields,
+    }
+
+
+def failed_check_hints(report: dict) -> Dict[str, str]:
+    return {name: CHECK_HINTS[name] for name in report["failed_checks"] if name in CHECK_HINTS}
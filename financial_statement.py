@@ -0,0 +1,67 @@
+"""
+Exercice financier léger pour le chemin de calcul (ratios, notations).
+
+BankDB instrumente chaque accès d'attribut (suivi des modifications de
+l'ORM) et garde un état de session par instance. FinancialStatement porte
+les mêmes noms d'attributs dans des __slots__ (ni __dict__, ni
+instrumentation): calculate_all_ratios, calculate_ratios et
+Methodology.rate_bank l'acceptent tel quel. La conversion avec BankDB n'a
+lieu qu'à la frontière de persistance (from_bank / apply_to).
+"""
+from typing import Iterable, Optional
+
+from models import BankDB
+
+# Colonnes de suivi propres à la table (pas des données de l'exercice)
+_TABLE_ONLY_COLUMNS = {"file_urls", "analysis_complete", "created_date", "updated_date"}
+
+STATEMENT_FIELDS = tuple(
+    column.name for column in BankDB.__table__.columns if column.name not in _TABLE_ONLY_COLUMNS
+)
+
+
+class FinancialStatement:
+    """Une banque-exercice: identité, montants et ratios (None = absent)"""
+
+    __slots__ = STATEMENT_FIELDS
+
+    def __init__(self, **values):
+        unknown = set(values) - set(STATEMENT_FIELDS)
+        if unknown:
+            raise TypeError(f"Champs inconnus: {', '.join(sorted(unknown))}")
+        for field in STATEMENT_FIELDS:
+            setattr(self, field, values.get(field))
+
+    @classmethod
+    def from_bank(cls, bank: BankDB) -> "FinancialStatement":
+        """Copie des valeurs d'un BankDB"""
+        statement = cls.__new__(cls)
+        for field in STATEMENT_FIELDS:
+            setattr(statement, field, getattr(bank, field))
+        return statement
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FinancialStatement":
+        """Depuis un dict (record d'import, ligne de requête); les clés inconnues sont ignorées"""
+        statement = cls.__new__(cls)
+        for field in STATEMENT_FIELDS:
+            setattr(statement, field, data.get(field))
+        return statement
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in STATEMENT_FIELDS}
+
+    def apply_to(self, bank: BankDB, fields: Optional[Iterable[str]] = None) -> BankDB:
+        """
+        Recopie des champs (tous sauf id par défaut) dans un BankDB. Seules les
+        valeurs différentes sont affectées: un recalcul identique ne rend pas
+        la ligne modifiée (ni UPDATE, ni nouvel updated_date).
+        """
+        for field in fields if fields is not None else STATEMENT_FIELDS:
+            value = getattr(self, field)
+            if field != "id" and getattr(bank, field) != value:
+                setattr(bank, field, value)
+        return bank
+
+    def __repr__(self):
+        return f"<FinancialStatement {self.bank_name} - {self.fiscal_year}>"
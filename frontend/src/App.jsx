@@ -74,7 +74,7 @@ function App() {
           <h2>✅ Analyse terminée !</h2>
           
           <div className="bank-info">
-            <h3>{result?.bank?.name || 'Banque inconnue'}</h3>
+            <h3>{result?.bank?.bank_name || 'Banque inconnue'}</h3>
             <p>{result?.bank?.country || ''} - {result?.bank?.fiscal_year || ''}</p>
           </div>
 
@@ -161,7 +161,7 @@ function App() {
                 </tr>
                 <tr>
                   <td>Paid-in Capital</td>
-                  <td>{result?.bank?.paid_capital?.toLocaleString() || '-'}</td>
+                  <td>{result?.bank?.paid_in_capital?.toLocaleString() || '-'}</td>
                 </tr>
                 <tr>
                   <td>Reserves</td>
@@ -209,11 +209,11 @@ function App() {
                 
                 <tr>
                   <td>Non-Interest Income (Commissions)</td>
-                  <td>{result?.bank?.non_net_interest_income_commissions?.toLocaleString() || '-'}</td>
+                  <td>{result?.bank?.non_interest_income_commissions?.toLocaleString() || '-'}</td>
                 </tr>
                 <tr>
                   <td>Net Income from Investment</td>
-                  <td>{result?.bank?.net_income_from_investment?.toLocaleString() || '-'}</td>
+                  <td>{result?.bank?.net_income_investment?.toLocaleString() || '-'}</td>
                 </tr>
                 <tr>
                   <td>Other Net Income</td>
@@ -11,8 +11,11 @@ export const uploadAndAnalyze = async (file, onProgress) => {
   
   const uploadResponse = await api.post('/upload-and-analyze', formData);
   const jobId = uploadResponse.data.job_id;
+  // Un job en file peut attendre son tour: au moins 3 min, ou deux fois l'ETA annoncée
+  const eta = uploadResponse.data.queue?.eta_seconds || 0;
+  const maxAttempts = Math.max(60, Math.ceil((2 * eta) / 3));
   
-  return await pollJobStatus(jobId, onProgress);
+  return await pollJobStatus(jobId, onProgress, maxAttempts);
 };
 
 const pollJobStatus = async (jobId, onProgress, maxAttempts = 60) => {
@@ -27,7 +30,9 @@ const pollJobStatus = async (jobId, onProgress, maxAttempts = 60) => {
     }
     
     if (job.status === 'completed') {
-      return job.result;
+      // Le job ne garde qu'un résumé: données complètes de l'exercice à la demande
+      const statement = await api.get(`/banks/${job.result.bank_id}/statement`);
+      return { ...job.result, bank: statement.data };
     }
     
     if (job.status === 'failed') {
@@ -35,7 +40,7 @@ const pollJobStatus = async (jobId, onProgress, maxAttempts = 60) => {
     }
   }
   
-  throw new Error('Timeout: analyse trop longue (> 3 min)');
+  throw new Error(`Timeout: analyse trop longue (> ${Math.round(maxAttempts * 3 / 60)} min)`);
 };
 
 export const listBanks = async () => {
@@ -0,0 +1,164 @@
+"""
+Cache HTTP des lectures: ETag / Last-Modified, 304 et cache LRU de réponses.
+
+La version d'une ressource vient de la base:
+- une banque: son updated_date (mis à jour par l'ORM, les upserts et l'import)
+- une liste: (max(updated_date), count(*)) des lignes filtrées (le nombre
+  détecte les suppressions)
+
+L'ETag est dérivé du chemin, des paramètres et de cette version: une requête
+If-None-Match qui correspond reçoit un 304 après une seule requête de version
+(ni calcul de ratios, ni sérialisation). Les corps déjà sérialisés sont gardés
+dans un LRU en mémoire indexé par ETag (non compressés: le middleware de
+compression s'en charge selon Accept-Encoding); invalidate() le vide après
+une écriture. Avec plusieurs workers, chaque worker a son LRU, mais une
+entrée périmée n'est jamais servie puisque la version fait partie de la clé.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from http_responses import dumps
+from models import BankDB
+
+HTTP_CACHE_SIZE = int(os.getenv("HTTP_CACHE_SIZE", "512"))  # Réponses gardées (0 = désactivé)
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+class ResponseCache:
+    """LRU ETag -> corps JSON sérialisé (thread-safe: routes et threadpool)"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag: str) -> Optional[bytes]:
+        with self.lock:
+            body = self.entries.get(etag)
+            if body is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(etag)
+            self.hits += 1
+            return body
+
+    def put(self, etag: str, body: bytes):
+        # Un corps qui occuperait plus d'un quart du budget n'est pas gardé
+        if self.max_entries <= 0 or len(body) > self.max_bytes // 4:
+            return
+        with self.lock:
+            previous = self.entries.pop(etag, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[etag] = body
+            self.size += len(body)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+response_cache = ResponseCache(HTTP_CACHE_SIZE, HTTP_CACHE_MAX_BYTES)
+
+
+# ===== VERSIONS =====
+
+def bank_version(db: Session, bank_id: int) -> Optional[tuple]:
+    """(updated_date,) d'une banque, None si elle n'existe pas"""
+    row = db.execute(select(BankDB.updated_date).where(BankDB.id == bank_id)).first()
+    return None if row is None else (row.updated_date,)
+
+
+def table_version(db: Session, conditions: list = None) -> tuple:
+    """(max(updated_date), nombre de lignes) des banques filtrées"""
+    stmt = select(func.max(BankDB.updated_date), func.count(BankDB.id))
+    if conditions:
+        stmt = stmt.where(*conditions)
+    return tuple(db.execute(stmt).one())
+
+
+# ===== RÉPONSES =====
+
+def make_etag(request: Request, version: tuple) -> str:
+    key = repr((request.url.path, sorted(request.query_params.multi_items()), version))
+    return '"' + hashlib.blake2b(key.encode(), digest_size=12).hexdigest() + '"'
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match prime sur If-Modified-Since (RFC 9110)
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+async def cached_json(request: Request, version: tuple, build: Callable[[], Awaitable],
+                      last_modified: Optional[datetime] = None) -> Response:
+    """
+    Réponse JSON versionnée: 304 si le client a déjà cette version, corps du
+    LRU s'il existe, sinon build() (coroutine retournant le payload).
+    """
+    etag = make_etag(request, version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(etag)
+    if body is None:
+        payload = await build()
+        body = dumps(jsonable_encoder(payload))
+        response_cache.put(etag, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def invalidate():
+    """À appeler après toute écriture dans banks"""
+    response_cache.invalidate()
@@ -0,0 +1,74 @@
+"""
+Sérialisation JSON rapide et compression des réponses.
+
+- orjson (si installé) sérialise les payloads: réponse par défaut de l'app
+  (FastJSONResponse) et corps du cache HTTP (dumps). Sans orjson, repli sur
+  json.dumps avec le même résultat (UTF-8, NaN -> null).
+- Les réponses au-delà de COMPRESSION_MIN_SIZE sont compressées: brotli si
+  brotli-asgi est installé (avec repli gzip selon Accept-Encoding), sinon gzip.
+"""
+import json
+import math
+import os
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from starlette.middleware.gzip import GZipMiddleware
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    BrotliMiddleware = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # Octets (0 = désactivé)
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))  # 4: bon compromis pour du dynamique
+
+
+def _finite(value):
+    """NaN/inf -> None (json.dumps écrirait NaN, invalide en JSON)"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def dumps(payload) -> bytes:
+    """Payload déjà passé par jsonable_encoder -> JSON UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(_finite(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse sérialisée par dumps (orjson si disponible)"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def add_compression(app: FastAPI):
+    """Compression des réponses >= COMPRESSION_MIN_SIZE (brotli si disponible, sinon gzip)"""
+    if COMPRESSION_MIN_SIZE <= 0:
+        return
+    if BrotliMiddleware is not None:
+        app.add_middleware(BrotliMiddleware, quality=BROTLI_QUALITY,
+                           minimum_size=COMPRESSION_MIN_SIZE, gzip_fallback=True)
+    else:
+        app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE, compresslevel=GZIP_LEVEL)
+
+
+def compression_backend() -> dict:
+    return {
+        "json": "orjson" if orjson is not None else "json",
+        "compression": None if COMPRESSION_MIN_SIZE <= 0 else ("br+gzip" if BrotliMiddleware is not None else "gzip"),
+        "min_size": COMPRESSION_MIN_SIZE,
+    }
@@ -1,7 +1,127 @@
 # Script pour créer les tables dans PostgreSQL
+from sqlalchemy import column, delete, func, inspect, select, table, text, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from bank_identity import make_bank_key, normalize_country
+from bank_repository import EXTRACTED_FIELDS, add_file_url
 from database import engine
 from models import Base
 
+
+def migrate_bank_key():
+    """
+    Ajoute banks.bank_key et banks.country_key sur une base existante
+    (idempotent): colonnes, remplissage, fusion des doublons
+    (merge_duplicates) puis index unique (bank_key, fiscal_year).
+    """
+    columns = {c["name"] for c in inspect(engine).get_columns("banks")}
+
+    with engine.begin() as conn:
+        if "bank_key" not in columns:
+            print("🔧 Ajout de la colonne bank_key...")
+            conn.execute(text("ALTER TABLE banks ADD COLUMN bank_key VARCHAR"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_banks_bank_key ON banks (bank_key)"))
+        if "country_key" not in columns:
+            print("🔧 Ajout de la colonne country_key...")
+            conn.execute(text("ALTER TABLE banks ADD COLUMN country_key VARCHAR"))
+
+        rows = conn.execute(text(
+            "SELECT id, bank_name, country FROM banks WHERE bank_key IS NULL OR country_key IS NULL"
+        )).fetchall()
+        for bank_id, bank_name, country in rows:
+            conn.execute(
+                text("UPDATE banks SET bank_key = :key, country_key = :country_key WHERE id = :id"),
+                {"key": make_bank_key(bank_name, country), "country_key": normalize_country(country), "id": bank_id},
+            )
+
+        merge_duplicates(conn, columns | {"bank_key", "country_key"})
+
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_banks_bank_key_fiscal_year "
+            "ON banks (bank_key, fiscal_year)"
+        ))
+
+
+def merge_duplicates(conn, present: set):
+    """
+    Fusionne les lignes d'une même banque-exercice dans la plus récente (id
+    max), du plus ancien au plus récent avec les règles de upsert_bank:
+    montant non nul le plus récent, total_assets à 0 sans effet, libellé le
+    plus ancien, file_urls de toutes les lignes. Les autres lignes sont
+    supprimées, chaque fusion est affichée. Les ratios de la ligne conservée
+    sont recalculés à la prochaine lecture de sa notation.
+
+    Args:
+        present: colonnes de la table existante (une base ancienne n'a pas
+            forcément toutes celles du modèle)
+    """
+    # Table réduite aux colonnes présentes (ni onupdate ni colonne absente)
+    banks = table("banks", *[column(name) for name in sorted(present)])
+    fields = [f for f in EXTRACTED_FIELDS + ["currency"] if f in present]
+    groups = conn.execute(
+        select(banks.c.bank_key, banks.c.fiscal_year)
+        .group_by(banks.c.bank_key, banks.c.fiscal_year).having(func.count() > 1)
+    ).all()
+    for bank_key, fiscal_year in groups:
+        rows = conn.execute(
+            select(banks).where(banks.c.bank_key == bank_key, banks.c.fiscal_year == fiscal_year).order_by(banks.c.id)
+        ).mappings().all()
+        merged = dict(rows[0])
+        for row in rows[1:]:
+            for field in fields:
+                if row[field] is not None:
+                    merged[field] = row[field]
+            if row["total_assets"]:
+                merged["total_assets"] = row["total_assets"]
+            for file_url in (row["file_urls"] or "").split(","):
+                if file_url:
+                    merged["file_urls"] = add_file_url(merged["file_urls"], file_url)
+
+        survivor = rows[-1]["id"]
+        dropped = [row["id"] for row in rows[:-1]]
+        values = {field: merged[field] for field in fields + ["bank_name", "country", "total_assets", "file_urls"]}
+        conn.execute(update(banks).where(banks.c.id == survivor).values(**values))
+        conn.execute(delete(banks).where(banks.c.id.in_(dropped)))
+        print(f"🧹 {bank_key} {fiscal_year}: lignes {dropped} fusionnées dans {survivor}")
+
+
+# Limite de PostgreSQL (INDEX_MAX_KEYS): colonnes clés et INCLUDE confondues
+POSTGRES_MAX_INDEX_COLUMNS = 32
+
+# Index remplacés ou retirés, supprimés des bases existantes
+OBSOLETE_INDEXES = ["ix_extraction_jobs_status_created"]
+
+
+def check_index_limits():
+    """
+    Vérifie que chaque index tient dans la limite de PostgreSQL, y compris
+    quand la base est SQLite (qui ignore INCLUDE): sinon create_all échoue
+    en production et les tables suivantes ne sont pas créées.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+            columns = len(index.expressions) + len(index.dialect_options["postgresql"]["include"] or [])
+            if columns > POSTGRES_MAX_INDEX_COLUMNS:
+                raise ValueError(
+                    f"{index.name}: {columns} colonnes, PostgreSQL en accepte {POSTGRES_MAX_INDEX_COLUMNS}\n{ddl}"
+                )
+
+
+def create_missing_indexes():
+    """create_all n'ajoute pas les nouveaux index aux tables existantes"""
+    with engine.begin() as conn:
+        for name in OBSOLETE_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
 print("🔨 Création des tables...")
+check_index_limits()
 Base.metadata.create_all(bind=engine)
-print("✅ Tables créées avec succès !")
\ No newline at end of file
+migrate_bank_key()
+create_missing_indexes()
+print("✅ Tables créées avec succès !")
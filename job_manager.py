@@ -1,28 +1,117 @@
+import heapq
+import os
+import time
 import uuid
 import threading
+from collections import deque
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+
+from app_logging import bind_context, get_logger, timed
+from job_preflight import (
+    CALIBRATION_SAMPLES, OCR_JOB_CONCURRENCY, calibration, estimate_eta, needs_ocr, preflight_document, priority_at,
+)
+
+logger = get_logger("job_manager")
+
+# Jobs terminés (completed/failed) gardés en mémoire: durée et nombre max.
+# Le résultat ne contient qu'un résumé; les données complètes sont en base
+# (GET /banks/{bank_id}/statement).
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))  # Secondes
+JOB_MAX_RETAINED = int(os.getenv("JOB_MAX_RETAINED", "500"))
+
+# Où tournent les extractions:
+# - thread (défaut): threads du processus de l'API, au plus JOB_CONCURRENCY jobs
+#   à la fois (ordre et limite OCR: job_preflight), jobs en mémoire
+# - database: jobs en base (job_queue), traités par les workers camels_worker;
+#   l'API ne fait qu'insérer et lire. Le dossier d'upload doit être partagé.
+JOB_BACKEND = os.getenv("JOB_BACKEND", "thread").lower()
+if JOB_BACKEND not in ("thread", "database"):
+    raise ValueError(f"JOB_BACKEND inconnu: {JOB_BACKEND} (thread, database)")
+
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))
 
 jobs: Dict[str, dict] = {}
+_jobs_lock = threading.Lock()
+_finished_at: Dict[str, float] = {}  # job_id -> time.monotonic() de fin, ordre de fin
+
+# Ordonnancement (JOB_BACKEND=thread)
+_queue: List[tuple] = []  # Tas (priorité, job_id) des jobs en attente
+_running: Dict[str, tuple] = {}  # job_id -> (time.monotonic() de début, coût estimé, OCR)
+_ratios = deque(maxlen=CALIBRATION_SAMPLES)  # Durée réelle / coût estimé des derniers jobs terminés
+_scheduler_lock = threading.Lock()
+
+
+def _evict_finished():
+    """Retire les jobs terminés expirés, puis les plus anciens au-delà de JOB_MAX_RETAINED"""
+    now = time.monotonic()
+    with _jobs_lock:
+        expired = [job_id for job_id, finished in _finished_at.items() if now - finished > JOB_RESULT_TTL]
+        overflow = len(_finished_at) - len(expired) - JOB_MAX_RETAINED
+        if overflow > 0:
+            dropped = set(expired)
+            expired += [job_id for job_id in _finished_at if job_id not in dropped][:overflow]
+        for job_id in expired:
+            _finished_at.pop(job_id, None)
+            jobs.pop(job_id, None)
+    if expired:
+        logger.debug("jobs expirés retirés", extra={"count": len(expired)})
+
 
-def create_job(file_path: str, filename: str) -> str:
+def create_job(file_path: str, filename: str, preflight: dict = None) -> str:
+    if JOB_BACKEND == "database":
+        from job_queue import enqueue
+        return enqueue(file_path, filename, preflight)
+    _evict_finished()
     job_id = str(uuid.uuid4())
     jobs[job_id] = {
         "id": job_id,
-        "status": "processing",
-        "step": "Initialisation...",
+        "status": "queued",
+        "step": "En attente...",
         "file_path": file_path,
         "filename": filename,
         "created_at": datetime.now().isoformat(),
         "result": None,
-        "error": None
+        "error": None,
+        "preflight": preflight,
     }
     return job_id
 
+def submit_job(file_path: str, filename: str) -> dict:
+    """
+    Préflight du document, puis création du job: mis dans la file de l'API
+    (thread) ou en base pour les workers (database).
+
+    Returns:
+        dict: Le job (get_job), avec sa place et son ETA dans "queue" s'il attend
+    """
+    preflight = preflight_document(file_path)
+    job_id = create_job(file_path, filename, preflight)
+    if JOB_BACKEND == "thread":
+        with _scheduler_lock:
+            heapq.heappush(_queue, (priority_at(time.monotonic(), preflight["estimated_seconds"]), job_id))
+        _dispatch()
+    return get_job(job_id)
+
 def get_job(job_id: str) -> Optional[dict]:
-    return jobs.get(job_id)
+    if JOB_BACKEND == "database":
+        from job_queue import get
+        return get(job_id)
+    _evict_finished()
+    job = jobs.get(job_id)
+    if job is not None and job["status"] == "queued":
+        queue = _queue_eta(job_id)
+        if queue:
+            return {**job, "queue": queue}
+    return job
 
-def update_job(job_id: str, status: str, step: str = None, result=None, error=None):
+def update_job(job_id: str, status: str, step: str = None, result=None, error=None, worker_id: str = None):
+    """worker_id (JOB_BACKEND=database): le job n'est mis a jour que s'il appartient encore a ce worker"""
+    if JOB_BACKEND == "database":
+        from job_queue import update_status
+        if not update_status(job_id, status, step=step, result=result, error=error, worker_id=worker_id):
+            logger.warning("job repris par un autre worker, mise a jour ignoree", extra={"status": status})
+        return
     if job_id in jobs:
         jobs[job_id]["status"] = status
         if step:
@@ -32,119 +121,191 @@ def update_job(job_id: str, status: str, step: str = None, result=None, error=No
         if error:
             jobs[job_id]["error"] = error
         jobs[job_id]["updated_at"] = datetime.now().isoformat()
+        if status in ("completed", "failed"):
+            with _jobs_lock:
+                _finished_at[job_id] = time.monotonic()
+
+
+# ===== ORDONNANCEMENT (JOB_BACKEND=thread) =====
 
-def process_job_async(job_id: str, file_path: str):
+def scheduler_stats() -> dict:
+    """File de l'API (JOB_BACKEND=thread): jobs en attente, en cours, OCR et calibration des ETA"""
+    with _scheduler_lock:
+        return {
+            "queued": len(_queue),
+            "running": len(_running),
+            "concurrency": JOB_CONCURRENCY,
+            "ocr_jobs": {"running": sum(1 for *_, ocr in _running.values() if ocr), "limit": OCR_JOB_CONCURRENCY},
+            "calibration": round(calibration(_ratios), 3),
+        }
+
+def _dispatch():
+    """Lance les jobs en attente les plus prioritaires tant qu'il reste des emplacements"""
+    started = []
+    with _scheduler_lock:
+        ocr_running = sum(1 for *_, ocr in _running.values() if ocr)
+        deferred = []  # Jobs OCR au-delà de la limite: reprennent leur place
+        while _queue and len(_running) < JOB_CONCURRENCY:
+            entry = heapq.heappop(_queue)
+            job = jobs.get(entry[1])
+            if job is None:
+                continue
+            ocr = needs_ocr(job.get("preflight"))
+            if ocr and ocr_running >= OCR_JOB_CONCURRENCY:
+                deferred.append(entry)
+                continue
+            ocr_running += ocr
+            job.update(status="processing", step="Initialisation...")
+            _running[entry[1]] = (time.monotonic(), _estimated_cost(entry[1]), ocr)
+            started.append((entry[1], job["file_path"]))
+        for entry in deferred:
+            heapq.heappush(_queue, entry)
+    for job_id, file_path in started:
+        threading.Thread(target=_run_job, args=(job_id, file_path), daemon=True).start()
+
+def _run_job(job_id: str, file_path: str):
+    try:
+        process_job_async(job_id, file_path)
+    finally:
+        job = jobs.get(job_id) or {}
+        with _scheduler_lock:
+            started_at, cost, _ = _running.pop(job_id)
+            # Documents repris d'une analyse précédente: rien à apprendre sur le coût
+            if cost and job.get("status") == "completed" and not (job.get("result") or {}).get("reused"):
+                _ratios.append((time.monotonic() - started_at) / cost)
+        _dispatch()
+
+def _estimated_cost(job_id: str) -> float:
+    return ((jobs.get(job_id) or {}).get("preflight") or {}).get("estimated_seconds") or 0.0
+
+def _queue_eta(job_id: str) -> Optional[dict]:
+    """Place dans la file et ETA d'un job en attente (None s'il vient d'être lancé)"""
+    now = time.monotonic()
+    with _scheduler_lock:
+        priority = next((p for p, queued_id in _queue if queued_id == job_id), None)
+        if priority is None:
+            return None
+        ahead = [queued_id for p, queued_id in _queue if p < priority]
+        running = [(cost or 0.0, now - started_at) for started_at, cost, _ in _running.values()]
+        factor = calibration(_ratios)
+    eta = estimate_eta(
+        _estimated_cost(job_id), [_estimated_cost(queued_id) for queued_id in ahead], running, JOB_CONCURRENCY, factor,
+    )
+    return {"position": len(ahead) + 1, **eta}
+
+def summarize_result(extracted_data: dict, bank, periods: list, rated: dict) -> dict:
+    """
+    Résultat compact d'un job: identité de l'exercice le plus récent, notes
+    (sans le détail des ratios) et indicateurs clés. Le frontend interroge
+    ce résultat toutes les 3 s: il reste de quelques centaines d'octets.
+    """
+    return {
+        "message": "Analyse complete terminee!",
+        "file": extracted_data.get("name", "Document"),
+        "bank_id": bank.id,
+        "bank": {"bank_name": bank.bank_name, "country": bank.country, "fiscal_year": bank.fiscal_year},
+        "periods": periods,
+        "camels_rating": rated["composite"],
+        "detailed_ratings": {
+            pillar: {"rating": result.get("rating"), "status": result.get("status")}
+            for pillar, result in rated["pillars"].items()
+        },
+        "key_metrics": {
+            "total_assets": bank.total_assets,
+            "car": bank.car_regulatory,
+            "roae": bank.roae,
+            "roaa": bank.roaa,
+            "npl_ratio": bank.npl_ratio,
+            "loans_deposits": bank.gross_loans_deposits
+        }
+    }
+
+def _find_previous_analysis(file_path: str):
+    """
+    Empreinte du document et analyse quasi identique déjà faite
+    (document_fingerprints). Une erreur ici ne bloque pas le job: il est
+    alors analysé normalement.
+
+    Returns:
+        tuple: (empreinte ou None, (id de l'empreinte trouvée, similarité) ou None)
+    """
+    from document_fingerprints import FINGERPRINT_ENABLED, find_duplicate, fingerprint_document
+    from database import session_scope
+    
+    if not FINGERPRINT_ENABLED:
+        return None, None
+    try:
+        with timed(logger, "fingerprint"):
+            fingerprint = fingerprint_document(file_path)
+            with session_scope() as db:
+                match = find_duplicate(db, fingerprint)
+                return fingerprint, (match[0].id, match[1]) if match else None
+    except Exception:
+        logger.warning("empreinte du document en échec", exc_info=True)
+        return None, None
+
+def process_job_async(job_id: str, file_path: str, worker_id: str = None):
     from llm_service import extract_bank_data_from_file
-    from camels_calculator import calculate_all_ratios, rate_capital, rate_asset_quality, rate_earnings, rate_liquidity, get_composite_rating
-    from models import BankDB
-    from database import SessionLocal
+    from rating_methodology import get_methodology
+    from bank_repository import save_extracted_periods
+    from database import session_scope
+    from http_cache import invalidate
+    from models import DocumentFingerprintDB
+    from document_fingerprints import mark_reused, record_fingerprint, reusable_banks
     
+    # Thread dedie: toutes les lignes de log du job portent son id
+    bind_context(job_id=job_id)
     try:
-        # Etape 1: Extraction
-        update_job(job_id, "processing", step="Extraction du document PDF...")
-        extracted_data = extract_bank_data_from_file(file_path)
-        
-        # Etape 2: Creer objet BankDB
-        update_job(job_id, "processing", step="Preparation des donnees...")
-        db = SessionLocal()
-        
-        bank = BankDB(
-            bank_name=extracted_data.get("name", "Inconnu"),
-            country=extracted_data.get("country", "Inconnu"),
-            fiscal_year=extracted_data.get("fiscal_year"),
-            currency=extracted_data.get("currency", "XOF"),
-            file_urls=file_path,
-            total_assets=extracted_data.get("total_assets", 0),
-            cash_reserves_requirements=extracted_data.get("cash_reserves_requirements"),
-            due_from_banks=extracted_data.get("due_from_banks"),
-            investment_securities=extracted_data.get("investment_securities"),
-            gross_loans=extracted_data.get("gross_loans"),
-            loan_loss_provisions=extracted_data.get("loan_loss_provisions"),
-            foreclosed_assets=extracted_data.get("foreclosed_assets"),
-            investment_in_subs_affiliates=extracted_data.get("investment_in_subs_affiliates"),
-            other_assets=extracted_data.get("other_assets"),
-            fixed_assets=extracted_data.get("fixed_assets"),
-            deposits=extracted_data.get("deposits"),
-            interbank_liabilities=extracted_data.get("interbank_liabilities"),
-            other_liabilities=extracted_data.get("other_liabilities"),
-            total_liabilities=extracted_data.get("total_liabilities"),
-            paid_in_capital=extracted_data.get("paid_in_capital"),
-            reserves=extracted_data.get("reserves"),
-            retained_earnings=extracted_data.get("retained_earnings"),
-            net_profit=extracted_data.get("net_profit"),
-            total_equity=extracted_data.get("total_equity"),
-            interest_income=extracted_data.get("interest_income"),
-            interest_expenses=extracted_data.get("interest_expenses"),
-            net_interest_income=extracted_data.get("net_interest_income"),
-            non_interest_income_commissions=extracted_data.get("non_interest_income_commissions"),
-            net_income_investment=extracted_data.get("net_income_investment"),
-            other_net_income=extracted_data.get("other_net_income"),
-            operating_expenses=extracted_data.get("operating_expenses"),
-            operating_profit=extracted_data.get("operating_profit"),
-            provision_expenses=extracted_data.get("provision_expenses"),
-            non_operating_profit_loss=extracted_data.get("non_operating_profit_loss"),
-            income_tax=extracted_data.get("income_tax"),
-            net_income=extracted_data.get("net_income"),
-            car_regulatory=extracted_data.get("car_regulatory"),
-            car_bank_reported=extracted_data.get("car_bank_reported"),
-            problem_assets_mn=extracted_data.get("problem_assets_mn"),
-            npls_mn=extracted_data.get("npls_mn"),
-            llr_mn=extracted_data.get("llr_mn"),
-            fx_rate_period_end=extracted_data.get("fx_rate_period_end"),
-            fx_rate_period_avg=extracted_data.get("fx_rate_period_avg")
-        )
-        if extracted_data.get("npl_ratio_reported"):
-            bank.npl_ratio_reported = extracted_data.get("npl_ratio_reported") / 100
-        if extracted_data.get("coverage_ratio_reported"):
-            bank.coverage_ratio_reported = extracted_data.get("coverage_ratio_reported") / 100
-        if extracted_data.get("roe_reported"):
-            bank.roe_reported = extracted_data.get("roe_reported") / 100
-        if extracted_data.get("roa_reported"):
-            bank.roa_reported = extracted_data.get("roa_reported") / 100
-        if extracted_data.get("cost_income_reported"):
-            bank.cost_income_reported = extracted_data.get("cost_income_reported") / 100
-        # Etape 3: Calculer ratios
-        update_job(job_id, "processing", step="Calcul des ratios CAMELS...")
-        bank = calculate_all_ratios(bank)
+        # Etape 1: Document deja analyse (copie, re-scan, autre export) ?
+        update_job(job_id, "processing", step="Recherche d'un document deja analyse...", worker_id=worker_id)
+        fingerprint, match = _find_previous_analysis(file_path)
         
-        # Etape 4: Sauvegarder
-        update_job(job_id, "processing", step="Sauvegarde en base de donnees...")
-        db.add(bank)
-        db.commit()
-        db.refresh(bank)
+        # Etape 2: Extraction (sautee si le document est connu)
+        if match:
+            logger.info("document deja analyse, extraction reutilisee", extra={
+                "fingerprint_id": match[0], "similarity": round(match[1], 3),
+            })
+        else:
+            update_job(job_id, "processing", step="Extraction du document PDF...", worker_id=worker_id)
+            with timed(logger, "extraction", file=os.path.basename(file_path)):
+                extracted_data = extract_bank_data_from_file(
+                    file_path, ocr_prefix=fingerprint.ocr_pages if fingerprint else None
+                )
         
-        # Etape 5: Generer ratings
-        ratings = {
-            "capital": rate_capital(bank),
-            "asset_quality": rate_asset_quality(bank),
-            "earnings": rate_earnings(bank),
-            "liquidity": rate_liquidity(bank)
-        }
-        composite = get_composite_rating(ratings["capital"], ratings["asset_quality"], ratings["earnings"], ratings["liquidity"])
-        
-        bank_dict = {k: v for k, v in bank.__dict__.items() if not k.startswith('_')}
-        db.close()
-        
-        result = {
-            "message": "Analyse complete terminee!",
-            "file": extracted_data.get("name", "Document"),
-            "bank": bank_dict,
-            "camels_rating": composite,
-            "detailed_ratings": ratings,
-            "key_metrics": {
-                "total_assets": bank.total_assets,
-                "car": bank.car_regulatory,
-                "roae": bank.roae,
-                "roaa": bank.roaa,
-                "npl_ratio": bank.npl_ratio,
-                "loans_deposits": bank.gross_loans_deposits
-            }
-        }
+        # Etape 3-5: Un BankDB par exercice present, ratios, sauvegarde
+        update_job(job_id, "processing", step="Calcul des ratios et sauvegarde de chaque exercice...", worker_id=worker_id)
+        # session_scope: session fermee (et connexion rendue au pool) meme en cas d'erreur
+        with session_scope() as db, timed(logger, "save_periods"):
+            banks = None
+            if match:
+                previous = db.get(DocumentFingerprintDB, match[0])
+                extracted_data = previous.extracted_data
+                banks = reusable_banks(db, previous)
+                mark_reused(db, previous)
+            saved = banks is None
+            if saved:
+                banks = save_extracted_periods(db, extracted_data, file_path)
+            bank = banks[-1]  # Exercice le plus recent
+            
+            # Etape 6: Generer ratings (methodologie par defaut)
+            rated = get_methodology().rate_bank(bank)
+            
+            periods = [{"bank_id": b.id, "fiscal_year": b.fiscal_year} for b in banks]
+            result = summarize_result(extracted_data, bank, periods, rated)
+            if fingerprint and not match:
+                try:
+                    record_fingerprint(db, fingerprint, os.path.basename(file_path), extracted_data, [b.id for b in banks])
+                except Exception:
+                    db.rollback()
+                    logger.warning("enregistrement de l'empreinte en échec", exc_info=True)
+        if saved:
+            invalidate()
+        result["reused"] = bool(match)
         
-        update_job(job_id, "completed", step="Termine!", result=result)
+        update_job(job_id, "completed", step="Termine!", result=result, worker_id=worker_id)
+        bind_context(bank_id=result["bank_id"])
+        logger.info("job termine", extra={"periods": len(periods), "composite": result["camels_rating"].get("composite_rating")})
         
     except Exception as e:
-        print(f"ERREUR JOB {job_id}: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        update_job(job_id, "failed", step="Echec", error=str(e))
\ No newline at end of file
+        logger.exception("job en echec")
+        update_job(job_id, "failed", step="Echec", error=str(e), worker_id=worker_id)
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Préflight d'un document à l'upload et estimation du coût de son analyse.
+
+Lecture bon marché (taille, nombre de pages, couche texte des premières
+pages) sans OCR ni LLM:
+- pages à passer à l'OCR: toutes si le PDF n'a pas de couche texte, 1 pour
+  une image, 0 sinon
+- caractères du document (extrapolés des pages échantillonnées, ou
+  PREFLIGHT_OCR_CHARS_PER_PAGE par page OCR), tokens et appels LLM (un par
+  extrait de LLM_CHUNK_CHARS). Estimation haute: le parseur déterministe
+  évite souvent l'appel.
+
+Le coût (estimated_seconds) est une somme de coûts unitaires qui ignore le
+parallélisme; il sert à ordonner les jobs (le plus court d'abord). Pour les
+ETA, il est multiplié par un facteur de calibration: la médiane durée réelle
+/ coût estimé des derniers jobs terminés (parallélisme et machine compris).
+
+Ordonnancement (job_manager en mode thread, job_queue en mode database):
+- le job en attente de plus petite priorité passe en premier, avec
+  priorité = arrivée + coût estimé / JOB_AGING. Les jobs courts passent
+  devant, mais un job long ne cède la place qu'aux jobs arrivés moins de
+  coût / JOB_AGING secondes après lui: il n'attend jamais indéfiniment.
+  (Équivaut à "coût - JOB_AGING x attente", sans recalcul dans le temps.)
+- au plus OCR_JOB_CONCURRENCY jobs avec OCR tournent à la fois; les autres
+  jobs continuent de passer.
+"""
+import os
+from datetime import datetime, timedelta
+from statistics import median
+from typing import Iterable, Optional, Tuple
+
+PREFLIGHT_SAMPLE_PAGES = int(os.getenv("PREFLIGHT_SAMPLE_PAGES", "3"))
+PREFLIGHT_OCR_CHARS_PER_PAGE = int(os.getenv("PREFLIGHT_OCR_CHARS_PER_PAGE", "3000"))
+# Coûts unitaires (secondes)
+PREFLIGHT_OCR_SECONDS_PER_PAGE = float(os.getenv("PREFLIGHT_OCR_SECONDS_PER_PAGE", "3.0"))
+PREFLIGHT_TEXT_SECONDS_PER_PAGE = float(os.getenv("PREFLIGHT_TEXT_SECONDS_PER_PAGE", "0.05"))
+PREFLIGHT_LLM_SECONDS_PER_CALL = float(os.getenv("PREFLIGHT_LLM_SECONDS_PER_CALL", "20"))
+PREFLIGHT_OVERHEAD_SECONDS = float(os.getenv("PREFLIGHT_OVERHEAD_SECONDS", "1.0"))
+
+JOB_AGING = float(os.getenv("JOB_AGING", "1.0"))  # Secondes de priorité gagnées par seconde d'attente
+OCR_JOB_CONCURRENCY = int(os.getenv("OCR_JOB_CONCURRENCY", "1"))
+CALIBRATION_SAMPLES = 50  # Derniers jobs terminés pris en compte
+
+# Même seuil que llm_service: en dessous, le PDF est considéré comme scanné
+TEXT_LAYER_MIN_CHARS = 100
+CHARS_PER_TOKEN = 4
+# Bornes du facteur de calibration (quelques jobs aberrants ne faussent pas les ETA)
+CALIBRATION_BOUNDS = (0.1, 10.0)
+
+
+def preflight_document(file_path: str) -> dict:
+    """
+    Returns:
+        dict: {"file_size", "pages", "text_layer", "ocr_pages", "chars",
+               "llm_calls", "llm_input_tokens", "estimated_seconds"}
+               (+ "error" si le document n'a pas pu être lu: coût d'un
+               document d'une page, l'analyse dira ce qui ne va pas)
+    """
+    from document_chunks import LLM_CHUNK_CHARS
+
+    size = os.path.getsize(file_path)
+    try:
+        if file_path.lower().endswith(".pdf"):
+            from pdf_text import count_pages, extract_pdf_pages, resolve_backend
+
+            backend = resolve_backend()
+            pages = count_pages(file_path, backend)
+            sample = extract_pdf_pages(file_path, backend, workers=1, max_pages=PREFLIGHT_SAMPLE_PAGES)
+            sample_chars = sum(len(text.strip()) for text in sample)
+            text_layer = sample_chars >= TEXT_LAYER_MIN_CHARS
+            ocr_pages = 0 if text_layer else pages
+            chars = sample_chars * pages // max(len(sample), 1) if text_layer else pages * PREFLIGHT_OCR_CHARS_PER_PAGE
+        else:
+            pages, text_layer, ocr_pages, chars = 1, False, 1, PREFLIGHT_OCR_CHARS_PER_PAGE
+        error = None
+    except Exception as e:
+        pages, text_layer, ocr_pages, chars = 1, False, 0, PREFLIGHT_OCR_CHARS_PER_PAGE
+        error = str(e)
+
+    llm_calls = max(-(-chars // LLM_CHUNK_CHARS), 1)
+    result = {
+        "file_size": size,
+        "pages": pages,
+        "text_layer": text_layer,
+        "ocr_pages": ocr_pages,
+        "chars": chars,
+        "llm_calls": llm_calls,
+        "llm_input_tokens": chars // CHARS_PER_TOKEN,
+        "estimated_seconds": round(estimate_seconds(pages, ocr_pages, llm_calls), 1),
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+def estimate_seconds(pages: int, ocr_pages: int, llm_calls: int) -> float:
+    return (
+        PREFLIGHT_OVERHEAD_SECONDS
+        + ocr_pages * PREFLIGHT_OCR_SECONDS_PER_PAGE
+        + (pages - ocr_pages) * PREFLIGHT_TEXT_SECONDS_PER_PAGE
+        + llm_calls * PREFLIGHT_LLM_SECONDS_PER_CALL
+    )
+
+
+# ===== ORDONNANCEMENT =====
+
+def priority_at(arrival, cost: Optional[float]):
+    """Priorité d'un job (plus petite = plus tôt): arrivée (datetime ou secondes) + coût / JOB_AGING"""
+    delay = (cost or 0.0) / JOB_AGING
+    return arrival + timedelta(seconds=delay) if isinstance(arrival, datetime) else arrival + delay
+
+
+def needs_ocr(preflight: Optional[dict]) -> bool:
+    return bool(preflight and preflight.get("ocr_pages"))
+
+
+def calibration(ratios: Iterable[float]) -> float:
+    """Médiane des rapports durée réelle / coût estimé des jobs terminés (1 sans historique)"""
+    ratios = [ratio for ratio in ratios if ratio and ratio > 0]
+    if not ratios:
+        return 1.0
+    low, high = CALIBRATION_BOUNDS
+    return min(max(median(ratios), low), high)
+
+
+def estimate_eta(own_cost: float, ahead_costs: Iterable[float], running: Iterable[Tuple[float, float]],
+                 slots: int, factor: float) -> dict:
+    """
+    Attente et fin estimées d'un job en file: travail restant des jobs en
+    cours (coût estimé, secondes écoulées) et coût des jobs qui passent avant
+    lui, répartis sur les emplacements. Ne tient pas compte de la limite OCR.
+
+    Returns:
+        dict: {"wait_seconds", "eta_seconds"} (depuis maintenant)
+    """
+    remaining = sum(max(cost * factor - elapsed, 0.0) for cost, elapsed in running)
+    wait = (remaining + sum(ahead_costs) * factor) / max(slots, 1)
+    return {"wait_seconds": round(wait, 1), "eta_seconds": round(wait + own_cost * factor, 1)}
@@ -0,0 +1,277 @@
+"""
+File d'attente des jobs d'analyse en base (JOB_BACKEND=database).
+
+L'API insère les jobs (status "queued") et ne fait plus d'extraction; les
+workers (python -m camels_worker, sur une ou plusieurs machines) les
+réservent un par un:
+
+    SELECT ... WHERE status = 'queued' ORDER BY priority_at
+    LIMIT 1 FOR UPDATE SKIP LOCKED
+
+priority_at est fixé à l'insertion d'après le préflight (job_preflight):
+les jobs courts passent devant, sans affamer les longs. Quand
+OCR_JOB_CONCURRENCY jobs avec OCR tournent déjà (tous workers confondus),
+seuls les jobs sans OCR sont réservés. Le comptage précède la réservation:
+deux workers qui réservent au même instant peuvent dépasser la limite d'un
+job, le temps d'un cycle.
+
+Deux workers ne réservent jamais le même job et ne s'attendent pas l'un
+l'autre. Tant qu'un job tourne, son worker rafraîchit heartbeat_at; un job
+dont le battement date de plus de JOB_STALE_AFTER secondes (worker tué,
+machine perdue) est remis en attente, ou passe en échec après
+JOB_MAX_ATTEMPTS tentatives.
+
+Les horodatages sont en UTC, pris sur l'horloge des machines (supposées
+synchronisées par NTP).
+"""
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import func, select, update
+
+from database import session_scope
+from job_preflight import CALIBRATION_SAMPLES, OCR_JOB_CONCURRENCY, calibration, estimate_eta, needs_ocr, priority_at
+from models import ExtractionJobDB, WorkerDB
+
+JOB_STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", "120"))  # Secondes sans battement
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Worker considéré mort (absent de /metrics/workers) après ce délai sans battement
+WORKER_STALE_AFTER = int(os.getenv("WORKER_STALE_AFTER", "60"))
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _to_dict(job: ExtractionJobDB) -> dict:
+    """Même forme que les jobs en mémoire de job_manager"""
+    return {
+        "id": job.id,
+        "status": job.status,
+        "step": job.step,
+        "file_path": job.file_path,
+        "filename": job.filename,
+        "created_at": _iso(job.created_at),
+        "updated_at": _iso(job.updated_at),
+        "result": job.result,
+        "error": job.error,
+        "worker_id": job.worker_id,
+        "attempts": job.attempts,
+        "preflight": job.preflight,
+    }
+
+
+# ===== CÔTÉ API =====
+
+def enqueue(file_path: str, filename: str, preflight: Optional[dict] = None) -> str:
+    job_id = str(uuid.uuid4())
+    now = _utcnow()
+    cost = preflight.get("estimated_seconds") if preflight else None
+    with session_scope() as db:
+        db.add(ExtractionJobDB(
+            id=job_id, status="queued", step="En attente d'un worker...",
+            file_path=file_path, filename=filename, attempts=0,
+            preflight=preflight, estimated_seconds=cost, needs_ocr=needs_ocr(preflight),
+            priority_at=priority_at(now, cost), created_at=now,
+        ))
+        db.commit()
+    return job_id
+
+
+def get(job_id: str) -> Optional[dict]:
+    """Job, avec sa place et son ETA ("queue") s'il est en attente"""
+    with session_scope() as db:
+        job = db.get(ExtractionJobDB, job_id)
+        if job is None:
+            return None
+        result = _to_dict(job)
+        if job.status == "queued":
+            result["queue"] = _queue_eta(db, job)
+        return result
+
+
+def _queue_eta(db, job: ExtractionJobDB) -> dict:
+    """Place dans la file et ETA, calibrés sur les derniers jobs terminés"""
+    now = _utcnow()
+    ahead = db.scalars(select(ExtractionJobDB.estimated_seconds).where(
+        ExtractionJobDB.status == "queued", ExtractionJobDB.priority_at < job.priority_at,
+    )).all()
+    running = db.execute(select(ExtractionJobDB.estimated_seconds, ExtractionJobDB.started_at).where(
+        ExtractionJobDB.status == "processing",
+    )).all()
+    finished = db.execute(
+        select(ExtractionJobDB.estimated_seconds, ExtractionJobDB.started_at,
+               ExtractionJobDB.finished_at, ExtractionJobDB.result)
+        .where(ExtractionJobDB.status == "completed", ExtractionJobDB.estimated_seconds > 0)
+        .order_by(ExtractionJobDB.finished_at.desc()).limit(CALIBRATION_SAMPLES)
+    ).all()
+    cutoff = now - timedelta(seconds=WORKER_STALE_AFTER)
+    slots = db.scalar(select(func.sum(WorkerDB.concurrency)).where(
+        WorkerDB.heartbeat_at >= cutoff, WorkerDB.status == "running",
+    )) or 1
+    # Les documents repris d'une analyse précédente ne disent rien du coût d'une extraction
+    factor = calibration(
+        (end - start).total_seconds() / cost
+        for cost, start, end, result in finished
+        if start and end and not (result or {}).get("reused")
+    )
+    eta = estimate_eta(
+        job.estimated_seconds or 0.0, [cost or 0.0 for cost in ahead],
+        [(cost or 0.0, (now - start).total_seconds()) for cost, start in running if start], slots, factor,
+    )
+    return {"position": len(ahead) + 1, **eta}
+
+
+def update_status(job_id: str, status: str, step: str = None, result=None, error=None,
+                  worker_id: str = None) -> bool:
+    """
+    Met à jour le job. Avec worker_id, seulement s'il appartient encore à ce
+    worker: un job remis en attente par requeue_stale (battement perdu) puis
+    repris ailleurs n'est pas écrasé par l'ancien worker.
+
+    Returns:
+        bool: False si aucune ligne n'a été modifiée
+    """
+    values = {"status": status, "updated_at": _utcnow()}
+    if step:
+        values["step"] = step
+    if result:
+        values["result"] = result
+    if error:
+        values["error"] = error
+    if status in ("completed", "failed"):
+        values["finished_at"] = values["updated_at"]
+    stmt = update(ExtractionJobDB).where(ExtractionJobDB.id == job_id)
+    if worker_id is not None:
+        stmt = stmt.where(ExtractionJobDB.worker_id == worker_id)
+    with session_scope() as db:
+        updated = db.execute(stmt.values(**values)).rowcount
+        db.commit()
+    return updated > 0
+
+
+def queue_stats() -> dict:
+    """Jobs par statut, âge du plus ancien job en attente, jobs OCR en cours et workers en vie"""
+    cutoff = _utcnow() - timedelta(seconds=WORKER_STALE_AFTER)
+    with session_scope() as db:
+        counts = dict(db.execute(
+            select(ExtractionJobDB.status, func.count()).group_by(ExtractionJobDB.status)
+        ).all())
+        oldest = db.scalar(select(func.min(ExtractionJobDB.created_at)).where(ExtractionJobDB.status == "queued"))
+        ocr_running = db.scalar(select(func.count()).select_from(ExtractionJobDB).where(
+            ExtractionJobDB.status == "processing", ExtractionJobDB.needs_ocr.is_(True),
+        ))
+        workers = db.scalars(
+            select(WorkerDB).where(WorkerDB.heartbeat_at >= cutoff, WorkerDB.status != "stopped").order_by(WorkerDB.id)
+        ).all()
+        alive = [{
+            "id": w.id, "hostname": w.hostname, "pid": w.pid, "status": w.status,
+            "concurrency": w.concurrency, "active_jobs": w.active_jobs,
+            "started_at": _iso(w.started_at), "heartbeat_at": _iso(w.heartbeat_at),
+        } for w in workers]
+    capacity = sum(w["concurrency"] for w in alive if w["status"] == "running")
+    busy = sum(w["active_jobs"] for w in alive)
+    return {
+        "jobs": {status: counts.get(status, 0) for status in ("queued", "processing", "completed", "failed")},
+        "oldest_queued_seconds": round((_utcnow() - oldest).total_seconds(), 1) if oldest else None,
+        "ocr_jobs": {"running": ocr_running, "limit": OCR_JOB_CONCURRENCY},
+        "workers": alive,
+        "capacity": capacity,
+        "free_slots": max(capacity - busy, 0),
+    }
+
+
+# ===== CÔTÉ WORKER =====
+
+def new_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def register_worker(worker_id: str, concurrency: int):
+    now = _utcnow()
+    with session_scope() as db:
+        db.merge(WorkerDB(
+            id=worker_id, hostname=socket.gethostname(), pid=os.getpid(), concurrency=concurrency,
+            active_jobs=0, status="running", started_at=now, heartbeat_at=now,
+        ))
+        db.commit()
+
+
+def heartbeat(worker_id: str, job_ids: List[str], status: str = "running"):
+    """Battement du worker et de ses jobs en cours (un seul commit)"""
+    now = _utcnow()
+    with session_scope() as db:
+        db.execute(update(WorkerDB).where(WorkerDB.id == worker_id).values(
+            heartbeat_at=now, active_jobs=len(job_ids), status=status,
+        ))
+        if job_ids:
+            db.execute(update(ExtractionJobDB).where(
+                ExtractionJobDB.id.in_(job_ids), ExtractionJobDB.worker_id == worker_id,
+            ).values(heartbeat_at=now))
+        db.commit()
+
+
+def claim(worker_id: str) -> Optional[dict]:
+    """
+    Réserve le job en attente le plus prioritaire, sans OCR si la limite
+    OCR_JOB_CONCURRENCY est atteinte (None si rien n'est réservable)
+    """
+    with session_scope() as db:
+        query = select(ExtractionJobDB).where(ExtractionJobDB.status == "queued")
+        ocr_running = db.scalar(select(func.count()).select_from(ExtractionJobDB).where(
+            ExtractionJobDB.status == "processing", ExtractionJobDB.needs_ocr.is_(True),
+        ))
+        if ocr_running >= OCR_JOB_CONCURRENCY:
+            query = query.where(ExtractionJobDB.needs_ocr.is_(False))
+        job = db.scalars(
+            query.order_by(ExtractionJobDB.priority_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if job is None:
+            return None
+        now = _utcnow()
+        job.status = "processing"
+        job.step = "Pris en charge par un worker..."
+        job.worker_id = worker_id
+        job.attempts += 1
+        job.started_at = job.heartbeat_at = job.updated_at = now
+        db.commit()
+        return _to_dict(job)
+
+
+def requeue_stale() -> int:
+    """
+    Jobs "processing" sans battement depuis JOB_STALE_AFTER: remis en attente,
+    en échec si JOB_MAX_ATTEMPTS est atteint. Idempotent, sûr à lancer depuis
+    plusieurs workers à la fois.
+    """
+    now = _utcnow()
+    stale = (
+        (ExtractionJobDB.status == "processing")
+        & (ExtractionJobDB.heartbeat_at < now - timedelta(seconds=JOB_STALE_AFTER))
+    )
+    with session_scope() as db:
+        failed = db.execute(update(ExtractionJobDB).where(stale, ExtractionJobDB.attempts >= JOB_MAX_ATTEMPTS).values(
+            status="failed", step="Echec", error="Worker perdu (plus de battement)", updated_at=now, finished_at=now,
+        )).rowcount
+        requeued = db.execute(update(ExtractionJobDB).where(stale).values(
+            status="queued", step="Remis en attente (worker perdu)...", worker_id=None, updated_at=now,
+        )).rowcount
+        db.commit()
+    return requeued + failed
+
+
+def unregister_worker(worker_id: str):
+    with session_scope() as db:
+        db.execute(update(WorkerDB).where(WorkerDB.id == worker_id).values(
+            status="stopped", active_jobs=0, heartbeat_at=_utcnow(),
+        ))
+        db.commit()
@@ -0,0 +1,99 @@
+"""
+Métriques des appels LLM par niveau de modèle (tier): latence, tokens, coût
+estimé et taux d'acceptation des extractions par la validation comptable.
+
+Compteurs en mémoire, par processus (comme le cache HTTP), servis par
+GET /metrics/llm. Le coût est estimé à partir de MODEL_PRICING (USD par
+million de tokens); un modèle absent de la table n'a pas de coût.
+"""
+import os
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+# USD par million de tokens (entrée, sortie)
+MODEL_PRICING = {
+    "claude-3-5-haiku-20241022": (0.80, 4.00),
+    "claude-3-5-sonnet-20241022": (3.00, 15.00),
+}
+# Latences gardées par tier pour les percentiles
+LATENCY_WINDOW = int(os.getenv("LLM_METRICS_WINDOW", "1000"))
+
+
+def call_cost(model: str, input_tokens: Optional[int], output_tokens: Optional[int]) -> Optional[float]:
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        return None
+    return ((input_tokens or 0) * pricing[0] + (output_tokens or 0) * pricing[1]) / 1_000_000
+
+
+class LLMMetrics:
+    """Compteurs par tier (thread-safe: appels depuis les threads des jobs et du pool LLM)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tiers: Dict[str, dict] = {}
+        self.escalations = {"fields": 0, "document": 0}
+
+    def _tier(self, tier: str) -> dict:
+        if tier not in self.tiers:
+            self.tiers[tier] = {
+                "models": set(), "calls": 0, "errors": 0, "input_tokens": 0, "output_tokens": 0,
+                "cost_usd": 0.0, "latencies": deque(maxlen=LATENCY_WINDOW), "validated": 0, "accepted": 0,
+            }
+        return self.tiers[tier]
+
+    def record_call(self, tier: str, model: str, seconds: float, input_tokens: Optional[int] = None,
+                    output_tokens: Optional[int] = None, error: bool = False):
+        with self.lock:
+            stats = self._tier(tier)
+            stats["models"].add(model)
+            stats["calls"] += 1
+            stats["errors"] += int(error)
+            stats["input_tokens"] += input_tokens or 0
+            stats["output_tokens"] += output_tokens or 0
+            stats["cost_usd"] += call_cost(model, input_tokens, output_tokens) or 0.0
+            stats["latencies"].append(seconds)
+
+    def record_validation(self, tier: str, passed: bool):
+        """Résultat de la validation d'une extraction produite par ce tier"""
+        with self.lock:
+            stats = self._tier(tier)
+            stats["validated"] += 1
+            stats["accepted"] += int(passed)
+
+    def record_escalation(self, scope: str):
+        """scope: "fields" (champs en échec seulement) ou "document" (ré-extraction complète)"""
+        with self.lock:
+            self.escalations[scope] += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            tiers = {}
+            for tier, stats in self.tiers.items():
+                latencies = sorted(stats["latencies"])
+
+                def percentile(q):
+                    return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1) if latencies else None
+
+                tiers[tier] = {
+                    "models": sorted(stats["models"]),
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "input_tokens": stats["input_tokens"],
+                    "output_tokens": stats["output_tokens"],
+                    "cost_usd": round(stats["cost_usd"], 4),
+                    "latency_ms": {
+                        "avg": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+                        "p50": percentile(0.5),
+                        "p95": percentile(0.95),
+                        "max": round(latencies[-1] * 1000, 1) if latencies else None,
+                    },
+                    "validated": stats["validated"],
+                    "accepted": stats["accepted"],
+                    "acceptance_rate": round(stats["accepted"] / stats["validated"], 3) if stats["validated"] else None,
+                }
+            return {"tiers": tiers, "escalations": dict(self.escalations)}
+
+
+llm_metrics = LLMMetrics()
@@ -1,31 +1,54 @@
-import anthropic
+import contextvars
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 from dotenv import load_dotenv
 import base64
 import json
-from PyPDF2 import PdfReader
+from app_logging import debug_dump, get_logger, timed
+from document_chunks import merge_extractions, select_chunks, split_into_chunks
+from extraction_validation import failed_check_hints, validate_extraction
+from llm_metrics import llm_metrics
+from ocr import OCR_DPI, OCR_PREPROCESS, ocr_image_file, ocr_pdf
+from ocr import warm_pool as warm_ocr_pool
+from pdf_text import count_pages, extract_pdf_pages, resolve_backend, warm_pool
+from statement_parser import parse_financial_statements
 
 load_dotenv()
-client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+logger = get_logger("llm_service")
 
-def extract_bank_data_from_file(file_path: str) -> dict:
-    """
-    Extrait les données financières d'un document bancaire UEMOA.
-    
-    Supporte:
-    - PDFs avec texte extractible (lecture directe)
-    - PDFs scannés (OCR sur TOUTES les pages, puis texte à Claude)
-    - Images directes (JPG, PNG)
-    
-    Returns:
-        dict: Données financières au format JSON
-    """
-    
-    # ========================================
-    # PROMPT CLAUDE (identique pour tous)
-    # ========================================
-    
-    prompt = """
+# Client Claude créé au premier appel (import d'anthropic: ~0,8 s), une fois par processus
+_client = None
+_client_lock = threading.Lock()
+
+# Tiers de modèles: "fast" pour toutes les extractions, "strong" seulement pour
+# ce que la validation comptable rejette (LLM_STRONG_MODEL vide = pas d'escalade)
+LLM_MODEL = os.getenv("LLM_MODEL", "claude-3-5-haiku-20241022")
+LLM_STRONG_MODEL = os.getenv("LLM_STRONG_MODEL", "claude-3-5-sonnet-20241022")
+LLM_TIERS = {"fast": LLM_MODEL, "strong": LLM_STRONG_MODEL}
+# Au-delà de ce nombre de champs à revoir, tout le document est ré-extrait par le tier supérieur
+LLM_ESCALATE_MAX_FIELDS = int(os.getenv("LLM_ESCALATE_MAX_FIELDS", "8"))
+# Client factice (llm_stub) pour les tests de charge: pas d'appel réseau ni de coût
+LLM_STUB = os.getenv("LLM_STUB", "0").lower() in ("1", "true", "yes")
+# Appels simultanés au LLM (extraits d'un même document et jobs confondus)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+
+_llm_pool: Optional[ThreadPoolExecutor] = None
+
+# Parseur déterministe: au-dessus de ce score on n'appelle pas Claude,
+# entre les deux seuils on ne lui demande que les champs manquants
+PARSER_SKIP_THRESHOLD = float(os.getenv("PARSER_SKIP_THRESHOLD", "0.9"))
+PARSER_GAP_FILL_THRESHOLD = float(os.getenv("PARSER_GAP_FILL_THRESHOLD", "0.6"))
+
+
+# ========================================
+# PROMPT CLAUDE (identique pour tous)
+# ========================================
+
+EXTRACTION_PROMPT = """
 Tu es un expert financier bancaire spécialisé dans la zone UEMOA (Union Économique et Monétaire Ouest-Africaine).
 
 Ta mission: Extraire TOUTES les données du bilan et du compte de résultat.
@@ -110,6 +133,15 @@ CHERCHE CES RATIOS DÉJÀ CALCULÉS DANS LE DOCUMENT (section "Ratios", "Indicat
 - roe_reported → "ROE" / "Rentabilité économique" / "Return on Equity" (format: 28.51 pour 28.51%)
 - roa_reported → "ROA" / "Rentabilité des actifs" / "Return on Assets" (format: 2.59 pour 2.59%)
 - cost_income_reported → "Coefficient d'exploitation" / "Cost to Income" / "Ratio d'efficience" (format: 45.09 pour 45.09%)
+═══════════════════════════════════════════════════════════════════════════════
+EXERCICES MULTIPLES (colonnes N et N-1):
+═══════════════════════════════════════════════════════════════════════════════
+
+- Les états financiers présentent souvent plusieurs exercices côte à côte ("31/12/2022" | "31/12/2023")
+- Les champs principaux du JSON concernent l'exercice le PLUS RÉCENT
+- prior_periods → un objet par exercice antérieur présent dans le document, avec les MÊMES champs
+  (bilan, compte de résultat, ratios) et son propre "fiscal_year". Liste vide [] si un seul exercice.
+
 ═══════════════════════════════════════════════════════════════════════════════
 FORMAT DE SORTIE (JSON UNIQUEMENT):
 ═══════════════════════════════════════════════════════════════════════════════
@@ -161,23 +193,196 @@ FORMAT DE SORTIE (JSON UNIQUEMENT):
     "coverage_ratio_reported": 95.5,
     "roe_reported": 28.51,
     "roa_reported": 2.59,
-    "cost_income_reported": 45.09
+    "cost_income_reported": 45.09,
+    "prior_periods": [
+        {
+            "fiscal_year": "2022",
+            "total_assets": 650000,
+            "total_equity": 95000,
+            "net_income": 4500
+        }
+    ]
 }
 """
+
+# Indications de recherche par champ ("- total_assets → "TOTAL ACTIF" / ...), reprises du prompt
+FIELD_HINTS = dict(re.findall(r"^- (\w+) → (.+)$", EXTRACTION_PROMPT, re.MULTILINE))
+FIELD_HINTS.update({
+    "name": "Nom de la banque",
+    "country": "Pays (zone UEMOA)",
+    "fiscal_year": "Exercice, ex: \"2023\"",
+    "currency": "Devise, ex: \"XOF\"",
+})
+
+
+def build_gap_prompt(fields: list, checks: dict = None) -> str:
+    """
+    Prompt réduit: ne demande à Claude que les champs non trouvés par le
+    parseur, ou (checks) ceux d'une extraction qui viole ces identités comptables.
+    """
+    wanted = "\n".join(f"- {field} → {FIELD_HINTS.get(field, field)}" for field in fields)
+    template = ",\n".join(f'    "{field}": null' for field in fields)
+    if checks:
+        rules = "\n".join(f"- {hint}" for hint in checks.values())
+        wanted += f"""
+
+Une première lecture de ces champs ne respecte pas les identités comptables suivantes.
+Relis les montants dans les états financiers: ils doivent les vérifier.
+
+{rules}"""
+    return f"""
+Tu es un expert financier bancaire spécialisé dans la zone UEMOA (Union Économique et Monétaire Ouest-Africaine).
+
+Une lecture automatique du document a déjà extrait la plupart des données.
+Ta mission: trouver UNIQUEMENT les champs suivants dans le bilan, le compte de résultat ou les ratios:
+
+{wanted}
+
+⚠️ NE RETOURNE QUE LE JSON - PAS DE TEXTE AVANT OU APRÈS
+⚠️ Utilise null pour les valeurs manquantes (pas de 0 ou de valeurs inventées)
+⚠️ TOUS les montants en VALEUR ABSOLUE sauf loan_loss_provisions (négatif)
+
+{{
+{template}
+}}
+"""
+
+
+# Ajouté au prompt quand le document est envoyé en plusieurs extraits
+PARTIAL_INSTRUCTION = """
+⚠️ Le texte ci-dessous n'est qu'un EXTRAIT du document (les autres pages sont lues séparément):
+- ne remplis que les champs dont la valeur figure dans CET extrait, null pour tous les autres
+- n'invente ni ne déduis aucune valeur absente de l'extrait
+- indique "fiscal_year" dès qu'un exercice apparaît dans l'extrait (en-tête de colonne, titre)
+"""
+
+
+def extract_bank_data_from_file(file_path: str, ocr_prefix: list = None) -> dict:
+    """
+    Extrait les données financières d'un document bancaire UEMOA.
+    
+    Supporte:
+    - PDFs avec texte extractible (lecture directe)
+    - PDFs scannés (OCR sur TOUTES les pages, puis texte à Claude)
+    - Images directes (JPG, PNG)
+    
+    Le texte passe d'abord par le parseur déterministe (statement_parser):
+    si sa confiance est suffisante, Claude n'est pas appelé ou ne complète
+    que les champs manquants. Le résultat de Claude est validé par les
+    identités comptables; en cas d'échec, le tier supérieur relit les champs
+    en cause (validate_or_escalate).
+    
+    ocr_prefix: OCR déjà fait des premières pages (empreinte du document),
+    repris au lieu d'être refait.
+    
+    Returns:
+        dict: Données financières au format JSON
+    """
+    with timed(logger, "text_extraction"):
+        pages, document_header = extract_document_pages(file_path, ocr_prefix)
+    text = "\n\n".join(pages)
     
     # ========================================
-    # SECTION 1: ENVOI À CLAUDE
+    # SECTION 2: PARSEUR DÉTERMINISTE
+    # ========================================
+    
+    with timed(logger, "statement_parser"):
+        parsed = parse_financial_statements(text)
+    parsed_data = parsed["data"]
+    logger.info("parseur déterministe", extra={
+        "confidence": round(parsed["confidence"], 3),
+        "missing_fields": parsed["missing_fields"],
+    })
+    
+    if parsed["confidence"] >= PARSER_SKIP_THRESHOLD:
+        logger.info("confiance suffisante, appel à Claude évité")
+        llm_metrics.record_validation("parser", validate_extraction(parsed_data)["passed"])
+        return parsed_data
+    
+    if parsed["confidence"] >= PARSER_GAP_FILL_THRESHOLD:
+        gaps = [field for field, value in parsed_data.items() if value is None]
+        with timed(logger, "llm_gap_fill", fields=len(gaps)):
+            llm_data = ask_claude_chunked(build_gap_prompt(gaps), pages, document_header)
+        extracted_data = {**parsed_data, **{f: llm_data.get(f) for f in gaps if llm_data.get(f) is not None}}
+        return validate_or_escalate(extracted_data, parsed_data, pages, document_header)
+    
+    # ========================================
+    # SECTION 3: EXTRACTION COMPLÈTE PAR CLAUDE
+    # ========================================
+    
+    with timed(logger, "llm_extraction"):
+        extracted_data = ask_claude_chunked(EXTRACTION_PROMPT, pages, document_header)
+    
+    fill_from_parser(extracted_data, parsed_data)
+    return validate_or_escalate(extracted_data, parsed_data, pages, document_header)
+
+
+def fill_from_parser(extracted_data: dict, parsed_data: dict):
+    """Les valeurs trouvées par le parseur comblent les null de Claude"""
+    for field, value in parsed_data.items():
+        if extracted_data.get(field) is None and value is not None:
+            extracted_data[field] = value
+
+
+def validate_or_escalate(extracted_data: dict, parsed_data: dict, pages: List[str], document_header: str) -> dict:
+    """
+    Identités comptables (extraction_validation) sur le résultat du tier
+    "fast": accepté s'il les respecte. Sinon seuls les champs en cause sont
+    redemandés au tier "strong" (avec les identités à respecter), ou tout le
+    document si trop de champs sont en cause.
+    """
+    report = validate_extraction(extracted_data)
+    llm_metrics.record_validation("fast", report["passed"])
+    if report["passed"] or not LLM_STRONG_MODEL:
+        return extracted_data
+    
+    fields = report["fields"]
+    scope = "document" if len(fields) > LLM_ESCALATE_MAX_FIELDS else "fields"
+    logger.info("validation en échec, escalade", extra={
+        "scope": scope, "failed_checks": report["failed_checks"], "missing_fields": report["missing_fields"],
+        "fields": fields,
+    })
+    llm_metrics.record_escalation(scope)
+    
+    with timed(logger, "llm_escalation", scope=scope, fields=len(fields)):
+        if scope == "document":
+            escalated = ask_claude_chunked(EXTRACTION_PROMPT, pages, document_header, tier="strong")
+            fill_from_parser(escalated, parsed_data)
+        else:
+            strong = ask_claude_chunked(
+                build_gap_prompt(fields, failed_check_hints(report)), pages, document_header, tier="strong"
+            )
+            escalated = {**extracted_data, **{f: strong[f] for f in fields if strong.get(f) is not None}}
+    
+    final = validate_extraction(escalated)
+    llm_metrics.record_validation("strong", final["passed"])
+    if not final["passed"]:
+        logger.warning("validation toujours en échec après escalade", extra={
+            "failed_checks": final["failed_checks"], "missing_fields": final["missing_fields"],
+        })
+    return escalated
+
+
+def extract_document_pages(file_path: str, ocr_prefix: list = None):
+    """
+    Extrait le texte d'un document (PDF texte, PDF scanné ou image), page par page.
+    Les pages de ocr_prefix [(texte, statistiques)] ne sont pas relues.
+    
+    Returns:
+        tuple: (texte de chaque page, titre de section pour le prompt)
+    """
+    
+    # ========================================
+    # SECTION 1: EXTRACTION DU TEXTE
     # (différent selon le type de fichier)
     # ========================================
     
     if file_path.lower().endswith('.pdf'):
-        print("📄 Traitement d'un fichier PDF...")
-        
-        # Tenter l'extraction de texte
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
+        # Tenter l'extraction de texte (backend configurable, pages en parallèle)
+        backend = resolve_backend()
+        with timed(logger, "pdf_text", backend=backend):
+            pages = extract_pdf_pages(file_path, backend)
+        text = "\n\n".join(pages)
         
         # Vérifier si le PDF est scanné (texte vide/très court)
         if len(text.strip()) < 100:
@@ -185,116 +390,185 @@ FORMAT DE SORTIE (JSON UNIQUEMENT):
             # PDF SCANNÉ → OCR sur TOUTES les pages
             # ═══════════════════════════════════════════════════════════
             
-            print("⚠️  PDF SCANNÉ détecté - Extraction OCR sur TOUTES les pages...")
-            from pdf2image import convert_from_path
-            import pytesseract
-            
-            # Convertir TOUTES les pages en images (pas de limite)
-            print("🔄 Conversion du PDF en images (peut prendre 30s-2min pour gros fichiers)...")
-            images = convert_from_path(
-                file_path,
-                dpi=150  # DPI réduit pour vitesse (suffisant pour OCR)
-            )
-            
-            if not images:
+            logger.info("PDF scanné détecté, OCR sur toutes les pages")
+            n_pages = count_pages(file_path, backend)
+            if not n_pages:
                 raise Exception("❌ Échec de la conversion PDF → Images")
             
-            print(f"✅ {len(images)} page(s) convertie(s) en images")
-            
-            # OCR sur TOUTES les pages
-            print("🔍 Extraction du texte via OCR (Tesseract)...")
-            full_text = ""
+            # Rendu, prétraitement (redressement, binarisation...) et OCR dans les processus OCR
+            with timed(logger, "ocr", pages=n_pages, dpi=OCR_DPI, preprocess=OCR_PREPROCESS):
+                prefix = list(ocr_prefix or [])
+                pages = prefix + ocr_pdf(file_path, n_pages, first_page=len(prefix))
             
-            for i, img in enumerate(images):
-                print(f"   📄 Page {i+1}/{len(images)}...", end=" ")
-                
-                # OCR avec Tesseract (français + anglais)
-                try:
-                    page_text = pytesseract.image_to_string(
-                        img, 
-                        lang='fra+eng',  # Français + Anglais
-                        config='--psm 6'  # Assume uniform block of text
-                    )
-                    full_text += f"\n\n{'='*80}\nPAGE {i+1}\n{'='*80}\n\n{page_text}"
-                    print(f"✅ ({len(page_text)} chars)")
-                except Exception as e:
-                    print(f"⚠️  Erreur OCR: {e}")
+            page_texts = []
+            for i, (page_text, stats) in enumerate(pages):
+                if stats.get("error"):
+                    logger.warning("erreur OCR", extra={"page": i + 1, "error": stats["error"]})
+                    continue
+                if stats.get("blank"):
+                    continue
+                page_texts.append(f"\n\n{'='*80}\nPAGE {i+1}\n{'='*80}\n\n{page_text}")
+                logger.debug("page OCR", extra={"page": i + 1, "chars": len(page_text), **stats})
             
-            print(f"\n✅ Extraction OCR terminée: {len(full_text)} caractères au total")
+            logger.info("OCR terminé", extra={
+                "pages": len(pages),
+                "blank_pages": sum(1 for _, stats in pages if stats.get("blank")),
+                "deskewed_pages": sum(1 for _, stats in pages if stats.get("skew")),
+                "chars": sum(len(page_text) for page_text in page_texts),
+            })
             
-            # Envoyer le TEXTE à Claude (pas les images)
-            print("🚀 Envoi du texte OCR à Claude...")
-            message = client.messages.create(
-                model="claude-3-5-haiku-20241022",
-                max_tokens=4096,
-                messages=[{
-                    "role": "user",
-                    "content": f"{prompt}\n\n{'='*80}\nDOCUMENT EXTRAIT PAR OCR:\n{'='*80}\n\n{full_text[:100000]}"
-                    # ↑ Limite à 100k chars pour éviter dépassement tokens
-                }]
-            )
+            return page_texts, "DOCUMENT EXTRAIT PAR OCR"
         
         else:
             # ═══════════════════════════════════════════════════════════
             # PDF avec texte extractible → Envoi direct du texte
             # ═══════════════════════════════════════════════════════════
             
-            print(f"✅ PDF avec texte extractible ({len(text)} caractères)")
-            print("🚀 Envoi à Claude (mode texte)...")
-            
-            message = client.messages.create(
-                model="claude-3-5-haiku-20241022",
-                max_tokens=4096,
-                messages=[{
-                    "role": "user",
-                    "content": f"{prompt}\n\n{'='*80}\nDOCUMENT À ANALYSER:\n{'='*80}\n\n{text[:100000]}"
-                }]
-            )
+            logger.info("PDF avec texte extractible", extra={"chars": len(text), "pages": len(pages)})
+            return pages, "DOCUMENT À ANALYSER"
     
     else:
         # ═══════════════════════════════════════════════════════════
         # IMAGE DIRECTE (JPG/PNG) → OCR puis texte
         # ═══════════════════════════════════════════════════════════
         
-        print(f"🖼️  Image directe détectée: {file_path}")
-        
-        from PIL import Image
-        import pytesseract
-        
-        img = Image.open(file_path)
-        print("🔍 Extraction du texte via OCR...")
+        if ocr_prefix:
+            image_text, stats = ocr_prefix[0]
+        else:
+            with timed(logger, "ocr", pages=1, preprocess=OCR_PREPROCESS):
+                image_text, stats = ocr_image_file(file_path)
         
-        image_text = pytesseract.image_to_string(
-            img,
-            lang='fra+eng',
-            config='--psm 6'
+        logger.info("image OCR", extra={"chars": len(image_text), **stats})
+        return [image_text], "DOCUMENT EXTRAIT PAR OCR"
+
+
+def get_client():
+    """Client Anthropic partagé (créé au premier usage), client factice si LLM_STUB"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None and LLM_STUB:
+                from llm_stub import StubClient
+                _client = StubClient()
+            elif _client is None:
+                import anthropic
+                _client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    return _client
+
+
+def warm_up():
+    """
+    Précharge les dépendances d'extraction (client Claude, backend PDF, OCR
+    si installé) pour que la première extraction du worker ne les paie pas.
+    """
+    with timed(logger, "extraction_warm_up"):
+        get_client()
+        backend = resolve_backend()
+        __import__({"pypdf2": "PyPDF2", "pypdfium2": "pypdfium2", "pdfminer": "pdfminer.high_level"}[backend])
+        for module in ("pdf2image", "pytesseract", "PIL.Image"):
+            try:
+                __import__(module)
+            except ImportError:
+                pass
+        warm_pool()
+        warm_ocr_pool()
+
+
+def _get_llm_pool() -> ThreadPoolExecutor:
+    """Threads d'appel au LLM, partagés par tous les jobs (borne les appels simultanés)"""
+    global _llm_pool
+    if _llm_pool is None:
+        with _client_lock:
+            if _llm_pool is None:
+                _llm_pool = ThreadPoolExecutor(max_workers=LLM_CONCURRENCY, thread_name_prefix="llm")
+    return _llm_pool
+
+
+def ask_claude_chunked(prompt: str, pages: List[str], document_header: str, tier: str = "fast") -> dict:
+    """
+    Extraction sur tout le document, sans troncature: un seul appel s'il
+    tient dans un extrait, sinon un appel par extrait pertinent (en
+    parallèle) puis fusion des extractions partielles (document_chunks).
+    """
+    chunks = split_into_chunks(pages)
+    selected = select_chunks(chunks)
+    if len(selected) == 1:
+        return ask_claude(prompt, selected[0]["text"], document_header, tier)
+
+    logger.info("extraction par extraits", extra={
+        "pages": len(pages),
+        "chunks": len(chunks),
+        "sent": len(selected),
+        "chunk_pages": [[chunk["first_page"], chunk["last_page"]] for chunk in selected],
+    })
+    pool = _get_llm_pool()
+    futures = [
+        # copy_context: les lignes de log des threads du pool gardent job_id / request_id
+        pool.submit(
+            contextvars.copy_context().run, ask_claude, prompt + PARTIAL_INSTRUCTION, chunk["text"],
+            f"{document_header} — EXTRAIT {n}/{len(selected)}, "
+            f"PAGES {chunk['first_page']} À {chunk['last_page']} SUR {len(pages)}", tier,
         )
-        
-        print(f"✅ Texte extrait: {len(image_text)} caractères")
-        print("🚀 Envoi à Claude...")
-        
-        message = client.messages.create(
-            model="claude-3-5-haiku-20241022",
+        for n, chunk in enumerate(selected, start=1)
+    ]
+
+    partials = []
+    for chunk, future in zip(selected, futures):
+        try:
+            partials.append((chunk, future.result()))
+        except Exception as e:
+            logger.warning("extrait en échec", extra={
+                "first_page": chunk["first_page"], "last_page": chunk["last_page"], "error": str(e),
+            })
+    if not partials:
+        raise Exception("❌ Échec de l'extraction sur tous les extraits du document")
+
+    merged, conflicts = merge_extractions(partials)
+    logger.info("extraits fusionnés", extra={
+        "chunks_ok": len(partials), "chunks_failed": len(selected) - len(partials), "conflicts": len(conflicts),
+    })
+    debug_dump(logger, "conflits de fusion", conflicts)
+    return merged
+
+
+def ask_claude(prompt: str, text: str, document_header: str, tier: str = "fast") -> dict:
+    """
+    Envoie le prompt et le texte (document ou extrait) au modèle du tier
+    et parse le JSON retourné.
+    """
+    model = LLM_TIERS[tier]
+    started = time.perf_counter()
+    try:
+        message = get_client().messages.create(
+            model=model,
             max_tokens=4096,
             messages=[{
                 "role": "user",
-                "content": f"{prompt}\n\n{'='*80}\nDOCUMENT EXTRAIT PAR OCR:\n{'='*80}\n\n{image_text}"
+                "content": f"{prompt}\n\n{'='*80}\n{document_header}:\n{'='*80}\n\n{text}"
             }]
         )
+    except Exception:
+        llm_metrics.record_call(tier, model, time.perf_counter() - started, error=True)
+        raise
+    llm_metrics.record_call(
+        tier, model, time.perf_counter() - started,
+        getattr(message.usage, "input_tokens", None), getattr(message.usage, "output_tokens", None),
+    )
     
     # ========================================
-    # SECTION 2: PARSING DE LA RÉPONSE
+    # PARSING DE LA RÉPONSE
     # (identique pour TOUS les types)
     # ========================================
     
     response_text = message.content[0].text
-    
-    print("\n" + "="*80)
-    print("📥 RÉPONSE BRUTE DE CLAUDE:")
-    print("="*80)
-    preview = response_text[:500] + "..." if len(response_text) > 500 else response_text
-    print(preview)
-    print("="*80 + "\n")
+    logger.info("réponse Claude", extra={
+        "model": model,
+        "tier": tier,
+        "input_tokens": getattr(message.usage, "input_tokens", None),
+        "output_tokens": getattr(message.usage, "output_tokens", None),
+        "chars": len(response_text),
+    })
+    debug_dump(logger, "réponse brute de Claude", response_text)
     
     # ───────────────────────────────────────────────────────────────
     # Extraction du JSON
@@ -304,23 +578,13 @@ FORMAT DE SORTIE (JSON UNIQUEMENT):
     
     if "```json" in response_text:
         json_str = response_text.split("```json")[1].split("```")[0].strip()
-        print("✅ JSON extrait depuis bloc markdown (```json)")
     elif "```" in response_text:
         json_str = response_text.split("```")[1].split("```")[0].strip()
-        print("✅ JSON extrait depuis bloc markdown (```)")
     else:
         start = response_text.find('{')
         end = response_text.rfind('}') + 1
         if start != -1 and end > start:
             json_str = response_text[start:end]
-            print("✅ JSON extrait par recherche de { }")
-    
-    print("\n" + "="*80)
-    print("📋 JSON EXTRAIT:")
-    print("="*80)
-    preview_json = json_str[:300] + "..." if len(json_str) > 300 else json_str
-    print(preview_json)
-    print("="*80 + "\n")
     
     # ───────────────────────────────────────────────────────────────
     # Parsing JSON
@@ -329,28 +593,16 @@ FORMAT DE SORTIE (JSON UNIQUEMENT):
     try:
         extracted_data = json.loads(json_str)
         
-        print("✅ JSON parsé avec succès!")
-        print(f"   - Banque: {extracted_data.get('name', 'N/A')}")
-        print(f"   - Année: {extracted_data.get('fiscal_year', 'N/A')}")
-        print(f"   - Total Assets: {extracted_data.get('total_assets', 'N/A')}")
-        print(f"   - Total Equity: {extracted_data.get('total_equity', 'N/A')}")
-        print(f"   - Net Income: {extracted_data.get('net_income', 'N/A')}")
-        
-        print("\n" + "=" * 80)
-        print("📋 JSON COMPLET:")
-        print("=" * 80)
-        print(json.dumps(extracted_data, indent=2))
-        print("=" * 80 + "\n")
+        logger.info("JSON extrait", extra={
+            "bank_name": extracted_data.get("name"),
+            "fiscal_year": extracted_data.get("fiscal_year"),
+        })
+        debug_dump(logger, "JSON extrait", extracted_data)
         
         return extracted_data
         
     except json.JSONDecodeError as e:
-        print(f"❌ ERREUR DE PARSING JSON!")
-        print(f"   Message: {str(e)}")
-        print(f"   Position: ligne {e.lineno}, colonne {e.colno}")
-        print("\n" + "="*80)
-        print("📄 CONTENU QUI A ÉCHOUÉ:")
-        print("="*80)
-        print(json_str[:200])
-        print("="*80 + "\n")
+        logger.error("JSON invalide retourné par Claude", extra={
+            "error": str(e), "line": e.lineno, "column": e.colno, "content": json_str[:200],
+        })
         raise Exception(f"JSON invalide retourné par Claude: {str(e)}")
\ No newline at end of file
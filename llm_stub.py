@@ -0,0 +1,57 @@
+"""
+Client Claude factice (LLM_STUB=1) pour les tests de charge et le développement.
+
+Même interface que anthropic.Anthropic pour ce qu'utilise llm_service
+(messages.create -> content[0].text, usage): la réponse est le JSON du
+parseur déterministe appliqué au texte envoyé, complété des champs
+obligatoires absents, après une latence simulée. Aucun appel réseau, aucun
+coût: le reste du pipeline (validation, escalade, sauvegarde, notation)
+tourne comme en production.
+
+Variables d'environnement:
+- LLM_STUB_LATENCY: latence moyenne d'un appel en secondes (défaut 1.0)
+- LLM_STUB_JITTER: variation relative de la latence (défaut 0.3 = ±30%)
+- LLM_STUB_ERROR_RATE: part des appels qui lèvent une erreur (défaut 0)
+"""
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+
+from statement_parser import parse_financial_statements
+
+LLM_STUB_LATENCY = float(os.getenv("LLM_STUB_LATENCY", "1.0"))
+LLM_STUB_JITTER = float(os.getenv("LLM_STUB_JITTER", "0.3"))
+LLM_STUB_ERROR_RATE = float(os.getenv("LLM_STUB_ERROR_RATE", "0"))
+
+# Valeurs de repli pour que la sauvegarde passe même sur un texte sans état financier
+DEFAULTS = {"name": "Banque de test", "country": "Test", "fiscal_year": "2023", "total_assets": 1_000_000.0}
+
+
+class StubError(Exception):
+    """Erreur simulée (LLM_STUB_ERROR_RATE)"""
+
+
+class _Messages:
+    def create(self, model: str, max_tokens: int, messages: list, **kwargs):
+        content = messages[-1]["content"]
+        time.sleep(max(LLM_STUB_LATENCY * (1 + random.uniform(-LLM_STUB_JITTER, LLM_STUB_JITTER)), 0))
+        if random.random() < LLM_STUB_ERROR_RATE:
+            raise StubError(f"Erreur simulée ({model})")
+        data = parse_financial_statements(content)["data"]
+        for field, value in DEFAULTS.items():
+            if data.get(field) is None:
+                data[field] = value
+        text = "```json\n" + json.dumps(data, ensure_ascii=False) + "\n```"
+        return SimpleNamespace(
+            model=model,
+            content=[SimpleNamespace(type="text", text=text)],
+            # Ordre de grandeur: ~4 caractères par token
+            usage=SimpleNamespace(input_tokens=len(content) // 4, output_tokens=len(text) // 4),
+        )
+
+
+class StubClient:
+    def __init__(self):
+        self.messages = _Messages()
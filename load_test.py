@@ -0,0 +1,355 @@
+"""
+Test de charge du pipeline upload → job → notation sur une instance locale.
+
+Deux populations de clients tournent en parallèle:
+- uploaders (--concurrency): POST /upload-and-analyze avec un PDF de
+  uploads/, GET /job/{job_id} toutes les --poll secondes jusqu'à la fin du
+  job, puis GET /banks/{bank_id}/rating
+- readers (--readers): GET /banks et GET /banks/{id}/rating en boucle sur les
+  banques déjà créées (le chemin de lecture du frontend)
+
+jusqu'à --uploads analyses lancées ou --duration secondes écoulées. Rapport:
+latences p50/p95/p99/max, taux d'erreur et débit par route, durée des jobs
+de bout en bout, puis /metrics/llm, /metrics/db-pool et /metrics/workers.
+Code de sortie 1 si le taux d'erreur dépasse --max-error-rate ou si un job
+échoue (utilisable en CI, --json pour garder le rapport).
+
+--spawn démarre l'instance: uvicorn sur un port libre, base SQLite
+temporaire (ou --database-url pour un PostgreSQL local), LLM factice
+(LLM_STUB=1, voir llm_stub), PARSER_SKIP_THRESHOLD relevé et réutilisation
+des documents déjà analysés coupée (--reuse pour la garder) pour que chaque
+job passe par le LLM. Avec --job-backend database, --workers processus
+camels_worker traitent la file.
+
+Usage:
+    python load_test.py --spawn [--uploads 20] [--concurrency 4] [--readers 8]
+    python load_test.py --spawn --job-backend database --workers 2
+    python load_test.py --url http://localhost:8000 [--duration 60]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+from bench_pdf_text import unique_pdfs
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+JOB_TIMEOUT = float(os.getenv("LOAD_TEST_JOB_TIMEOUT", "300"))  # Secondes par job
+
+
+def percentile(values: list, q: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+class Recorder:
+    """Latences et erreurs par route (clé: méthode + gabarit de chemin)"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.statuses = defaultdict(Counter)
+        self.job_seconds = []
+        self.jobs = Counter()  # submitted, completed, failed, timeout
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.latencies[route].append(time.perf_counter() - started)
+            self.errors[route] += 1
+            self.statuses[route][type(e).__name__] += 1
+            return None
+        self.latencies[route].append(time.perf_counter() - started)
+        self.statuses[route][response.status_code] += 1
+        if response.status_code >= 400:
+            self.errors[route] += 1
+            return None
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route, latencies in sorted(self.latencies.items()):
+            routes[route] = {
+                "requests": len(latencies),
+                "errors": self.errors[route],
+                "error_rate": round(self.errors[route] / len(latencies), 4),
+                "rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": _ms(percentile(latencies, 0.5)),
+                "p95_ms": _ms(percentile(latencies, 0.95)),
+                "p99_ms": _ms(percentile(latencies, 0.99)),
+                "max_ms": _ms(max(latencies)),
+                "statuses": {str(status): count for status, count in self.statuses[route].items()},
+            }
+        requests = sum(route["requests"] for route in routes.values())
+        errors = sum(route["errors"] for route in routes.values())
+        return {
+            "elapsed_s": round(elapsed, 1),
+            "requests": requests,
+            "errors": errors,
+            "error_rate": round(errors / requests, 4) if requests else 0.0,
+            "rps": round(requests / elapsed, 2) if elapsed else 0.0,
+            "routes": routes,
+            "jobs": {
+                **{key: self.jobs[key] for key in ("submitted", "completed", "failed", "timeout")},
+                "per_minute": round(self.jobs["completed"] / elapsed * 60, 2) if elapsed else 0.0,
+                "p50_s": _round(percentile(self.job_seconds, 0.5)),
+                "p95_s": _round(percentile(self.job_seconds, 0.95)),
+                "p99_s": _round(percentile(self.job_seconds, 0.99)),
+                "max_s": _round(max(self.job_seconds) if self.job_seconds else None),
+            },
+        }
+
+
+class LoadState:
+    def __init__(self, files: list, uploads: int, deadline: float):
+        self.files = files
+        self.remaining = uploads
+        self.deadline = deadline
+        self.bank_ids = []
+        self.uploads_done = asyncio.Event()
+
+    def take_upload(self) -> bool:
+        if self.remaining <= 0 or time.monotonic() >= self.deadline:
+            return False
+        self.remaining -= 1
+        return True
+
+
+async def uploader(client: httpx.AsyncClient, rec: Recorder, state: LoadState, poll: float):
+    while state.take_upload():
+        path = random.choice(state.files)
+        with open(path, "rb") as f:
+            content = f.read()
+        started = time.monotonic()
+        response = await rec.request(
+            client, "POST /upload-and-analyze", "POST", "/upload-and-analyze",
+            files={"file": (os.path.basename(path), content, "application/pdf")},
+        )
+        if response is None:
+            continue
+        job_id = response.json()["job_id"]
+        rec.jobs["submitted"] += 1
+
+        job = None
+        while time.monotonic() - started < JOB_TIMEOUT:
+            await asyncio.sleep(poll)
+            response = await rec.request(client, "GET /job/{job_id}", "GET", f"/job/{job_id}")
+            if response is not None:
+                job = response.json()
+                if job["status"] in ("completed", "failed"):
+                    break
+        if job is None or job["status"] not in ("completed", "failed"):
+            rec.jobs["timeout"] += 1
+            continue
+        rec.jobs[job["status"]] += 1
+        if job["status"] == "failed":
+            print(f"   ❌ job {job_id} en échec: {job.get('error')}")
+            continue
+        rec.job_seconds.append(time.monotonic() - started)
+        bank_id = job["result"]["bank_id"]
+        state.bank_ids.append(bank_id)
+        await rec.request(client, "GET /banks/{id}/rating", "GET", f"/banks/{bank_id}/rating")
+
+
+async def reader(client: httpx.AsyncClient, rec: Recorder, state: LoadState, pause: float):
+    while not state.uploads_done.is_set():
+        if state.bank_ids and random.random() < 0.5:
+            bank_id = random.choice(state.bank_ids)
+            await rec.request(client, "GET /banks/{id}/rating", "GET", f"/banks/{bank_id}/rating")
+        else:
+            await rec.request(client, "GET /banks", "GET", "/banks")
+        await asyncio.sleep(pause)
+
+
+async def run_load(args, files: list) -> dict:
+    rec = Recorder()
+    state = LoadState(files, args.uploads, time.monotonic() + args.duration)
+    limits = httpx.Limits(max_connections=args.concurrency + args.readers + 4)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        readers = [asyncio.create_task(reader(client, rec, state, args.reader_pause)) for _ in range(args.readers)]
+        await asyncio.gather(*(uploader(client, rec, state, args.poll) for _ in range(args.concurrency)))
+        state.uploads_done.set()
+        await asyncio.gather(*readers)
+        elapsed = time.perf_counter() - started
+
+        report = rec.report(elapsed)
+        report["server"] = {}
+        for name in ("llm", "db-pool", "workers"):
+            try:
+                response = await client.get(f"/metrics/{name}")
+                if response.status_code == 200:
+                    report["server"][name] = response.json()
+            except httpx.HTTPError:
+                pass
+    return report
+
+
+# ===== INSTANCE LOCALE (--spawn) =====
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_instance(args, workdir: str) -> list:
+    """init_db, uvicorn et éventuellement les workers; cwd = workdir (uploads/ temporaire)"""
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'load_test.db')}",
+        "LLM_STUB": "1",
+        "LLM_STUB_LATENCY": str(args.llm_latency),
+        "PARSER_SKIP_THRESHOLD": os.getenv("PARSER_SKIP_THRESHOLD", "2"),
+        "JOB_BACKEND": args.job_backend,
+        "FINGERPRINT_ENABLED": "1" if args.reuse else "0",
+        "EXTRACTION_WARM_UP": "1",
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+    }
+    subprocess.run([sys.executable, os.path.join(ROOT, "init_db.py")], cwd=workdir, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    port = _free_port()
+    args.url = f"http://127.0.0.1:{port}"
+    processes = [subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )]
+    if args.job_backend == "database":
+        processes += [
+            subprocess.Popen([sys.executable, "-m", "camels_worker", "--concurrency", str(args.worker_concurrency)],
+                             cwd=workdir, env=env)
+            for _ in range(args.workers)
+        ]
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if processes[0].poll() is not None:
+            raise RuntimeError("uvicorn s'est arrêté au démarrage")
+        try:
+            if httpx.get(args.url + "/", timeout=1).status_code == 200:
+                return processes
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("uvicorn ne répond pas après 30 s")
+
+
+def stop_instance(processes: list):
+    for process in processes:
+        if process.poll() is not None:
+            print(f"⚠️  {' '.join(process.args[1:4])} arrêté pendant le test (code {process.returncode})")
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# ===== RAPPORT =====
+
+def print_report(report: dict):
+    print(f"\n{'route':<28} {'req':>6} {'err':>5} {'req/s':>7} {'p50 (ms)':>9} {'p95 (ms)':>9} "
+          f"{'p99 (ms)':>9} {'max (ms)':>9}")
+    print("=" * 88)
+    for route, stats in report["routes"].items():
+        print(f"{route:<28} {stats['requests']:>6} {stats['errors']:>5} {stats['rps']:>7.1f} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+    print("-" * 88)
+    print(f"{'total':<28} {report['requests']:>6} {report['errors']:>5} {report['rps']:>7.1f}"
+          f"   erreurs {report['error_rate']:.2%} en {report['elapsed_s']} s")
+
+    jobs = report["jobs"]
+    print(f"\nJobs: {jobs['submitted']} lancés, {jobs['completed']} terminés, {jobs['failed']} en échec, "
+          f"{jobs['timeout']} hors délai ({jobs['per_minute']}/min)")
+    if jobs["p50_s"] is not None:
+        print(f"Durée de bout en bout: p50 {jobs['p50_s']} s, p95 {jobs['p95_s']} s, "
+              f"p99 {jobs['p99_s']} s, max {jobs['max_s']} s")
+
+    server = report["server"]
+    for tier, stats in server.get("llm", {}).get("tiers", {}).items():
+        print(f"LLM {tier}: {stats['calls']} appels, {stats['errors']} erreurs, p95 {stats['latency_ms']['p95']} ms, "
+              f"acceptation {stats['acceptance_rate']}")
+    for name, pool in server.get("db-pool", {}).items():
+        if "checked_out" in pool:
+            print(f"Pool {name}: {pool['checked_out']}/{pool['size']} connexions, overflow {pool['overflow']}")
+    workers = server.get("workers", {})
+    if workers.get("backend") == "database":
+        print(f"Workers: {len(workers['workers'])} en vie, capacité {workers['capacity']}, jobs {workers['jobs']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge upload → job → notation")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="instance à tester (ignoré avec --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="démarrer une instance locale (SQLite, LLM factice)")
+    parser.add_argument("--database-url", help="avec --spawn: base à utiliser (défaut SQLite temporaire)")
+    parser.add_argument("--job-backend", choices=["thread", "database"], default="thread")
+    parser.add_argument("--workers", type=int, default=2, help="avec --spawn et --job-backend database")
+    parser.add_argument("--worker-concurrency", type=int, default=2)
+    parser.add_argument("--reuse", action="store_true", help="avec --spawn: réutiliser les documents déjà analysés")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="latence du LLM factice (s)")
+    parser.add_argument("--uploads", type=int, default=20, help="analyses lancées au total")
+    parser.add_argument("--duration", type=float, default=300, help="durée max (s)")
+    parser.add_argument("--concurrency", type=int, default=4, help="uploads simultanés")
+    parser.add_argument("--readers", type=int, default=8, help="clients de lecture simultanés")
+    parser.add_argument("--reader-pause", type=float, default=0.05, help="pause entre deux lectures (s)")
+    parser.add_argument("--poll", type=float, default=1.0, help="intervalle de GET /job (s)")
+    parser.add_argument("--timeout", type=float, default=30, help="timeout d'une requête HTTP (s)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--json", help="écrire le rapport JSON dans ce fichier")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("folder", nargs="?", default=os.path.join(ROOT, "uploads"))
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    files = unique_pdfs(args.folder)
+    if not files:
+        parser.error(f"aucun PDF dans {args.folder}")
+
+    workdir = tempfile.mkdtemp(prefix="camels-load-") if args.spawn else None
+    processes = []
+    try:
+        if args.spawn:
+            processes = spawn_instance(args, workdir)
+        print(f"🔥 {args.url}: {args.uploads} upload(s), {args.concurrency} en parallèle, {args.readers} lecteur(s), "
+              f"{len(files)} PDF distinct(s)")
+        report = asyncio.run(run_load(args, files))
+    finally:
+        stop_instance(processes)
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    failed = report["error_rate"] > args.max_error_rate or report["jobs"]["failed"] or report["jobs"]["timeout"]
+    print("\n❌ Seuils dépassés" if failed else "\n✅ Dans les seuils")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,51 @@
-from fastapi import FastAPI, Depends, UploadFile, File, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, Body, Depends, UploadFile, File, Form, HTTPException, Request
+from pydantic import AliasChoices, BaseModel, Field
 from sqlalchemy.orm import Session
-from database import get_db
+from database import ReadSessionLocal, get_session, get_read_session, run_db, pool_stats
+from starlette.concurrency import run_in_threadpool
 from models import BankDB
 import os
 import shutil
 from datetime import datetime
-from llm_service import extract_bank_data_from_file
-from camels_calculator import calculate_all_ratios, rate_capital, rate_asset_quality, rate_earnings, rate_liquidity, get_composite_rating
+from camels_calculator import RATIO_FORMULAS, calculate_all_ratios
+from financial_statement import FinancialStatement
+from rating_methodology import get_methodology, list_methodologies
 from fastapi.middleware.cors import CORSMiddleware
-from job_manager import create_job, get_job, process_job_async
+from job_manager import JOB_BACKEND, get_job, scheduler_stats, submit_job
+from bank_repository import find_previous_period, save_extracted_periods
+from bank_history import get_bank_history
+from bank_screen import build_conditions, listing_filters, rerate_sector, screen_banks, stream_screen
+from bank_export import EXPORT_FORMATS, check_format, export_rows
+from bank_import import import_file
+from bank_corrections import correct_bank
+from stress_test import load_population, stress_population
+from app_logging import get_logger, log_context
+from http_cache import bank_version, cached_json, invalidate, response_cache, table_version
+from http_responses import FastJSONResponse, add_compression, compression_backend
+from llm_metrics import llm_metrics
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Literal, Optional
 import threading
+import json
+import time
+import uuid
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+# Précharger les dépendances d'extraction (anthropic, PDF, OCR) au démarrage
+# du worker plutôt qu'à la première extraction; la route les importe sinon
+EXTRACTION_WARM_UP = os.getenv("EXTRACTION_WARM_UP", "0") in ("1", "true", "yes")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if EXTRACTION_WARM_UP:
+        # En arrière-plan: le worker accepte des requêtes pendant le préchargement
+        from llm_service import warm_up
+        threading.Thread(target=warm_up, daemon=True, name="extraction-warm-up").start()
+    yield
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,6 +54,30 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+add_compression(app)
+
+logger = get_logger("main")
+
+
+@app.middleware("http")
+async def log_requests(request, call_next):
+    """Une ligne par requête (méthode, chemin, statut, durée), request_id dans le contexte"""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    started = time.perf_counter()
+    with log_context(request_id=request_id):
+        try:
+            response = await call_next(request)
+        except Exception:
+            logger.exception("requête en échec", extra={"method": request.method, "path": request.url.path})
+            raise
+        logger.info("requête", extra={
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+    response.headers["X-Request-ID"] = request_id
+    return response
 
 # ===== DOSSIER UPLOADS =====
 UPLOAD_FOLDER = "uploads"
@@ -37,11 +94,59 @@ class Bank(BaseModel):
 
 class BankResponse(Bank):
     id: int
+    name: str = Field(validation_alias=AliasChoices("name", "bank_name"))  # BankDB.bank_name
     
     class Config:
         from_attributes = True
 
 
+class ScreenFilter(BaseModel):
+    field: str
+    op: str = "="
+    value: Any = None
+
+
+class ScreenSort(BaseModel):
+    field: str
+    direction: Literal["asc", "desc"] = "asc"
+
+
+class ScreenRequest(BaseModel):
+    filters: List[ScreenFilter] = []
+    sort: List[ScreenSort] = []
+    fields: Optional[List[str]] = None  # Colonnes retournées (défaut: ratios + montants)
+    latest_only: bool = False  # Dernier exercice de chaque banque uniquement
+    limit: int = 100
+    offset: int = 0
+    stream: bool = False  # NDJSON, toutes les lignes, sans pagination
+
+
+class RerateRequest(BaseModel):
+    methodology: str
+    compare_to: Optional[str] = None  # Méthodologie de référence (matrice de transition)
+    filters: List[ScreenFilter] = []
+    latest_only: bool = False
+
+
+class StressScenario(BaseModel):
+    name: Optional[str] = None
+    npl_increase: Optional[float] = None  # +50% de NPL = 0.5
+    provision_rate: Optional[float] = None  # Provisionnement des nouveaux NPL (défaut 0.5)
+    deposit_outflow: Optional[float] = None  # Fuite de 20% des dépôts = 0.2
+    rate_shock_pp: Optional[float] = None  # Hausse des taux en points
+    asset_repricing: Optional[float] = None
+    liability_repricing: Optional[float] = None
+    field_shocks: Dict[str, float] = {}  # {"operating_expenses": 0.1} = +10%
+
+
+class StressTestRequest(BaseModel):
+    scenarios: List[StressScenario]
+    methodology: Optional[str] = None
+    filters: List[ScreenFilter] = []
+    latest_only: bool = True
+    include_banks: bool = True
+
+
 # ===== ROUTES DE BASE =====
 
 @app.get("/")
@@ -49,37 +154,277 @@ def home():
     return {"message": "🏦 API CAMELS avec PostgreSQL !"}
 
 
+@app.get("/metrics/db-pool")
+def db_pool_metrics():
+    """Utilisation du pool de connexions (principal et réplica de lecture)"""
+    return pool_stats()
+
+
+@app.get("/metrics/http-cache")
+def http_cache_metrics():
+    """Cache LRU des réponses GET (entrées, taille, hits/misses) et encodage des réponses"""
+    return {**response_cache.stats(), "encoding": compression_backend()}
+
+
+@app.get("/metrics/llm")
+def llm_metrics_endpoint():
+    """Appels LLM par tier: latence, tokens, coût estimé, taux d'acceptation par la validation"""
+    return llm_metrics.stats()
+
+
+@app.get("/metrics/workers")
+def workers_metrics():
+    """File des jobs d'analyse: celle de l'API (thread) ou la file en base et ses workers en vie (database)"""
+    if JOB_BACKEND != "database":
+        return {"backend": JOB_BACKEND, **scheduler_stats()}
+    from job_queue import queue_stats
+    return {"backend": JOB_BACKEND, **queue_stats()}
+
+
+# ===== MÉTHODOLOGIES DE NOTATION =====
+
+def _get_methodology_or_404(methodology_id: Optional[str]):
+    try:
+        return get_methodology(methodology_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+
+@app.get("/methodologies")
+def get_methodologies():
+    """Méthodologies de notation disponibles (methodologies/*.json)"""
+    return {"methodologies": list_methodologies()}
+
+
+@app.get("/methodologies/{methodology_id}")
+def get_methodology_detail(methodology_id: str):
+    """Seuils, ratios et pondérations d'une méthodologie"""
+    return _get_methodology_or_404(methodology_id).describe()
+
+
 # ===== ROUTES BANQUES =====
 
+# Les routes ci-dessous sont async: la logique ORM (sync) passe par run_db,
+# exécutée via AsyncSession.run_sync (DB_ASYNC=1) ou dans le threadpool.
+
+def _get_bank_by_id(db: Session, bank_id: int):
+    return db.query(BankDB).filter(BankDB.id == bank_id).first()
+
+
 @app.post("/banks", response_model=BankResponse)
-def create_bank(bank: Bank, db: Session = Depends(get_db)):
+async def create_bank(bank: Bank, db=Depends(get_session)):
     """Crée une banque dans PostgreSQL"""
-    db_bank = BankDB(
-        bank_name=bank.name,
-        country=bank.country,
-        total_assets=bank.total_assets,
-        currency=bank.currency
-    )
-    db.add(db_bank)
-    db.commit()
-    db.refresh(db_bank)
+    def create(db: Session):
+        db_bank = BankDB(
+            bank_name=bank.name,
+            country=bank.country,
+            total_assets=bank.total_assets,
+            currency=bank.currency
+        )
+        db.add(db_bank)
+        db.commit()
+        db.refresh(db_bank)
+        return db_bank
+
+    db_bank = await run_db(db, create)
+    invalidate()
     return db_bank
 
 
 @app.get("/banks")
-def list_banks(db: Session = Depends(get_db)):
-    """Liste toutes les banques depuis PostgreSQL"""
-    banks = db.query(BankDB).all()
-    return {"total": len(banks), "banks": banks}
+async def list_banks(request: Request, filters: list = Depends(listing_filters), db=Depends(get_read_session)):
+    """
+    Liste les banques depuis PostgreSQL (filtres optionnels: country, fiscal_year, bank_key, currency).
+    ETag / Last-Modified sur la version des lignes filtrées (304 si inchangées).
+    """
+    try:
+        conditions = build_conditions(filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def build():
+        banks = await run_db(db, lambda db: db.query(BankDB).filter(*conditions).all())
+        return {"total": len(banks), "banks": banks}
+
+    version = await run_db(db, table_version, conditions)
+    return await cached_json(request, version, build, last_modified=version[0])
+
+
+@app.get("/banks/export")
+def export_banks(format: str = "csv", filters: list = Depends(listing_filters)):
+    """
+    Export de toutes les banques-exercices (mêmes filtres que GET /banks).
+
+    format: csv | parquet (pyarrow) | xlsx (openpyxl). Les lignes sont lues
+    par lots et le fichier est envoyé au fil de l'eau.
+    """
+    try:
+        check_format(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=f"Format {format} indisponible: {e}")
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"banks_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return StreamingResponse(
+        export_rows(ReadSessionLocal, filters, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.post("/banks/screen")
+async def screen(request: ScreenRequest, db=Depends(get_read_session)):
+    """
+    Filtre et classe les banques sur les ratios CAMELS (voir bank_screen).
+
+    Exemple: {"filters": [{"field": "npl_ratio", "op": ">", "value": 0.1}],
+              "sort": [{"field": "roae", "direction": "desc"}]}
+    Avec "stream": true, les résultats sont envoyés en NDJSON au fil de l'eau.
+    """
+    spec = request.model_dump()
+    try:
+        if request.stream:
+            # Session dédiée, ouverte et fermée par le générateur
+            return StreamingResponse(stream_screen(ReadSessionLocal, spec), media_type="application/x-ndjson")
+        return await run_db(db, screen_banks, spec, request.limit, request.offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/banks/rerate")
+async def rerate_banks(request: RerateRequest, db=Depends(get_read_session)):
+    """
+    Re-note tout le secteur (ou une sélection, filtres de /banks/screen) avec
+    une méthodologie, sans rien écrire en base. compare_to ajoute la matrice
+    de transition des ratings composites entre les deux méthodologies.
+    """
+    for methodology_id in (request.methodology, request.compare_to):
+        if methodology_id:
+            _get_methodology_or_404(methodology_id)
+    filters = [f.model_dump() for f in request.filters]
+    try:
+        return await run_db(db, rerate_sector, request.methodology, filters, request.latest_only, request.compare_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/stress-test")
+async def stress_test(request: StressTestRequest, db=Depends(get_read_session)):
+    """
+    Tests de résistance en mémoire: chocs paramétrés (NPL, fuite de dépôts,
+    taux, montants) sur la population filtrée, ratios et notations recalculés,
+    matrices de transition par scénario. Rien n'est écrit en base.
+    """
+    if not request.scenarios:
+        raise HTTPException(status_code=400, detail="Au moins un scénario requis")
+    methodology = _get_methodology_or_404(request.methodology)
+    filters = [f.model_dump() for f in request.filters]
+    scenarios = [s.model_dump() for s in request.scenarios]
+    try:
+        population = await run_db(db, load_population, filters, request.latest_only)
+        # Calcul hors boucle d'événements (pool de processus au-delà de quelques scénarios)
+        return await run_in_threadpool(
+            stress_population, population, scenarios, methodology.id, request.include_banks
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/banks/import")
+async def import_banks(
+    file: UploadFile = File(...),
+    mapping: Optional[str] = Form(None),
+    sheet: Optional[str] = Form(None),
+    db=Depends(get_session),
+):
+    """
+    Import CSV/XLSX de données financières déjà structurées (sans OCR ni Claude).
+
+    mapping (optionnel): JSON {"Colonne du fichier": "champ BankDB"}; sinon
+    les en-têtes sont reconnus par leur nom (bank_name/banque, country/pays,
+    fiscal_year/exercice, total_assets, gross_loans...). Les ratios et
+    notations sont calculés pour toutes les lignes, puis enregistrés par lots.
+    """
+    try:
+        column_mapping = json.loads(mapping) if mapping else None
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Mapping JSON invalide: {e}")
+    if column_mapping is not None and not isinstance(column_mapping, dict):
+        raise HTTPException(status_code=400, detail="Le mapping doit être un objet JSON")
+
+    try:
+        result = await run_db(db, import_file, file.file, file.filename, column_mapping, sheet)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    invalidate()
+    return result
 
 
 @app.get("/banks/{bank_id}", response_model=BankResponse)
-def get_bank(bank_id: int, db: Session = Depends(get_db)):
-    """Récupère une banque par son ID"""
-    bank = db.query(BankDB).filter(BankDB.id == bank_id).first()
-    if not bank:
-        return {"error": "Banque introuvable"}
-    return bank
+async def get_bank(bank_id: int, request: Request, db=Depends(get_read_session)):
+    """Récupère une banque par son ID (ETag / Last-Modified: updated_date)"""
+    version = await run_db(db, bank_version, bank_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Banque introuvable")
+
+    async def build():
+        return BankResponse.model_validate(await run_db(db, _get_bank_by_id, bank_id))
+
+    return await cached_json(request, version, build, last_modified=version[0])
+
+
+@app.get("/banks/{bank_id}/statement")
+async def get_bank_statement(bank_id: int, request: Request, db=Depends(get_read_session)):
+    """Toutes les données d'un exercice (montants + ratios), p. ex. après un job d'analyse"""
+    version = await run_db(db, bank_version, bank_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Banque introuvable")
+
+    async def build():
+        return FinancialStatement.from_bank(await run_db(db, _get_bank_by_id, bank_id)).to_dict()
+
+    return await cached_json(request, version, build, last_modified=version[0])
+
+
+@app.patch("/banks/{bank_id}")
+async def patch_bank(
+    bank_id: int,
+    corrections: Dict[str, Optional[float]] = Body(..., examples=[{"gross_loans": 152000.0}]),
+    methodology: Optional[str] = None,
+    db=Depends(get_session),
+):
+    """
+    Corrige des montants extraits (ex: gross_loans mal lu) sans ré-upload.
+    Seuls les ratios dépendant des montants modifiés sont recalculés;
+    retourne le diff des montants, ratios et notations.
+    """
+    methodology = _get_methodology_or_404(methodology)
+    try:
+        result = await run_db(db, correct_bank, bank_id, corrections, methodology.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Banque introuvable")
+    invalidate()
+    return result
+
+
+@app.get("/banks/{identity}/history")
+async def get_bank_history_route(identity: str, methodology: Optional[str] = None, db=Depends(get_read_session)):
+    """
+    Évolution des ratios CAMELS d'une banque sur tous ses exercices.
+
+    identity: bank_key (ex: societe-ivoirienne-de-banque--cote-d-ivoire) ou
+    id de l'un de ses exercices. Chaque exercice contient ses ratios, les
+    variations vs l'exercice précédent et les changements de notation.
+    """
+    methodology = _get_methodology_or_404(methodology)
+    history = await run_db(db, get_bank_history, identity, methodology.id)
+    if not history:
+        raise HTTPException(status_code=404, detail="Banque introuvable")
+    return history
 
 
 # ===== ROUTES UPLOAD =====
@@ -117,10 +462,10 @@ def list_files():
 
 
 @app.post("/upload-and-extract")
-async def upload_and_extract(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_and_extract(file: UploadFile = File(...), db=Depends(get_session)):
     """
     Upload un fichier ET extrait automatiquement TOUTES les données CAMELS avec Claude.
-    Puis crée la banque automatiquement avec TOUS les champs !
+    Puis crée la banque automatiquement avec TOUS les champs, pour chaque exercice du document !
     """
     # 1. Sauvegarder le fichier
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -132,80 +477,25 @@ async def upload_and_extract(file: UploadFile = File(...), db: Session = Depends
         shutil.copyfileobj(file.file, buffer)
     
     # 2. Extraire TOUTES les données avec Claude
+    from llm_service import extract_bank_data_from_file  # Dépendances lourdes: chargées au premier usage
     try:
-        extracted_data = extract_bank_data_from_file(file_path)
-        
-        # 3. Créer la banque avec TOUS les champs extraits
-        db_bank = BankDB(
-            bank_name=extracted_data.get("name", "Inconnu"),
-            country=extracted_data.get("country", "Inconnu"),
-            fiscal_year=extracted_data.get("fiscal_year"),
-            currency=extracted_data.get("currency", "XOF"),
-            file_urls=file_path,
-            
-            # Actifs
-            total_assets=extracted_data.get("total_assets", 0),
-            cash_reserves_requirements=extracted_data.get("cash_reserves_requirements"),
-            due_from_banks=extracted_data.get("due_from_banks"),
-            investment_securities=extracted_data.get("investment_securities"),
-            gross_loans=extracted_data.get("gross_loans"),
-            loan_loss_provisions=extracted_data.get("loan_loss_provisions"),
-            foreclosed_assets=extracted_data.get("foreclosed_assets"),
-            investment_in_subs_affiliates=extracted_data.get("investment_in_subs_affiliates"),
-            other_assets=extracted_data.get("other_assets"),
-            fixed_assets=extracted_data.get("fixed_assets"),
-            
-            # Passifs
-            deposits=extracted_data.get("deposits"),
-            interbank_liabilities=extracted_data.get("interbank_liabilities"),
-            other_liabilities=extracted_data.get("other_liabilities"),
-            total_liabilities=extracted_data.get("total_liabilities"),
-            
-            # Equity
-            paid_in_capital=extracted_data.get("paid_in_capital"),
-            reserves=extracted_data.get("reserves"),
-            retained_earnings=extracted_data.get("retained_earnings"),
-            net_profit=extracted_data.get("net_profit"),
-            total_equity=extracted_data.get("total_equity"),
-            
-            # Compte de résultat
-            interest_income=extracted_data.get("interest_income"),
-            interest_expenses=extracted_data.get("interest_expenses"),
-            net_interest_income=extracted_data.get("net_interest_income"),
-            non_interest_income_commissions=extracted_data.get("non_interest_income_commissions"),
-            net_income_investment=extracted_data.get("net_income_investment"),
-            other_net_income=extracted_data.get("other_net_income"),
-            operating_expenses=extracted_data.get("operating_expenses"),
-            operating_profit=extracted_data.get("operating_profit"),
-            provision_expenses=extracted_data.get("provision_expenses"),
-            non_operating_profit_loss=extracted_data.get("non_operating_profit_loss"),
-            income_tax=extracted_data.get("income_tax"),
-            net_income=extracted_data.get("net_income"),
-            
-            # Ratios CAMELS
-            car_regulatory=extracted_data.get("car_regulatory"),
-            car_bank_reported=extracted_data.get("car_bank_reported"),
-            problem_assets_mn=extracted_data.get("problem_assets_mn"),
-            npls_mn=extracted_data.get("npls_mn"),
-            llr_mn=extracted_data.get("llr_mn"),
-            
-            # Taux de change
-            fx_rate_period_end=extracted_data.get("fx_rate_period_end"),
-            fx_rate_period_avg=extracted_data.get("fx_rate_period_avg")
-        )
+        # (extraction CPU/réseau hors de la boucle d'événements)
+        extracted_data = await run_in_threadpool(extract_bank_data_from_file, file_path)
         
-        db.add(db_bank)
-        db.commit()
-        db.refresh(db_bank)
+        # 3. Créer/mettre à jour une banque par exercice présent dans le document
+        banks = await run_db(db, save_extracted_periods, extracted_data, file_path)
+        invalidate()
         
         return {
             "message": "✅ Fichier uploadé, données extraites et banque créée !",
             "file": unique_filename,
             "extracted_data": extracted_data,
-            "bank_id": db_bank.id
+            "bank_id": banks[-1].id,
+            "periods": [{"bank_id": b.id, "fiscal_year": b.fiscal_year} for b in banks]
         }
     
     except Exception as e:
+        logger.exception("échec upload-and-extract", extra={"file": unique_filename})
         return {
             "message": "❌ Erreur lors de l'extraction",
             "file": unique_filename,
@@ -214,22 +504,31 @@ async def upload_and_extract(file: UploadFile = File(...), db: Session = Depends
 
 
 @app.get("/banks/{bank_id}/calculate")
-def calculate_ratios(bank_id: int, db: Session = Depends(get_db)):
+async def calculate_ratios(bank_id: int, db=Depends(get_session)):
     """
     Calcule TOUS les ratios CAMELS pour une banque.
     Met à jour la banque en DB avec les ratios calculés.
     """
-    bank = db.query(BankDB).filter(BankDB.id == bank_id).first()
+    def calculate(db: Session):
+        bank = _get_bank_by_id(db, bank_id)
+        if not bank:
+            return None
+        
+        # Calculer tous les ratios (sur un FinancialStatement, recopiés dans la ligne)
+        calculate_all_ratios(FinancialStatement.from_bank(bank), find_previous_period(db, bank)).apply_to(
+            bank, RATIO_FORMULAS
+        )
+        
+        # Sauvegarder en DB
+        db.commit()
+        db.refresh(bank)
+        return bank
+
+    bank = await run_db(db, calculate)
     
     if not bank:
         return {"error": "Banque introuvable"}
-    
-    # Calculer tous les ratios
-    bank = calculate_all_ratios(bank)
-    
-    # Sauvegarder en DB
-    db.commit()
-    db.refresh(bank)
+    invalidate()
     
     return {
         "message": "✅ Ratios calculés et sauvegardés !",
@@ -260,33 +559,49 @@ def calculate_ratios(bank_id: int, db: Session = Depends(get_db)):
 
 
 @app.get("/banks/{bank_id}/rating")
-def get_camels_rating(bank_id: int, db: Session = Depends(get_db)):
+async def get_camels_rating(bank_id: int, request: Request, methodology: Optional[str] = None,
+                            db=Depends(get_session)):
     """
     Génère le RATING CAMELS complet pour une banque.
-    Note chaque pilier (C, A, E, L) et donne un rating composite.
+    Note chaque pilier et donne un rating composite, selon la méthodologie
+    demandée (défaut: CAMELS_METHODOLOGY, voir GET /methodologies).
+    ETag / Last-Modified: un 304 ne recalcule rien.
     """
-    bank = db.query(BankDB).filter(BankDB.id == bank_id).first()
-    
-    if not bank:
+    methodology = _get_methodology_or_404(methodology)
+
+    def calculate(db: Session):
+        bank = _get_bank_by_id(db, bank_id)
+        if not bank:
+            return None
+        
+        # Calculer les ratios d'abord (au cas où); écriture seulement s'ils ont changé
+        calculate_all_ratios(FinancialStatement.from_bank(bank), find_previous_period(db, bank)).apply_to(
+            bank, RATIO_FORMULAS
+        )
+        if db.is_modified(bank):
+            db.commit()
+            invalidate()
+        return bank
+
+    version = await run_db(db, bank_version, bank_id)
+    if version is None:
         return {"error": "Banque introuvable"}
-    
-    # Calculer les ratios d'abord (au cas où)
-    bank = calculate_all_ratios(bank)
-    db.commit()
-    
-    # Noter chaque pilier
-    ratings = {
-        "capital": rate_capital(bank),
-        "asset_quality": rate_asset_quality(bank),
-        "earnings": rate_earnings(bank),
-        "liquidity": rate_liquidity(bank),
-        "management": {"rating": None, "status": "Manual assessment required"}
-    }
-    
-    # Rating composite
-    composite = get_composite_rating(ratings["capital"], ratings["asset_quality"], ratings["earnings"], ratings["liquidity"])
+
+    async def build():
+        bank = await run_db(db, calculate)
+        return _rating_payload(bank, methodology)
+
+    return await cached_json(request, version + (methodology.id,), build, last_modified=version[0])
+
+
+def _rating_payload(bank: BankDB, methodology) -> dict:
+    # Noter chaque pilier + rating composite
+    rated = methodology.rate_bank(bank)
+    ratings = rated["pillars"]
+    composite = rated["composite"]
     
     return {
+        "methodology": methodology.id,
         "bank_id": bank.id,
         "bank_name": bank.bank_name,
         "fiscal_year": bank.fiscal_year,
@@ -312,7 +627,9 @@ async def upload_and_analyze(file: UploadFile = File(...)):
     NOUVELLE VERSION ASYNCHRONE
     
     Upload un fichier et lance l'analyse en arrière-plan.
-    Retourne immédiatement un job_id pour suivre la progression.
+    Retourne immédiatement un job_id pour suivre la progression, le préflight
+    du document (pages, OCR, appels LLM, coût estimé) et, s'il attend son
+    tour, sa place et son ETA en secondes ("queue").
     
     Utilise ensuite GET /job/{job_id} pour vérifier le statut.
     """
@@ -326,19 +643,17 @@ async def upload_and_analyze(file: UploadFile = File(...)):
         content = await file.read()
         buffer.write(content)
     
-    # 2. Créer le job
-    job_id = create_job(file_path, filename)
+    # 2. Préflight, puis mise en file du job: threads de l'API, ou file en
+    # base traitée par camels_worker selon JOB_BACKEND (jobs courts d'abord)
+    job = await run_in_threadpool(submit_job, file_path, filename)
     
-    # 3. Lancer le traitement en arrière-plan (thread séparé)
-    thread = threading.Thread(target=process_job_async, args=(job_id, file_path))
-    thread.daemon = True
-    thread.start()
-    
-    # 4. Retourner immédiatement
+    # 3. Retourner immédiatement
     return {
-        "job_id": job_id,
-        "status": "processing",
-        "message": "Analyse lancée en arrière-plan. Utilisez GET /job/{job_id} pour suivre la progression."
+        "job_id": job["id"],
+        "status": job["status"],
+        "message": "Analyse lancée en arrière-plan. Utilisez GET /job/{job_id} pour suivre la progression.",
+        "preflight": job.get("preflight"),
+        "queue": job.get("queue"),
     }
 
 
@@ -348,11 +663,12 @@ async def get_job_status(job_id: str):
     Récupère le statut d'un job d'analyse.
     
     Status possibles:
+    - "queued": En attente de son tour ("queue": place et ETA en secondes)
     - "processing": En cours
     - "completed": Terminé avec succès (result contient les données)
     - "failed": Échec (error contient le message d'erreur)
     """
-    job = get_job(job_id)
+    job = await run_in_threadpool(get_job, job_id)
     
     if not job:
         raise HTTPException(status_code=404, detail="Job introuvable")
@@ -364,5 +680,7 @@ async def get_job_status(job_id: str):
         "result": job.get("result"),
         "error": job.get("error"),
         "created_at": job.get("created_at"),
-        "updated_at": job.get("updated_at")
+        "updated_at": job.get("updated_at"),
+        "preflight": job.get("preflight"),
+        "queue": job.get("queue"),
     }
\ No newline at end of file
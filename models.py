@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text
+from sqlalchemy import (
+    BigInteger, Column, Integer, String, Float, Boolean, DateTime, Text, Index, JSON, LargeBinary, UniqueConstraint, event,
+)
 from sqlalchemy.sql import func
 from database import Base
+from bank_identity import make_bank_key, normalize_country
 
 
 class BankDB(Base):
@@ -9,9 +12,15 @@ class BankDB(Base):
     Basé sur ton app Base44 avec ~50 champs financiers.
     """
     __tablename__ = "banks"
+    __table_args__ = (
+        # Une seule ligne par banque et par exercice (cible de l'upsert)
+        UniqueConstraint("bank_key", "fiscal_year", name="uq_banks_bank_key_fiscal_year"),
+    )
     
     # === IDENTIFIANTS ===
     id = Column(Integer, primary_key=True, index=True)
+    bank_key = Column(String, index=True)  # Nom + pays normalisés (bank_identity.make_bank_key)
+    country_key = Column(String)  # Pays normalisé (suffixe de bank_key), filtré par le screen
     
     # === INFORMATIONS GÉNÉRALES ===
     bank_name = Column(String, nullable=False, index=True)
@@ -110,4 +119,126 @@ class BankDB(Base):
     updated_date = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     def __repr__(self):
-        return f"<Bank {self.bank_name} - {self.fiscal_year}>"
\ No newline at end of file
+        return f"<Bank {self.bank_name} - {self.fiscal_year}>"
+
+
+# Ratios CAMELS stockés (séries chronologiques, /banks/{identity}/history)
+RATIO_FIELDS = [
+    "car_regulatory", "car_bank_reported", "equity_assets",
+    "npa_ratio", "npl_ratio", "llr_avg_loan", "coverage_ratio", "oler",
+    "net_interest_margin", "net_interest_spread", "non_interest_income_assets",
+    "interest_earning_assets_yield", "cost_of_funds", "opex_assets", "cost_to_income",
+    "cash_reserves_assets", "liquid_assets_assets", "gross_loans_deposits",
+    "net_interest_income_assets", "non_interest_income_assets_dupont", "opex_assets_dupont",
+    "provision_expenses_assets", "non_op_assets", "tax_expenses_assets", "assets_equity",
+    "roae", "roaa",
+]
+
+# Montants repris dans l'historique à côté des ratios
+HISTORY_AMOUNT_FIELDS = ["total_assets", "total_equity", "gross_loans", "deposits", "net_income"]
+
+# Index couvrants de l'historique (/banks/{identity}/history): identité,
+# montants et ratios font 38 colonnes, au-delà des 32 colonnes par index de
+# PostgreSQL (INCLUDE compris, vérifié par init_db). Deux index, chacun lu
+# en index-only scan par la même requête (auto-jointure, bank_history):
+# - ratios (+ id): 30 colonnes
+Index("ix_banks_history", BankDB.bank_key, BankDB.fiscal_year, postgresql_include=["id"] + RATIO_FIELDS)
+# - identité et montants: 10 colonnes
+Index(
+    "ix_banks_history_amounts",
+    BankDB.bank_key,
+    BankDB.fiscal_year,
+    postgresql_include=["bank_name", "country", "currency"] + HISTORY_AMOUNT_FIELDS,
+)
+
+
+# Ratios les plus utilisés dans POST /banks/screen: index (fiscal_year, ratio)
+# pour les filtres "exercice = X et ratio > Y" et les classements par exercice
+SCREEN_INDEXED_FIELDS = [
+    "npl_ratio", "car_regulatory", "roae", "roaa", "cost_to_income", "gross_loans_deposits", "equity_assets",
+]
+for _field in SCREEN_INDEXED_FIELDS:
+    Index(f"ix_banks_screen_{_field}", BankDB.fiscal_year, getattr(BankDB, _field))
+# Filtre pays du screen et des listes (égalité sur le pays normalisé)
+Index("ix_banks_screen_country", BankDB.country_key, BankDB.fiscal_year)
+
+
+@event.listens_for(BankDB, "before_insert")
+@event.listens_for(BankDB, "before_update")
+def _set_bank_key(mapper, connection, target):
+    """Maintient bank_key et country_key à jour pour les écritures via l'ORM"""
+    target.bank_key = make_bank_key(target.bank_name, target.country)
+    target.country_key = normalize_country(target.country)
+
+
+class ExtractionJobDB(Base):
+    """
+    File d'attente des jobs d'analyse (JOB_BACKEND=database): l'API insère,
+    les workers (camels_worker) réservent par SELECT ... FOR UPDATE SKIP LOCKED,
+    par ordre de priority_at (job_queue.claim).
+    """
+    __tablename__ = "extraction_jobs"
+
+    id = Column(String, primary_key=True)  # uuid4
+    status = Column(String, nullable=False, default="queued")  # queued, processing, completed, failed
+    step = Column(String)
+    file_path = Column(String, nullable=False)  # Stockage partagé entre API et workers
+    filename = Column(String)
+    result = Column(JSON)  # Résumé (job_manager.summarize_result)
+    error = Column(Text)
+    worker_id = Column(String)
+    attempts = Column(Integer, nullable=False, default=0)
+    preflight = Column(JSON)  # Estimation du coût à l'upload (job_preflight)
+    estimated_seconds = Column(Float)
+    needs_ocr = Column(Boolean, nullable=False, default=False)
+    priority_at = Column(DateTime, nullable=False)  # created_at + coût estimé / JOB_AGING
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime)
+    started_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)  # Rafraîchi par le worker tant que le job tourne
+    finished_at = Column(DateTime)
+
+
+# Réservation du job en attente le plus prioritaire et recherche des jobs orphelins
+Index("ix_extraction_jobs_status_priority", ExtractionJobDB.status, ExtractionJobDB.priority_at)
+
+
+class WorkerDB(Base):
+    """Workers d'extraction en vie: capacité et charge, rafraîchies à chaque battement"""
+    __tablename__ = "extraction_workers"
+
+    id = Column(String, primary_key=True)  # hostname:pid:suffixe
+    hostname = Column(String, nullable=False)
+    pid = Column(Integer)
+    concurrency = Column(Integer, nullable=False)  # Jobs simultanés max
+    active_jobs = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False, default="running")  # running, draining, stopped
+    started_at = Column(DateTime, nullable=False)
+    heartbeat_at = Column(DateTime, nullable=False)
+
+
+class DocumentFingerprintDB(Base):
+    """
+    Empreinte d'un document déjà analysé (document_fingerprints): un nouveau
+    fichier quasi identique (re-scan, autre export) réutilise son extraction.
+    """
+    __tablename__ = "document_fingerprints"
+
+    id = Column(Integer, primary_key=True)
+    file_sha256 = Column(String, nullable=False, index=True)  # Copies exactes
+    signature = Column(LargeBinary, nullable=False)  # MinHash (uint32) des premières pages
+    source = Column(String)  # text ou ocr
+    filename = Column(String)
+    extracted_data = Column(JSON, nullable=False)  # JSON d'extraction réutilisé
+    bank_ids = Column(JSON)  # BankDB créés par l'analyse, du plus ancien au plus récent
+    reuse_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class DocumentFingerprintBandDB(Base):
+    """Index LSH: une ligne par bande de la signature, les candidats partagent au moins une bande"""
+    __tablename__ = "document_fingerprint_bands"
+
+    fingerprint_id = Column(Integer, primary_key=True)
+    band = Column(Integer, primary_key=True)
+    bucket = Column(BigInteger, nullable=False, index=True)  # Hachage (bande, valeurs)
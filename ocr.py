@@ -0,0 +1,312 @@
+"""
+OCR des documents scannés: prétraitement NumPy/Pillow puis Tesseract.
+
+Chaque page passe par:
+1. niveaux de gris
+2. binarisation (seuil d'Otsu sur l'histogramme), points isolés retirés
+3. retrait des bords noirs du scanner et recadrage sur le contenu
+4. détection des pages blanches (non envoyées à Tesseract)
+5. redressement: angle estimé par profil de projection des lignes
+6. tableaux: les filets (lignes horizontales/verticales) sont effacés, ils
+   collent des "|" et "_" aux montants; le bas de page sous le dernier
+   filet (signatures, tampons) est retiré
+
+Les pages sont rendues et traitées dans des processus séparés (plages de
+pages par processus, comme pdf_text): seuls les textes reviennent au
+processus principal, pas les images.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# ===== CONFIGURATION =====
+OCR_DPI = int(os.getenv("OCR_DPI", "150"))
+OCR_LANG = os.getenv("OCR_LANG", "fra+eng")
+OCR_CONFIG = os.getenv("OCR_CONFIG", "--psm 6")
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "1") not in ("0", "false", "no")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+OCR_MAX_SKEW = float(os.getenv("OCR_MAX_SKEW", "5"))  # Degrés
+OCR_BLANK_INK_RATIO = float(os.getenv("OCR_BLANK_INK_RATIO", "0.002"))  # Part de pixels d'encre
+OCR_TABLE_CROP = os.getenv("OCR_TABLE_CROP", "1") not in ("0", "false", "no")
+
+# Une ligne (colonne) dont l'encre couvre cette part de la largeur (hauteur) est un filet
+RULE_DENSITY = 0.5
+RULE_MARGIN = 2
+# Bord de scanner: ligne/colonne de bord quasi entièrement noire
+BORDER_DENSITY = 0.6
+# Pixels d'encre échantillonnés pour estimer l'angle
+SKEW_SAMPLE = 20000
+# Au-delà de cette part d'encre, la page est une photo/illustration (ni redressement, ni filets)
+PHOTO_INK_RATIO = 0.35
+# Gain minimal du meilleur angle sur 0° pour redresser
+SKEW_MIN_GAIN = 1.05
+CROP_MARGIN = 10
+NOISE_MIN_NEIGHBOURS = 2
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+# ===== PRÉTRAITEMENT =====
+
+def to_gray(image: Image.Image) -> np.ndarray:
+    return np.asarray(image.convert("L"), dtype=np.uint8)
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Seuil qui maximise la variance inter-classes (encre / fond)"""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    weight_dark = np.cumsum(hist)
+    weight_light = weight_dark[-1] - weight_dark
+    sum_dark = np.cumsum(hist * levels)
+    mean_dark = sum_dark / np.maximum(weight_dark, 1)
+    mean_light = (sum_dark[-1] - sum_dark) / np.maximum(weight_light, 1)
+    between = weight_dark * weight_light * (mean_dark - mean_light) ** 2
+    return int(np.argmax(between))
+
+
+def despeckle(ink: np.ndarray) -> np.ndarray:
+    """
+    Retire les points isolés du scan (moins de NOISE_MIN_NEIGHBOURS voisins
+    d'encre sur 8). Un filtre médian ferait de même mais efface aussi les
+    traits de 1-2 pixels (filets, jambages à 150 DPI).
+    """
+    padded = np.pad(ink, 1).astype(np.uint8)
+    height, width = ink.shape
+    neighbours = sum(
+        padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+        for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx
+    )
+    return ink & (neighbours >= NOISE_MIN_NEIGHBOURS)
+
+
+def trim_borders(ink: np.ndarray) -> Tuple[slice, slice]:
+    """Retire les bandes noires des bords (scanner), puis recadre sur l'encre restante"""
+    height, width = ink.shape
+    rows = ink.mean(axis=1) > BORDER_DENSITY
+    cols = ink.mean(axis=0) > BORDER_DENSITY
+    top = int(np.argmin(rows)) if not rows.all() else height
+    bottom = height - int(np.argmin(rows[::-1])) if not rows.all() else height
+    left = int(np.argmin(cols)) if not cols.all() else width
+    right = width - int(np.argmin(cols[::-1])) if not cols.all() else width
+
+    inner = ink[top:bottom, left:right]
+    # Points isolés ignorés pour la boîte englobante
+    ink_rows = np.flatnonzero(inner.sum(axis=1) > 2)
+    ink_cols = np.flatnonzero(inner.sum(axis=0) > 2)
+    if not len(ink_rows) or not len(ink_cols):
+        return slice(top, top), slice(left, left)
+    return (
+        slice(max(top, top + ink_rows[0] - CROP_MARGIN), min(bottom, top + ink_rows[-1] + 1 + CROP_MARGIN)),
+        slice(max(left, left + ink_cols[0] - CROP_MARGIN), min(right, left + ink_cols[-1] + 1 + CROP_MARGIN)),
+    )
+
+
+def estimate_skew(ink: np.ndarray, max_angle: float = None) -> float:
+    """
+    Inclinaison de la page (degrés, sens trigonométrique): la rotation
+    inverse donne l'histogramme des ordonnées des pixels d'encre le plus
+    « piqué » (somme des carrés maximale). Recherche grossière par pas
+    de 0.5° puis fine par pas de 0.05°, tous les angles d'un pas à la fois.
+    0 si aucun angle ne fait nettement mieux que la page telle quelle
+    (photos, logos: pas de lignes de texte à aligner).
+    """
+    max_angle = OCR_MAX_SKEW if max_angle is None else max_angle
+    ys, xs = np.nonzero(ink)
+    if len(ys) < 100 or max_angle <= 0:
+        return 0.0
+    if len(ys) > SKEW_SAMPLE:
+        keep = np.linspace(0, len(ys) - 1, SKEW_SAMPLE).astype(np.int64)
+        ys, xs = ys[keep], xs[keep]
+    ys = ys.astype(np.float64)
+    xs = xs.astype(np.float64) - xs.mean()
+
+    def scores(angles: np.ndarray) -> np.ndarray:
+        radians = np.deg2rad(angles)[:, None]
+        projected = np.rint(ys * np.cos(radians) + xs * np.sin(radians)).astype(np.int64)
+        projected -= projected.min()
+        size = int(projected.max()) + 1
+        # Un histogramme par angle en un seul bincount (décalage de size par angle)
+        offsets = (np.arange(len(angles)) * size)[:, None]
+        hist = np.bincount((projected + offsets).ravel(), minlength=size * len(angles))
+        return (hist.reshape(len(angles), size).astype(np.float64) ** 2).sum(axis=1)
+
+    coarse = np.arange(-max_angle, max_angle + 0.25, 0.5)
+    coarse_scores = scores(coarse)
+    around = coarse[int(np.argmax(coarse_scores))]
+    fine = np.arange(around - 0.5, around + 0.5 + 0.025, 0.05)
+    fine_scores = scores(fine)
+    best = int(np.argmax(fine_scores))
+    if fine_scores[best] < SKEW_MIN_GAIN * scores(np.zeros(1))[0]:
+        return 0.0
+    return round(float(fine[best]), 2)
+
+
+def _dilate(mask: np.ndarray, width: int) -> np.ndarray:
+    """Étend chaque suite de True de width éléments de part et d'autre"""
+    padded = np.pad(mask, width)
+    return np.any([padded[i:i + len(mask)] for i in range(2 * width + 1)], axis=0)
+
+
+def _runs(mask: np.ndarray) -> int:
+    """Nombre de suites de True (un filet épais occupe plusieurs lignes de pixels)"""
+    return int(np.count_nonzero(np.diff(mask.astype(np.int8), prepend=0) == 1))
+
+
+def preprocess_page(image: Image.Image) -> Tuple[Optional[Image.Image], dict]:
+    """
+    Image prête pour Tesseract (binaire, redressée, recadrée), None pour une
+    page blanche, et ce qui a été fait (angle, filets, recadrage).
+    """
+    gray = to_gray(image)
+    threshold = otsu_threshold(gray)
+    ink = despeckle(gray < threshold)
+    rows, cols = trim_borders(ink)
+    ink = ink[rows, cols]
+    stats = {"threshold": threshold, "blank": False, "photo": False, "skew": 0.0, "rules": 0, "table_crop": False}
+
+    if ink.size == 0 or ink.mean() < OCR_BLANK_INK_RATIO:
+        stats["blank"] = True
+        return None, stats
+    if ink.mean() > PHOTO_INK_RATIO:
+        stats["photo"] = True
+        return Image.fromarray(np.where(ink, 0, 255).astype(np.uint8)), stats
+
+    skew = estimate_skew(ink)
+    if abs(skew) >= 0.1:
+        # Rotation de l'image nettoyée (la rotation du gris recréerait les points retirés)
+        rotated = Image.fromarray(np.where(ink, 0, 255).astype(np.uint8)).rotate(
+            -skew, resample=Image.BICUBIC, expand=True, fillcolor=255)
+        ink = np.asarray(rotated, dtype=np.uint8) < 128
+        rows, cols = trim_borders(ink)
+        ink = ink[rows, cols]
+        stats["skew"] = skew
+
+    # Filets: lignes horizontales sur la page, verticales entre le premier et le dernier filet
+    rule_rows = ink.mean(axis=1) > RULE_DENSITY
+    rule_cols = np.zeros(ink.shape[1], dtype=bool)
+    rule_indexes = np.flatnonzero(rule_rows)
+    if len(rule_indexes) >= 2:
+        first, last = int(rule_indexes[0]), int(rule_indexes[-1])
+        rule_cols = ink[first:last + 1].mean(axis=0) > RULE_DENSITY
+        # Grille fermée (filets verticaux sur une vraie hauteur): le tableau finit au
+        # dernier filet, le bas de page (signatures, tampons, notes) est retiré
+        closed = rule_cols.any() and last - first > 0.1 * ink.shape[0]
+        if OCR_TABLE_CROP and closed and last + CROP_MARGIN < ink.shape[0]:
+            ink, rule_rows = ink[:last + CROP_MARGIN], rule_rows[:last + CROP_MARGIN]
+            stats["table_crop"] = True
+    stats["rules"] = _runs(rule_rows) + _runs(rule_cols)
+    if stats["rules"]:
+        # Un filet redressé déborde d'un pixel ou deux sur les lignes voisines
+        ink = ink.copy()
+        ink[_dilate(rule_rows, RULE_MARGIN), :] = False
+        ink[:, _dilate(rule_cols, RULE_MARGIN)] = False
+
+    return Image.fromarray(np.where(ink, 0, 255).astype(np.uint8)), stats
+
+
+# ===== OCR =====
+
+def ocr_image(image: Image.Image, preprocess: bool = None) -> Tuple[str, dict]:
+    """Texte d'une page (et statistiques: prétraitement, durées)"""
+    import pytesseract
+
+    preprocess = OCR_PREPROCESS if preprocess is None else preprocess
+    stats = {"blank": False}
+    started = time.perf_counter()
+    if preprocess:
+        image, stats = preprocess_page(image)
+    stats["preprocess_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    if image is None:
+        return "", stats
+
+    started = time.perf_counter()
+    text = pytesseract.image_to_string(image, lang=OCR_LANG, config=OCR_CONFIG)
+    stats["ocr_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return text, stats
+
+
+def _ocr_pdf_range(file_path: str, start: int, end: int, dpi: int, preprocess: bool) -> List[Tuple[str, dict]]:
+    """Rend puis lit les pages [start, end) (exécuté dans un worker)"""
+    from pdf2image import convert_from_path
+
+    images = convert_from_path(file_path, dpi=dpi, first_page=start + 1, last_page=end)
+    results = []
+    for image in images:
+        try:
+            results.append(ocr_image(image, preprocess))
+        except Exception as e:
+            results.append(("", {"blank": False, "error": str(e)}))
+    return results
+
+
+def _ocr_image_file(file_path: str, preprocess: bool) -> List[Tuple[str, dict]]:
+    with Image.open(file_path) as image:
+        return [ocr_image(image, preprocess)]
+
+
+def ocr_pdf(file_path: str, n_pages: int, dpi: int = None, preprocess: bool = None,
+            workers: int = None, first_page: int = 0) -> List[Tuple[str, dict]]:
+    """
+    OCR des pages [first_page, n_pages) d'un PDF scanné (toutes par défaut).
+
+    Returns:
+        list: (texte, statistiques) par page, dans l'ordre ("" pour une page blanche)
+    """
+    dpi = OCR_DPI if dpi is None else dpi
+    preprocess = OCR_PREPROCESS if preprocess is None else preprocess
+    workers = OCR_WORKERS if workers is None else workers
+    if n_pages <= first_page:
+        return []
+    if workers <= 1 or n_pages - first_page == 1:
+        return _ocr_pdf_range(file_path, first_page, n_pages, dpi, preprocess)
+
+    step = -(-(n_pages - first_page) // workers)
+    pool = _get_pool(workers)
+    futures = [
+        pool.submit(_ocr_pdf_range, file_path, start, min(start + step, n_pages), dpi, preprocess)
+        for start in range(first_page, n_pages, step)
+    ]
+    pages = []
+    for future in futures:
+        pages.extend(future.result())
+    return pages
+
+
+def ocr_image_file(file_path: str, preprocess: bool = None, workers: int = None) -> Tuple[str, dict]:
+    """OCR d'une image (JPG/PNG), dans un worker si le pool est actif"""
+    preprocess = OCR_PREPROCESS if preprocess is None else preprocess
+    workers = OCR_WORKERS if workers is None else workers
+    if workers <= 1:
+        return _ocr_image_file(file_path, preprocess)[0]
+    return _get_pool(workers).submit(_ocr_image_file, file_path, preprocess).result()[0]
+
+
+def _warm_worker():
+    import pytesseract  # noqa: F401
+    import pdf2image  # noqa: F401
+
+
+def warm_pool(workers: int = None):
+    """Démarre les processus OCR et y importe numpy, Pillow et pytesseract"""
+    workers = OCR_WORKERS if workers is None else workers
+    if workers <= 1:
+        return
+    pool = _get_pool(workers)
+    for future in [pool.submit(_warm_worker) for _ in range(workers)]:
+        try:
+            future.result()
+        except ImportError:
+            return
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de processus OCR (créé au premier usage)"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers)
+    return _pool
@@ -0,0 +1,236 @@
+"""
+Extraction du texte des PDF avec backend interchangeable.
+
+Backends disponibles (variable d'environnement PDF_TEXT_BACKEND):
+- "pypdf2"    : ancien chemin PyPDF2 (lent, perd la mise en page des tableaux)
+- "pypdfium2" : rapide, mise en page reconstruite à partir des positions du texte
+- "pdfminer"  : pdfminer.six en mode layout (LAParams)
+- "auto"      : pypdfium2 si installé, sinon pdfminer, sinon PyPDF2
+
+Les pages sont extraites en parallèle dans des processus séparés pour les gros
+documents, et le texte est accumulé dans une liste puis joint (pas de += quadratique).
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from statistics import median
+from typing import List, Optional
+
+# ===== CONFIGURATION =====
+PDF_TEXT_BACKEND = os.getenv("PDF_TEXT_BACKEND", "auto").lower()
+PDF_TEXT_LAYOUT = os.getenv("PDF_TEXT_LAYOUT", "1") not in ("0", "false", "no")
+PDF_TEXT_WORKERS = int(os.getenv("PDF_TEXT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# En dessous de ce nombre de pages, le coût des processus dépasse le gain
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+
+BACKENDS = ("pypdf2", "pypdfium2", "pdfminer")
+
+_pool: Optional[ProcessPoolExecutor] = None
+# PDFium n'est pas thread-safe: un seul document ouvert à la fois par processus
+# (jobs simultanés qui extraient les petits PDF dans leur thread)
+_pdfium_lock = threading.Lock()
+
+
+def resolve_backend(backend: str = None) -> str:
+    """Retourne le backend effectif (résout "auto" selon les paquets installés)"""
+    backend = (backend or PDF_TEXT_BACKEND).lower()
+    if backend != "auto":
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend PDF inconnu: {backend} (attendu: {', '.join(BACKENDS)})")
+        return backend
+
+    for candidate, module in (("pypdfium2", "pypdfium2"), ("pdfminer", "pdfminer")):
+        try:
+            __import__(module)
+            return candidate
+        except ImportError:
+            continue
+    return "pypdf2"
+
+
+def count_pages(file_path: str, backend: str = None) -> int:
+    """Nombre de pages du PDF"""
+    backend = resolve_backend(backend)
+    if backend == "pypdfium2":
+        import pypdfium2 as pdfium
+        with _pdfium_lock:
+            pdf = pdfium.PdfDocument(file_path)
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+
+    from PyPDF2 import PdfReader
+    return len(PdfReader(file_path).pages)
+
+
+def extract_pdf_pages(file_path: str, backend: str = None, layout: bool = None,
+                      workers: int = None, max_pages: int = None) -> List[str]:
+    """
+    Extrait le texte de chaque page du PDF.
+
+    Args:
+        file_path: Chemin du PDF
+        backend: Backend à utiliser (défaut: PDF_TEXT_BACKEND)
+        layout: Préserver la mise en page des tableaux (défaut: PDF_TEXT_LAYOUT)
+        workers: Nombre de processus (défaut: PDF_TEXT_WORKERS, 1 = séquentiel)
+        max_pages: Premières pages seulement (défaut: toutes)
+
+    Returns:
+        list: Texte de chaque page, dans l'ordre
+    """
+    backend = resolve_backend(backend)
+    layout = PDF_TEXT_LAYOUT if layout is None else layout
+    workers = PDF_TEXT_WORKERS if workers is None else workers
+
+    n_pages = count_pages(file_path, backend)
+    if max_pages is not None:
+        n_pages = min(n_pages, max_pages)
+    if n_pages == 0:
+        return []
+
+    if workers <= 1 or n_pages < PDF_PARALLEL_MIN_PAGES:
+        return _extract_range(file_path, backend, layout, 0, n_pages)
+
+    # Découpage en plages contiguës: chaque processus ouvre le document une seule fois
+    step = -(-n_pages // workers)
+    ranges = [(start, min(start + step, n_pages)) for start in range(0, n_pages, step)]
+    pool = _get_pool(workers)
+    futures = [
+        pool.submit(_extract_range, file_path, backend, layout, start, end)
+        for start, end in ranges
+    ]
+
+    pages: List[str] = []
+    for future in futures:
+        pages.extend(future.result())
+    return pages
+
+
+def extract_pdf_text(file_path: str, backend: str = None, layout: bool = None) -> str:
+    """Texte complet du PDF (pages séparées par une ligne vide)"""
+    return "\n\n".join(extract_pdf_pages(file_path, backend=backend, layout=layout))
+
+
+def warm_pool(workers: int = None):
+    """Démarre les processus du pool et y importe le backend (au démarrage du worker API)"""
+    workers = PDF_TEXT_WORKERS if workers is None else workers
+    if workers <= 1:
+        return
+    pool = _get_pool(workers)
+    for future in [pool.submit(resolve_backend) for _ in range(workers)]:
+        future.result()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de processus partagé (créé au premier usage)"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers)
+    return _pool
+
+
+# ===== BACKENDS =====
+
+def _extract_range(file_path: str, backend: str, layout: bool, start: int, end: int) -> List[str]:
+    """Extrait les pages [start, end) avec le backend demandé (exécuté dans un worker)"""
+    if backend == "pypdfium2":
+        return _extract_pypdfium2(file_path, layout, start, end)
+    if backend == "pdfminer":
+        return _extract_pdfminer(file_path, layout, start, end)
+    return _extract_pypdf2(file_path, start, end)
+
+
+def _extract_pypdf2(file_path: str, start: int, end: int) -> List[str]:
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _extract_pdfminer(file_path: str, layout: bool, start: int, end: int) -> List[str]:
+    from pdfminer.high_level import extract_text
+    from pdfminer.layout import LAParams
+
+    # boxes_flow=None: ordre purement géométrique, garde les colonnes des tableaux alignées
+    laparams = LAParams(boxes_flow=None) if layout else LAParams()
+    return [
+        extract_text(file_path, page_numbers=[i], laparams=laparams)
+        for i in range(start, end)
+    ]
+
+
+def _extract_pypdfium2(file_path: str, layout: bool, start: int, end: int) -> List[str]:
+    with _pdfium_lock:
+        return _extract_pypdfium2_locked(file_path, layout, start, end)
+
+
+def _extract_pypdfium2_locked(file_path: str, layout: bool, start: int, end: int) -> List[str]:
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(file_path)
+    pages = []
+    try:
+        for i in range(start, end):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                if layout:
+                    segments = []
+                    for r in range(textpage.count_rects()):
+                        left, bottom, right, top = textpage.get_rect(r)
+                        text = textpage.get_text_bounded(left, bottom, right, top)
+                        if text.strip():
+                            segments.append((left, bottom, right, top, text.strip()))
+                    pages.append(_render_layout(segments))
+                else:
+                    pages.append(textpage.get_text_range())
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+    return pages
+
+
+def _render_layout(segments: list) -> str:
+    """
+    Reconstruit les lignes d'une page à partir des segments positionnés
+    (x0, y0, x1, y1, texte): regroupement par ligne de base puis placement
+    en colonnes fixes, pour que libellés et montants d'un même poste restent
+    sur la même ligne.
+    """
+    if not segments:
+        return ""
+
+    # Largeur moyenne d'un caractère sur la page → grille des colonnes
+    char_width = median(
+        (x1 - x0) / len(text) for x0, _, x1, _, text in segments if x1 > x0
+    ) if any(x1 > x0 for x0, _, x1, _, _ in segments) else 5.0
+    char_width = max(char_width, 1.0)
+
+    # Marge gauche commune retirée, haut de page en premier
+    margin = min(s[0] for s in segments)
+    segments = sorted(segments, key=lambda s: (-(s[1] + s[3]) / 2, s[0]))
+
+    lines = []  # [centre_y, hauteur, segments]
+    for seg in segments:
+        center = (seg[1] + seg[3]) / 2
+        height = seg[3] - seg[1]
+        if lines and abs(lines[-1][0] - center) <= max(height, lines[-1][1]) * 0.5:
+            lines[-1][2].append(seg)
+        else:
+            lines.append([center, height, [seg]])
+
+    rendered = []
+    for _, _, line_segments in lines:
+        parts: List[str] = []
+        cursor = 0
+        for x0, _, _, _, text in sorted(line_segments, key=lambda s: s[0]):
+            column = int((x0 - margin) / char_width)
+            gap = column - cursor if column > cursor else (1 if parts else 0)
+            parts.append(" " * gap)
+            parts.append(text)
+            cursor += gap + len(text)
+        rendered.append("".join(parts).rstrip())
+    return "\n".join(rendered)
@@ -0,0 +1,242 @@
+"""
+Méthodologies de notation CAMELS paramétrables.
+
+Chaque méthodologie est un fichier JSON versionné dans methodologies/
+(seuils, ratios qui alimentent chaque pilier, pondérations). Elle est
+compilée une seule fois en tables triées:
+- notation d'une banque: bisect sur les seuils (O(log n) par ratio)
+- notation d'un tableau entier: np.searchsorted sur des colonnes numpy
+
+camels-v1 reproduit exactement les anciennes échelles de rate_* et la
+moyenne simple de get_composite_rating; camels-v2 ajoute Management
+(proxy: cost_to_income) et Sensibilité (proxy: net_interest_spread).
+"""
+import glob
+import json
+import os
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+METHODOLOGY_DIR = os.getenv(
+    "CAMELS_METHODOLOGY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "methodologies")
+)
+DEFAULT_METHODOLOGY = os.getenv("CAMELS_METHODOLOGY", "camels-v1")
+
+PILLARS = ["capital", "asset_quality", "management", "earnings", "liquidity", "sensitivity"]
+DIRECTIONS = ("higher_is_better", "lower_is_better")
+
+STATUS_MAP = {
+    1: "Strong",
+    2: "Satisfactory",
+    3: "Fair",
+    4: "Marginal",
+    5: "Unsatisfactory"
+}
+
+INSUFFICIENT_DATA = {"rating": None, "status": "Insufficient data"}
+NOT_RATED = {"rating": None, "status": "Manual assessment required"}
+
+
+class CompiledRatio:
+    """Un ratio d'un pilier: seuils triés prêts pour bisect/searchsorted"""
+
+    __slots__ = ("field", "output_key", "higher_is_better", "bounds", "weight")
+
+    def __init__(self, config: dict, pillar: str):
+        self.field = config["field"]
+        self.output_key = config.get("output_key", self.field)
+        direction = config.get("direction", "higher_is_better")
+        if direction not in DIRECTIONS:
+            raise ValueError(f"{pillar}.{self.field}: direction inconnue {direction}")
+        self.higher_is_better = direction == "higher_is_better"
+
+        thresholds = [float(t) for t in config["thresholds"]]
+        if len(thresholds) != len(STATUS_MAP) - 1:
+            raise ValueError(f"{pillar}.{self.field}: {len(STATUS_MAP) - 1} seuils attendus")
+        expected = sorted(thresholds, reverse=self.higher_is_better)
+        if thresholds != expected or len(set(thresholds)) != len(thresholds):
+            raise ValueError(f"{pillar}.{self.field}: seuils non monotones pour {direction}")
+        self.bounds = sorted(thresholds)
+        self.weight = float(config.get("weight", 1))
+
+    def rate(self, value: float) -> int:
+        """
+        higher_is_better: valeur >= 1er seuil → 1, ..., sous le dernier → 5
+        lower_is_better: valeur < 1er seuil → 1, ..., au-delà du dernier → 5
+        """
+        steps = bisect_right(self.bounds, value)
+        return (len(self.bounds) + 1 - steps) if self.higher_is_better else (1 + steps)
+
+    def rate_array(self, values):
+        import numpy as np
+
+        steps = np.searchsorted(self.bounds, values, side="right")
+        ratings = (len(self.bounds) + 1 - steps) if self.higher_is_better else (1 + steps)
+        return np.where(np.isnan(values), np.nan, ratings)
+
+
+class Methodology:
+    """Méthodologie compilée (voir docstring du module)"""
+
+    def __init__(self, config: dict):
+        self.id = config["id"]
+        self.name = config.get("name", self.id)
+        self.description = config.get("description", "")
+        self.config = config
+
+        unknown = [p for p in config["pillars"] if p not in PILLARS]
+        if unknown:
+            raise ValueError(f"{self.id}: piliers inconnus {', '.join(unknown)}")
+        self.pillars: Dict[str, List[CompiledRatio]] = {
+            pillar: [CompiledRatio(r, pillar) for r in config["pillars"][pillar]["ratios"]]
+            for pillar in PILLARS if pillar in config["pillars"]
+        }
+        weights = config.get("weights", {})
+        self.weights = {pillar: float(weights.get(pillar, 1)) for pillar in self.pillars}
+        if any(w < 0 for w in self.weights.values()):
+            raise ValueError(f"{self.id}: pondérations négatives")
+
+    @property
+    def fields(self) -> List[str]:
+        """Colonnes BankDB lues par la méthodologie"""
+        return sorted({r.field for ratios in self.pillars.values() for r in ratios})
+
+    # ===== NOTATION PAR BANQUE =====
+
+    def rate_pillar(self, pillar: str, bank) -> dict:
+        """Note d'un pilier pour un objet BankDB (ou tout objet avec les attributs)"""
+        ratios = self.pillars.get(pillar)
+        if ratios is None:
+            return dict(NOT_RATED)
+
+        total = weight = 0.0
+        values = {}
+        for ratio in ratios:
+            value = getattr(bank, ratio.field, None)
+            if value is None:
+                continue
+            values[ratio.output_key] = value
+            total += ratio.rate(value) * ratio.weight
+            weight += ratio.weight
+        if not weight:
+            return dict(INSUFFICIENT_DATA)
+
+        rating = round(total / weight)
+        return {"rating": rating, "status": STATUS_MAP[rating], **values}
+
+    def composite(self, ratings: Dict[str, Optional[dict]]) -> dict:
+        """Rating composite: moyenne pondérée des piliers notés, arrondie"""
+        total = weight = 0.0
+        for pillar, pillar_weight in self.weights.items():
+            rating = (ratings.get(pillar) or {}).get("rating")
+            if rating:
+                total += rating * pillar_weight
+                weight += pillar_weight
+        if not weight:
+            return {"composite_rating": None, "status": "Insufficient data"}
+
+        composite = round(total / weight)
+        return {
+            "composite_rating": composite,
+            "status": STATUS_MAP.get(composite, "Unknown")
+        }
+
+    def rate_bank(self, bank) -> dict:
+        """Tous les piliers + composite"""
+        pillars = {pillar: self.rate_pillar(pillar, bank) for pillar in PILLARS}
+        return {
+            "methodology": self.id,
+            "pillars": pillars,
+            "composite": self.composite(pillars),
+        }
+
+    # ===== NOTATION VECTORISÉE =====
+
+    def rate_columns(self, columns: Dict[str, list]) -> dict:
+        """
+        Notes de N banques à la fois.
+
+        Args:
+            columns: dict champ -> N valeurs (None = absent), au moins self.fields
+
+        Returns:
+            dict pilier -> array float de N notes (NaN = non noté), plus "composite"
+        """
+        import numpy as np
+
+        arrays = {
+            field: np.array([np.nan if v is None else v for v in columns[field]], dtype=float)
+            for field in self.fields
+        }
+        n = len(next(iter(arrays.values()))) if arrays else 0
+
+        def weighted_round(parts):
+            total = np.zeros(n)
+            weight = np.zeros(n)
+            for ratings, w in parts:
+                known = ~np.isnan(ratings)
+                total += np.where(known, ratings * w, 0)
+                weight += np.where(known, w, 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                # np.round arrondit au pair, comme round()
+                return np.where(weight > 0, np.round(total / weight), np.nan)
+
+        result = {}
+        for pillar, ratios in self.pillars.items():
+            result[pillar] = weighted_round([(r.rate_array(arrays[r.field]), r.weight) for r in ratios])
+        result["composite"] = weighted_round([(result[p], w) for p, w in self.weights.items()])
+        return result
+
+    def describe(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "pillars": list(self.pillars),
+            "weights": self.weights,
+            "fields": self.fields,
+            "config": self.config,
+        }
+
+
+# ===== CHARGEMENT =====
+
+def _config_paths() -> Dict[str, str]:
+    return {
+        os.path.splitext(os.path.basename(path))[0]: path
+        for path in sorted(glob.glob(os.path.join(METHODOLOGY_DIR, "*.json")))
+    }
+
+
+@lru_cache(maxsize=None)
+def get_methodology(methodology_id: str = None) -> Methodology:
+    """
+    Méthodologie compilée (mise en cache).
+
+    Raises:
+        KeyError: méthodologie inconnue
+        ValueError: configuration invalide
+    """
+    methodology_id = methodology_id or DEFAULT_METHODOLOGY
+    path = _config_paths().get(methodology_id)
+    if path is None:
+        raise KeyError(f"Méthodologie inconnue: {methodology_id}")
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    config.setdefault("id", methodology_id)
+    return Methodology(config)
+
+
+def list_methodologies() -> List[dict]:
+    methodologies = []
+    for methodology_id in _config_paths():
+        methodology = get_methodology(methodology_id)
+        methodologies.append({
+            "id": methodology.id,
+            "name": methodology.name,
+            "description": methodology.description,
+            "pillars": list(methodology.pillars),
+            "default": methodology.id == DEFAULT_METHODOLOGY,
+        })
+    return methodologies
@@ -0,0 +1,332 @@
+"""
+Tests de résistance ("what-if") sur la population de banques stockée.
+
+Un scénario applique des chocs paramétrés aux montants de BankDB, puis les
+ratios sont recalculés (calculate_ratios_batch) et les banques re-notées
+(méthodologie compilée), entièrement en mémoire: aucune ligne n'est écrite.
+
+Chocs d'un scénario (tous optionnels, appliqués dans cet ordre):
+- field_shocks: variation relative de montants ({"operating_expenses": 0.1} = +10%)
+- deposit_outflow: fuite de dépôts (0.2 = -20%), financée par la trésorerie
+  (réserves, puis créances interbancaires, puis titres); le bilan se contracte
+  du montant tiré. Le reste, que les actifs liquides ne couvrent pas, est un
+  besoin de financement (funding_shortfall, par banque) couvert par un
+  emprunt interbancaire d'urgence: le bilan reste équilibré
+- npl_increase: hausse relative des NPL (0.5 = +50%); les nouveaux NPL sont
+  provisionnés à provision_rate, la dotation réduit les fonds propres et l'actif
+- rate_shock_pp: hausse des taux en points (2 = +2 pp); les charges d'intérêts
+  augmentent sur dépôts + interbancaire (liability_repricing), les produits sur
+  crédits + titres (asset_repricing); l'écart de PNB passe en fonds propres
+
+Le CAR réglementaire publié est ajusté proportionnellement aux fonds propres
+(les actifs pondérés ne sont pas stockés).
+
+Distributions et matrices de transition sont indexées par la note en texte
+("1" à "5"); les banques non notées (données insuffisantes) sont sous la
+clé UNRATED ("unrated"), après les notes.
+
+Chaque scénario est une passe vectorisée sur toute la population; les
+scénarios sont répartis sur un pool de processus.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from bank_repository import load_previous_amounts
+from bank_screen import compile_screen
+from camels_calculator import BATCH_INPUT_FIELDS, BATCH_PREVIOUS_FIELDS, calculate_ratios_batch
+from models import BankDB
+from rating_methodology import PILLARS, get_methodology
+
+# ===== CONFIGURATION =====
+STRESS_TEST_WORKERS = int(os.getenv("STRESS_TEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+# En dessous, les scénarios tournent dans le processus de la requête
+STRESS_PARALLEL_MIN_SCENARIOS = int(os.getenv("STRESS_PARALLEL_MIN_SCENARIOS", "4"))
+
+# Montants lus en base (colonnes existantes utilisées par le calculateur)
+AMOUNT_FIELDS = sorted(
+    ({f for f in BATCH_INPUT_FIELDS if hasattr(BankDB, f)} | {"deposits", "interbank_liabilities"})
+)
+# Ratios publiés repris dans la notation (NaN si absents)
+REPORTED_FIELDS = ["car_regulatory"]
+SHOCKABLE_FIELDS = set(AMOUNT_FIELDS)
+
+# Clé des banques non notées dans les distributions et matrices de transition
+UNRATED = "unrated"
+
+# Besoin de financement non couvert par les actifs liquides (deposit_outflow)
+FUNDING_SHORTFALL = "funding_shortfall"
+
+# Ratios renvoyés par banque, avant / après choc
+KEY_RATIOS = ["car_regulatory", "npl_ratio", "roae", "gross_loans_deposits", "cost_to_income"]
+
+DEFAULT_SCENARIO = {
+    "field_shocks": {},
+    "deposit_outflow": 0.0,
+    "npl_increase": 0.0,
+    "provision_rate": 0.5,
+    "rate_shock_pp": 0.0,
+    "asset_repricing": 0.5,
+    "liability_repricing": 1.0,
+}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def validate_scenario(scenario: dict) -> dict:
+    """
+    Scénario complété des valeurs par défaut.
+
+    Raises:
+        ValueError: champ inconnu ou paramètre hors bornes
+    """
+    merged = {**DEFAULT_SCENARIO, **{k: v for k, v in scenario.items() if v is not None}}
+    unknown = [f for f in merged["field_shocks"] if f not in SHOCKABLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Champs non choquables: {', '.join(unknown)}")
+    if any(v < -1 for v in merged["field_shocks"].values()):
+        raise ValueError("Un choc relatif ne peut pas dépasser -100%")
+    if not 0 <= merged["deposit_outflow"] <= 1:
+        raise ValueError("deposit_outflow doit être entre 0 et 1")
+    if merged["npl_increase"] < -1:
+        raise ValueError("npl_increase ne peut pas dépasser -100%")
+    if not 0 <= merged["provision_rate"] <= 1:
+        raise ValueError("provision_rate doit être entre 0 et 1")
+    return merged
+
+
+# ===== POPULATION =====
+
+def load_population(db: Session, filters: list = None, latest_only: bool = True) -> dict:
+    """
+    Montants et exercice N-1 de toutes les banques-exercices filtrées,
+    en colonnes (listes) prêtes pour numpy.
+    """
+    # Sélection par le moteur de screening (filtres + dernier exercice), puis
+    # lecture des montants, dont certains ne sont pas dans sa liste blanche
+    ids = compile_screen({"fields": ["id"], "filters": filters, "latest_only": latest_only})
+    columns = ["id", "bank_key", "bank_name", "fiscal_year"] + AMOUNT_FIELDS + REPORTED_FIELDS
+    stmt = select(*[getattr(BankDB, c) for c in columns]).where(BankDB.id.in_(ids)).order_by(BankDB.id)
+    rows = [dict(row) for row in db.execute(stmt).mappings()]
+    previous = load_previous_amounts(db, rows, BATCH_PREVIOUS_FIELDS)
+
+    return {
+        "banks": [{k: row[k] for k in ("id", "bank_key", "bank_name", "fiscal_year")} for row in rows],
+        "columns": {f: [row[f] for row in rows] for f in AMOUNT_FIELDS + REPORTED_FIELDS},
+        "previous": {f: [(p or {}).get(f) for p in previous] for f in BATCH_PREVIOUS_FIELDS},
+    }
+
+
+# ===== CHOCS =====
+
+def apply_scenario(columns: Dict[str, list], scenario: dict) -> dict:
+    """Montants choqués (nouveaux arrays, les colonnes d'origine sont intactes)"""
+    import numpy as np
+
+    v = {
+        f: np.array([0.0 if x is None else float(x) for x in values])
+        for f, values in columns.items() if f not in REPORTED_FIELDS
+    }
+    car = np.array([np.nan if x is None else float(x) for x in columns["car_regulatory"]])
+    equity_before = v["total_equity"].copy()
+
+    for field, shock in scenario["field_shocks"].items():
+        v[field] = v[field] * (1 + shock)
+
+    outflow_rate = scenario["deposit_outflow"]
+    if outflow_rate:
+        outflow = v["deposits"] * outflow_rate
+        remaining = outflow
+        for liquid in ("cash_reserves_requirements", "due_from_banks", "investment_securities"):
+            used = np.minimum(v[liquid], remaining)
+            v[liquid] -= used
+            remaining = remaining - used
+        drawn = outflow - remaining
+        v["deposits"] -= outflow
+        v["interbank_liabilities"] += remaining
+        v["total_liabilities"] = np.maximum(v["total_liabilities"] - drawn, 0)
+        v["total_assets"] = np.maximum(v["total_assets"] - drawn, 0)
+        v[FUNDING_SHORTFALL] = remaining
+    else:
+        v[FUNDING_SHORTFALL] = np.zeros(len(v["deposits"]))
+
+    npl_increase = scenario["npl_increase"]
+    if npl_increase:
+        new_npls = v["npls_mn"] * npl_increase
+        provisions = np.maximum(new_npls, 0) * scenario["provision_rate"]
+        v["npls_mn"] += new_npls
+        # LLR effectif du calculateur: à défaut de llr_mn, provisions du bilan (négatives)
+        llr = np.where((v["llr_mn"] == 0) & (v["loan_loss_provisions"] != 0), -v["loan_loss_provisions"], v["llr_mn"])
+        v["llr_mn"] = llr + provisions
+        v["provision_expenses"] += provisions
+        v["total_equity"] -= provisions
+        v["total_assets"] -= provisions
+
+    rate_shock = scenario["rate_shock_pp"] / 100
+    if rate_shock:
+        extra_expenses = rate_shock * scenario["liability_repricing"] * (v["deposits"] + v["interbank_liabilities"])
+        extra_income = rate_shock * scenario["asset_repricing"] * (v["gross_loans"] + v["investment_securities"])
+        v["interest_expenses"] += extra_expenses
+        v["interest_income"] += extra_income
+        v["net_interest_income"] += extra_income - extra_expenses
+        v["total_equity"] += extra_income - extra_expenses
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        v["car_regulatory"] = np.where(equity_before > 0, car * v["total_equity"] / equity_before, car)
+    return v
+
+
+def rate_population(amounts: Dict[str, list], previous: Dict[str, list], methodology_id: str) -> dict:
+    """Ratios recalculés + notes de toute la population"""
+    ratios = calculate_ratios_batch(amounts, previous)
+    ratios["car_regulatory"] = amounts["car_regulatory"]
+    methodology = get_methodology(methodology_id)
+    ratings = methodology.rate_columns({f: ratios[f] for f in methodology.fields})
+    return {"ratios": ratios, "ratings": ratings}
+
+
+# ===== EXÉCUTION =====
+
+def _rating(value) -> Optional[int]:
+    return None if value != value else int(value)  # NaN → None
+
+
+def _value(value) -> Optional[float]:
+    return None if value != value else float(value)
+
+
+def _key(rating: Optional[int]) -> str:
+    return UNRATED if rating is None else str(rating)
+
+
+def _distribution(ratings: list) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for rating in sorted(ratings, key=lambda r: (r is None, r or 0)):
+        counts[_key(rating)] = counts.get(_key(rating), 0) + 1
+    return counts
+
+
+def _transition_matrix(before: list, after: list) -> Dict[str, Dict[str, int]]:
+    """Notes de départ → {note d'arrivée: nombre de banques}"""
+    ratings = sorted(set(before) | set(after), key=lambda r: (r is None, r or 0))
+    matrix = {_key(b): {_key(a): 0 for a in ratings} for b in ratings if b in before}
+    for b, a in zip(before, after):
+        matrix[_key(b)][_key(a)] += 1
+    return {b: {a: n for a, n in row.items() if n} for b, row in matrix.items()}
+
+
+def run_scenario(population: dict, scenario: dict, baseline: dict, methodology_id: str,
+                 include_banks: bool = True) -> dict:
+    """Un scénario complet (exécuté dans un worker du pool)"""
+    started = time.perf_counter()
+    shocked = apply_scenario(population["columns"], scenario)
+    stressed = rate_population(shocked, population["previous"], methodology_id)
+
+    before = [_rating(x) for x in baseline["ratings"]["composite"]]
+    after = [_rating(x) for x in stressed["ratings"]["composite"]]
+    changes = [a - b for a, b in zip(after, before) if a is not None and b is not None]
+    shortfalls = [float(x) for x in shocked[FUNDING_SHORTFALL]]
+
+    pillars = [p for p in PILLARS if p in stressed["ratings"]]
+    result = {
+        "name": scenario.get("name"),
+        "parameters": {k: v for k, v in scenario.items() if k != "name"},
+        "distribution": _distribution(after),
+        "transition_matrix": _transition_matrix(before, after),
+        "pillar_transition_matrices": {
+            pillar: _transition_matrix(
+                [_rating(x) for x in baseline["ratings"][pillar]],
+                [_rating(x) for x in stressed["ratings"][pillar]],
+            )
+            for pillar in pillars
+        },
+        "downgrades": sum(1 for c in changes if c > 0),
+        "upgrades": sum(1 for c in changes if c < 0),
+        "average_composite_change": sum(changes) / len(changes) if changes else None,
+        "funding_shortfall": {
+            "banks": sum(1 for x in shortfalls if x > 0),
+            "total": sum(shortfalls),
+        },
+    }
+
+    if include_banks:
+        banks = []
+        for i, bank in enumerate(population["banks"]):
+            banks.append({
+                "bank_id": bank["id"],
+                "bank_key": bank["bank_key"],
+                "fiscal_year": bank["fiscal_year"],
+                "composite": {"baseline": before[i], "stressed": after[i]},
+                "funding_shortfall": shortfalls[i],
+                "pillars": {
+                    pillar: {
+                        "baseline": _rating(baseline["ratings"][pillar][i]),
+                        "stressed": _rating(stressed["ratings"][pillar][i]),
+                    }
+                    for pillar in pillars
+                },
+                "key_ratios": {
+                    ratio: {
+                        "baseline": _value(baseline["ratios"][ratio][i]),
+                        "stressed": _value(stressed["ratios"][ratio][i]),
+                    }
+                    for ratio in KEY_RATIOS
+                },
+            })
+        result["banks"] = banks
+
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de processus partagé (créé au premier usage)"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers)
+    return _pool
+
+
+def stress_population(population: dict, scenarios: List[dict], methodology_id: str = None,
+                      include_banks: bool = True, workers: int = None) -> dict:
+    """
+    Exécute tous les scénarios sur une population chargée (load_population).
+
+    Raises:
+        KeyError: méthodologie inconnue
+        ValueError: scénario invalide
+    """
+    started = time.perf_counter()
+    methodology_id = get_methodology(methodology_id).id
+    scenarios = [validate_scenario(s) for s in scenarios]
+    workers = STRESS_TEST_WORKERS if workers is None else workers
+
+    if not population["banks"]:
+        return {"methodology": methodology_id, "banks": 0, "scenarios": []}
+
+    # Référence: mêmes calculs sur les montants non choqués (les migrations ne
+    # reflètent que les chocs, pas d'éventuels ratios stockés obsolètes)
+    baseline = rate_population(apply_scenario(population["columns"], DEFAULT_SCENARIO),
+                               population["previous"], methodology_id)
+
+    if workers <= 1 or len(scenarios) < STRESS_PARALLEL_MIN_SCENARIOS:
+        results = [run_scenario(population, s, baseline, methodology_id, include_banks) for s in scenarios]
+    else:
+        pool = _get_pool(workers)
+        futures = [
+            pool.submit(run_scenario, population, s, baseline, methodology_id, include_banks)
+            for s in scenarios
+        ]
+        results = [future.result() for future in futures]
+
+    return {
+        "methodology": methodology_id,
+        "banks": len(population["banks"]),
+        "baseline_distribution": _distribution([_rating(x) for x in baseline["ratings"]["composite"]]),
+        "scenarios": results,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }